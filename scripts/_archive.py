@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+yt-dlp's download archive (yt-dlp-archive.txt) with an in-memory index.
+
+The file stays in yt-dlp's format, one "<extractor> <id>" per line, so yt-dlp
+keeps reading and appending to it directly. Every change made from Python
+holds a lock file next to the archive: additions are appended and fsynced,
+removals rewrite the file to a temp copy that replaces it atomically. yt-dlp
+does not take the lock, so right before the replace any lines it appended in
+the meantime are carried over to the new copy.
+
+    archive = DownloadArchive()
+    if "youtube dQw4w9WgXcQ" in archive: ...
+    archive.is_archived("dQw4w9WgXcQ")
+    archive.remove_ids({"dQw4w9WgXcQ"})
+"""
+
+import os
+import sys
+import threading
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+
+from _index import TranscriptIndex
+
+ARCHIVE_FILE = "yt-dlp-archive.txt"
+
+
+@contextmanager
+def _file_lock(path: str) -> Iterator[None]:
+    """Exclusive lock on `path`, shared by every process that uses DownloadArchive."""
+    with open(path, "a+b") as f:
+        if sys.platform == "win32":
+            import msvcrt
+
+            f.seek(0)
+            # LK_LOCK retries for about 10 seconds; keep trying for slow compactions.
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+class DownloadArchive:
+    """
+    Entries of yt-dlp's download archive as a set. Lines yt-dlp appends while
+    this is open are picked up by refresh(), which only reads the new bytes.
+    """
+
+    def __init__(self, path: str = ARCHIVE_FILE):
+        self.path = path
+        self.lock_path = path + ".lock"
+        self._lock = threading.Lock()
+        self._entries: set[str] = set()
+        self._ids: set[str] = set()
+        self._offset = 0
+        self.refresh()
+
+    def __contains__(self, archive_id: str) -> bool:
+        """Whether an "<extractor> <id>" entry is archived."""
+        return archive_id in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _read_from(self, offset: int) -> tuple[list[str], int]:
+        """Complete lines from offset on, and the offset after the last one."""
+        try:
+            with open(self.path, "rb") as f:
+                f.seek(offset)
+                data = f.read()
+        except FileNotFoundError:
+            return [], 0
+        end = data.rfind(b"\n") + 1
+        return data[:end].decode("utf-8", errors="replace").splitlines(), offset + end
+
+    def _index(self, lines: Iterable[str]):
+        for line in lines:
+            entry = line.strip()
+            if entry:
+                self._entries.add(entry)
+                self._ids.add(entry.split(" ", 1)[-1])
+
+    def refresh(self):
+        """Pick up lines appended since the last read. Reloads everything if the file shrank (it was rewritten)."""
+        with self._lock:
+            try:
+                size = os.path.getsize(self.path)
+            except FileNotFoundError:
+                size = 0
+            if size < self._offset:
+                self._entries.clear()
+                self._ids.clear()
+                self._offset = 0
+            lines, self._offset = self._read_from(self._offset)
+            self._index(lines)
+
+    def entries(self) -> set[str]:
+        with self._lock:
+            return set(self._entries)
+
+    def is_archived(self, video_id: str) -> bool:
+        """Whether the ID is archived under any extractor."""
+        return video_id in self._ids
+
+    def add(self, archive_ids: Iterable[str]) -> int:
+        """Append entries that are not archived yet. Returns how many were added."""
+        with _file_lock(self.lock_path):
+            self.refresh()
+            new = [entry for entry in dict.fromkeys(archive_ids) if entry and entry not in self._entries]
+            if not new:
+                return 0
+            with open(self.path, "ab") as f:
+                # yt-dlp's own appends always end in a newline, so a partial last line means a crashed writer.
+                if f.tell() > self._offset:
+                    f.write(b"\n")
+                f.write("".join(entry + "\n" for entry in new).encode("utf-8"))
+                f.flush()
+                os.fsync(f.fileno())
+            self.refresh()
+        return len(new)
+
+    def _rewrite(self, keep) -> int:
+        """Atomically rewrite the archive with only the lines keep(entry) accepts, once each. Returns lines dropped."""
+        with _file_lock(self.lock_path):
+            lines, offset = self._read_from(0)
+            kept: dict[str, None] = {}
+            for line in lines:
+                entry = line.strip()
+                if entry and keep(entry):
+                    kept[entry] = None
+
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write("".join(entry + "\n" for entry in kept).encode("utf-8"))
+                # Carry over whatever yt-dlp appended while the copy was being written.
+                late, _ = self._read_from(offset)
+                f.write("".join(line.strip() + "\n" for line in late if line.strip() and keep(line.strip())).encode("utf-8"))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+
+            with self._lock:
+                self._entries.clear()
+                self._ids.clear()
+                self._offset = 0
+            self.refresh()
+            return len(lines) - len(kept)
+
+    def remove_ids(self, video_ids: set[str]) -> int:
+        """Remove every entry whose ID is in video_ids, under any extractor. Returns lines removed."""
+        return self._rewrite(lambda entry: entry.split(" ", 1)[-1] not in video_ids)
+
+    def compact(self) -> int:
+        """Drop duplicate and blank lines. Returns lines removed."""
+        return self._rewrite(lambda entry: True)
+
+    def without_transcript(self, index: TranscriptIndex) -> list[str]:
+        """Archived entries with no .srt under BASE_DIR for their ID, sorted."""
+        transcribed = {row["id"] for row in index.query(ext=".srt")}
+        with self._lock:
+            return sorted(entry for entry in self._entries if entry.split(" ", 1)[-1] not in transcribed)
@@ -0,0 +1,408 @@
+#!/usr/bin/env python3
+"""
+Columnar export of every transcript's cues.
+
+The corpus is split into one partition per channel and year, matching the
+folders organize_years.py creates (corpus/<streamer>/<year>/). A partition
+holds one row per cue, stored column by column as raw little-endian arrays
+that array.array, numpy.fromfile or any Arrow reader can load without parsing:
+
+    doc.u32          which stream the cue belongs to (a row of docs.json)
+    cue_index.u32    the cue's number within its transcript
+    start_ms.i32     start time in milliseconds
+    end_ms.i32       end time in milliseconds
+    text_offsets.u64 byte offset of each cue's text in text.bin, plus one past the end
+    text.bin         every cue's text, UTF-8, back to back
+    doc_rows.u64     first row of each stream, plus one past the end (one entry per doc)
+
+Streamer, date, type, ID and title are per stream, so they live once in
+docs.json and each cue points at its stream through doc.u32 (what Arrow calls
+a dictionary-encoded column). meta.json records the row count, the column
+types and a signature of the source files; a partition is only rebuilt when
+that signature changes.
+
+Reading maps the files into memory instead of loading them: a column is a
+memoryview straight over the mapped file, so opening a partition costs nothing
+and the nth cue of any stream is found through doc_rows without parsing.
+
+    for part in iter_partitions():
+        durations = [e - s for s, e in zip(part.column("start_ms"), part.column("end_ms"), strict=True)]
+
+    with Corpus() as corpus:
+        cue = corpus.cue("dQw4w9WgXcQ", 41)
+"""
+
+import contextlib
+import hashlib
+import json
+import mmap
+import os
+import shutil
+import sys
+from array import array
+from collections.abc import Callable, Iterator
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import TypedDict
+
+from _index import IndexedFile, TranscriptIndex
+from _srt import Cue, iter_cues
+
+CORPUS_DIR = "corpus"
+
+# Bump when the layout changes; partitions with another version are rebuilt.
+FORMAT_VERSION = 3
+
+# Column name -> array typecode. Sizes are fixed by the format, not the platform.
+COLUMNS = {
+    "doc": "I",
+    "cue_index": "I",
+    "start_ms": "i",
+    "end_ms": "i",
+    "text_offsets": "Q",
+    "doc_rows": "Q",
+}
+
+# File suffix of each typecode, as numpy/Arrow would name the type.
+TYPE_SUFFIXES = {"I": "u32", "i": "i32", "Q": "u64"}
+
+
+class CorpusDoc(TypedDict):
+    streamer: str
+    date: str
+    type: str
+    id: str
+    title: str
+    file: str
+    size: int  # of the source .srt when exported, so per-file caches can tell it changed
+    mtime_ns: int
+
+
+def column_file(name: str) -> str:
+    return f"{name}.{TYPE_SUFFIXES[COLUMNS[name]]}"
+
+
+def _new_array(typecode: str) -> array:
+    arr = array(typecode)
+    if arr.itemsize != {"I": 4, "i": 4, "Q": 8}[typecode]:
+        raise RuntimeError(f"array typecode {typecode!r} has an unexpected size on this platform")
+    return arr
+
+
+def partition_key(row: IndexedFile) -> tuple[str, str]:
+    """(streamer, year) of an indexed transcript."""
+    return row["streamer"] or "", (row["date"] or "")[:4]
+
+
+def source_signature(paths: list[str]) -> str:
+    """Hash of every source file's path, size and mtime. Stat'ed here, since an in-place edit does not refresh the index."""
+    digest = hashlib.sha256()
+    for path in sorted(paths):
+        stat = os.stat(path)
+        digest.update(f"{path}\0{stat.st_size}\0{stat.st_mtime_ns}\n".encode())
+    return digest.hexdigest()
+
+
+def read_meta(part_dir: str) -> dict | None:
+    try:
+        with open(os.path.join(part_dir, "meta.json"), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def build_partition(part_dir: str, rows: list[IndexedFile], signature: str) -> int:
+    """
+    Parse the transcripts in rows and write them as one partition, replacing
+    part_dir only once every column is on disk. Returns the number of cues.
+    """
+    columns = {name: _new_array(code) for name, code in COLUMNS.items()}
+    docs: list[CorpusDoc] = []
+    tmp_dir = part_dir + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    offset = 0
+    columns["text_offsets"].append(0)
+    with open(os.path.join(tmp_dir, "text.bin"), "wb") as text_file:
+        for row in sorted(rows, key=lambda r: (r["date"] or "", r["path"])):
+            doc = len(docs)
+            columns["doc_rows"].append(len(columns["doc"]))
+            stat = os.stat(row["path"])
+            docs.append(
+                {
+                    "streamer": row["streamer"] or "",
+                    "date": row["date"] or "",
+                    "type": row["type"] or "",
+                    "id": row["id"] or "",
+                    "title": row["title"] or "",
+                    "file": row["name"],
+                    "size": stat.st_size,
+                    "mtime_ns": stat.st_mtime_ns,
+                }
+            )
+            for position, cue in enumerate(iter_cues(row["path"]), start=1):
+                data = cue.text.encode("utf-8")
+                text_file.write(data)
+                offset += len(data)
+                columns["doc"].append(doc)
+                columns["cue_index"].append(cue.index if cue.index is not None else position)
+                columns["start_ms"].append(cue.start_ms)
+                columns["end_ms"].append(cue.end_ms)
+                columns["text_offsets"].append(offset)
+
+    columns["doc_rows"].append(len(columns["doc"]))
+    for name, values in columns.items():
+        if sys.byteorder == "big":
+            values.byteswap()
+        with open(os.path.join(tmp_dir, column_file(name)), "wb") as f:
+            values.tofile(f)
+
+    with open(os.path.join(tmp_dir, "docs.json"), "w", encoding="utf-8") as f:
+        json.dump(docs, f, ensure_ascii=False, indent=0)
+    cue_count = len(columns["doc"])
+    meta = {
+        "version": FORMAT_VERSION,
+        "cues": cue_count,
+        "docs": len(docs),
+        "columns": {name: {"file": column_file(name), "type": TYPE_SUFFIXES[code]} for name, code in COLUMNS.items()},
+        "signature": signature,
+    }
+    with open(os.path.join(tmp_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=1)
+
+    shutil.rmtree(part_dir, ignore_errors=True)
+    os.replace(tmp_dir, part_dir)
+    return cue_count
+
+
+class UpdateSummary(TypedDict):
+    partitions: int
+    transcripts: int
+    rebuilt: int
+    removed: int
+    cues: int  # written by the rebuilt partitions
+
+
+def update_corpus(
+    corpus_dir: str = CORPUS_DIR, full: bool = False, workers: int | None = None, log: Callable[[str], None] = print
+) -> UpdateSummary:
+    """
+    Bring corpus_dir up to date with the transcript index: rebuild, in parallel,
+    the partitions whose .srt files were added, removed or changed (or every one
+    with full=True) and delete those whose transcripts are all gone.
+    """
+    with TranscriptIndex() as index:
+        rows = index.query(ext=".srt")
+
+    partitions: dict[tuple[str, str], list[IndexedFile]] = {}
+    for row in rows:
+        if row["streamer"]:
+            partitions.setdefault(partition_key(row), []).append(row)
+
+    todo = []
+    for (streamer, year), part_rows in sorted(partitions.items()):
+        part_dir = os.path.join(corpus_dir, streamer, year)
+        signature = source_signature([row["path"] for row in part_rows])
+        meta = read_meta(part_dir)
+        if full or meta is None or meta.get("version") != FORMAT_VERSION or meta.get("signature") != signature:
+            todo.append((part_dir, part_rows, signature))
+
+    # Drop partitions whose transcripts no longer exist.
+    removed = 0
+    if os.path.isdir(corpus_dir):
+        for streamer in os.listdir(corpus_dir):
+            streamer_dir = os.path.join(corpus_dir, streamer)
+            if not os.path.isdir(streamer_dir):
+                continue
+            for year in os.listdir(streamer_dir):
+                if (streamer, year) not in partitions:
+                    shutil.rmtree(os.path.join(streamer_dir, year), ignore_errors=True)
+                    removed += 1
+
+    log(f"{len(partitions)} partitions from {len(rows)} transcripts: {len(todo)} to rebuild, {len(partitions) - len(todo)} unchanged.")
+    if removed:
+        log(f"Removed {removed} partition(s) with no transcripts left.")
+
+    cues = 0
+    if todo:
+        with ProcessPoolExecutor(max_workers=max(1, min(workers or os.cpu_count() or 1, len(todo)))) as executor:
+            futures = {
+                executor.submit(build_partition, part_dir, part_rows, signature): part_dir for part_dir, part_rows, signature in todo
+            }
+            for future in as_completed(futures):
+                count = future.result()
+                cues += count
+                log(f"  {futures[future]}: {count} cues")
+    return {"partitions": len(partitions), "transcripts": len(rows), "rebuilt": len(todo), "removed": removed, "cues": cues}
+
+
+class Partition:
+    """
+    One partition, memory-mapped. Columns are zero-copy memoryviews over the
+    files, so they stay valid only until close().
+    """
+
+    def __init__(self, part_dir: str):
+        self.dir = part_dir
+        meta = read_meta(part_dir)
+        if meta is None or meta.get("version") != FORMAT_VERSION:
+            raise ValueError(f"'{part_dir}' is not a corpus partition (run export_corpus.py)")
+        self.meta = meta
+        self.cue_count: int = meta["cues"]
+        with open(os.path.join(part_dir, "docs.json"), encoding="utf-8") as f:
+            self.docs: list[CorpusDoc] = json.load(f)
+        self._maps: list[mmap.mmap] = []
+        self._views: list[memoryview] = []
+        self._columns: dict[str, memoryview | array] = {}
+        self._text = self._map("text.bin")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _map(self, file: str) -> memoryview:
+        with open(os.path.join(self.dir, file), "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return memoryview(b"")
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._maps.append(mapped)
+        view = memoryview(mapped)
+        self._views.append(view)
+        return view
+
+    def close(self):
+        """Release every column view and unmap the files. Maps still referenced by text_bytes() slices are left to the GC."""
+        for view in reversed(self._views):
+            with contextlib.suppress(BufferError):
+                view.release()
+        for mapped in self._maps:
+            with contextlib.suppress(BufferError):
+                mapped.close()
+        self._views.clear()
+        self._maps.clear()
+        self._columns.clear()
+
+    def column(self, name: str) -> memoryview | array:
+        """A whole column, indexable and iterable like a list of ints."""
+        if name not in self._columns:
+            raw = self._map(column_file(name))
+            if sys.byteorder == "big":
+                # The files are little-endian; only here does reading need a copy.
+                values = _new_array(COLUMNS[name])
+                values.frombytes(raw)
+                values.byteswap()
+                self._columns[name] = values
+            else:
+                view = raw.cast(COLUMNS[name])
+                self._views.append(view)
+                self._columns[name] = view
+        return self._columns[name]
+
+    def text_bytes(self, row: int) -> memoryview:
+        """UTF-8 text of the cue in the given row, without copying it."""
+        offsets = self.column("text_offsets")
+        return self._text[offsets[row] : offsets[row + 1]]
+
+    def text(self, row: int) -> str:
+        """Text of the cue in the given row."""
+        return str(self.text_bytes(row), "utf-8")
+
+    def text_slices(self, rows: range) -> Iterator[memoryview]:
+        """UTF-8 text of each cue in rows, as zero-copy slices."""
+        offsets = self.column("text_offsets")
+        return map(self._text.__getitem__, map(slice, offsets[rows.start : rows.stop], offsets[rows.start + 1 : rows.stop + 1]))
+
+    def text_lengths(self) -> list[int]:
+        """Byte length of every cue's text, straight from the offsets column."""
+        offsets = self.column("text_offsets")
+        return [b - a for a, b in zip(offsets[:-1], offsets[1:], strict=True)]
+
+    def rows_of(self, doc: int) -> range:
+        """Rows holding the cues of one stream (a docs.json position), in cue order."""
+        doc_rows = self.column("doc_rows")
+        return range(doc_rows[doc], doc_rows[doc + 1])
+
+    def cue(self, row: int) -> Cue:
+        return Cue(self.column("cue_index")[row], self.column("start_ms")[row], self.column("end_ms")[row], self.text(row))
+
+
+class Corpus:
+    """
+    Every partition, opened at once, with streams looked up by ID. Only docs.json
+    is read up front; cue data is paged in from the mapped files as it is touched.
+    """
+
+    def __init__(self, corpus_dir: str = CORPUS_DIR):
+        self.partitions = list(iter_partitions(corpus_dir))
+        self._streams: dict[str, tuple[Partition, int]] = {}
+        for part in self.partitions:
+            for doc, entry in enumerate(part.docs):
+                self._streams[entry["id"]] = (part, doc)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        for part in self.partitions:
+            part.close()
+
+    def __contains__(self, stream_id: str) -> bool:
+        return stream_id in self._streams
+
+    def locate(self, stream_id: str) -> tuple[Partition, range]:
+        """The partition holding a stream and the rows of its cues. Raises KeyError for an unknown ID."""
+        part, doc = self._streams[stream_id]
+        return part, part.rows_of(doc)
+
+    def cue_count(self, stream_id: str) -> int:
+        return len(self.locate(stream_id)[1])
+
+    def cue(self, stream_id: str, position: int) -> Cue:
+        """The stream's cue at a 0-based position. Raises IndexError past the end."""
+        part, rows = self.locate(stream_id)
+        return part.cue(rows[position])
+
+    def cues(self, stream_id: str, start: int = 0, stop: int | None = None) -> list[Cue]:
+        """The stream's cues from position start up to (not including) stop."""
+        part, rows = self.locate(stream_id)
+        return [part.cue(row) for row in rows[start:stop]]
+
+
+def _partition_dirs(corpus_dir: str, streamer: str | None = None, year: str | None = None) -> Iterator[tuple[str, dict]]:
+    """(folder, meta) of every exported partition under corpus_dir, whatever its version, in name order."""
+    if not os.path.isdir(corpus_dir):
+        return
+    for name in sorted(os.listdir(corpus_dir)):
+        if streamer and name != streamer:
+            continue
+        streamer_dir = os.path.join(corpus_dir, name)
+        if not os.path.isdir(streamer_dir):
+            continue
+        for part_year in sorted(os.listdir(streamer_dir)):
+            part_dir = os.path.join(streamer_dir, part_year)
+            if part_year.endswith(".tmp") or (year and part_year != year):
+                continue
+            meta = read_meta(part_dir)
+            if meta is not None:
+                yield part_dir, meta
+
+
+def iter_partitions(corpus_dir: str = CORPUS_DIR, streamer: str | None = None, year: str | None = None) -> Iterator[Partition]:
+    """
+    Every partition under corpus_dir, optionally only one streamer's or one year's,
+    in name order. Partitions written in another format version are skipped; see
+    stale_partitions().
+    """
+    for part_dir, meta in _partition_dirs(corpus_dir, streamer, year):
+        if meta.get("version") == FORMAT_VERSION:
+            yield Partition(part_dir)
+
+
+def stale_partitions(corpus_dir: str = CORPUS_DIR, streamer: str | None = None, year: str | None = None) -> list[str]:
+    """Folders of partitions written in another format version, which iter_partitions() skips until export_corpus.py rewrites them."""
+    return [part_dir for part_dir, meta in _partition_dirs(corpus_dir, streamer, year) if meta.get("version") != FORMAT_VERSION]
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Spotting whisper hallucinations in a finished transcript.
+
+Over long silences whisper tends to repeat its last line, or a stock phrase,
+over and over, often with cues packed far tighter or stretched far longer than
+real speech. One pass over the cues measures:
+
+    loop      the longest stretch of words where every WORD_NGRAM-word window
+              already occurred in the last RECENT_WORDS words. Found with a
+              rolling hash, so the scan is linear in the number of words.
+    repeat    the share of all windows that are such recent repeats
+    rate      the most cues started within one minute
+    timing    cues that run backwards, overlap the previous one or end past the audio
+
+A transcript is flagged when any of them crosses its threshold; the score is
+the worst measure relative to its threshold, so 1.0 is right at the line.
+
+    quality = assess_file(srt_path, audio_seconds)
+    if quality["flagged"]:
+        print(quality["reasons"])
+"""
+
+import re
+from collections.abc import Iterable
+from typing import TypedDict
+
+from _srt import Cue, iter_cues
+
+# Words per window the repetition checks compare.
+WORD_NGRAM = 4
+
+# A window counts as repeated if the same words occurred within this many words before it.
+RECENT_WORDS = 200
+
+# Longest looping stretch (in words) before a transcript is flagged.
+MAX_LOOP_WORDS = 120
+
+# Largest share of repeated windows before a transcript is flagged.
+MAX_REPEAT_SHARE = 0.35
+
+# Most cues that may start within one minute.
+MAX_CUES_PER_MINUTE = 120
+
+# Backwards or overlapping cues allowed before a transcript is flagged.
+MAX_TIMING_ERRORS = 5
+
+# Slack for cues ending after the audio does, in milliseconds.
+END_SLACK_MS = 5_000
+
+WORD_PATTERN = re.compile(r"[\w']+")
+
+# Modulus and base of the rolling hash over word IDs.
+_HASH_MOD = (1 << 61) - 1
+_HASH_BASE = 1_000_003
+
+
+class TranscriptQuality(TypedDict):
+    flagged: bool
+    score: float  # worst measure over its threshold; above 1.0 is flagged
+    reasons: list[str]
+    words: int
+    loop_words: int
+    repeat_share: float
+    peak_cues_per_minute: int
+    timing_errors: int  # backwards or overlapping cues
+    past_end: int  # cues ending after the audio does
+
+
+def assess_cues(cues: Iterable[Cue], audio_seconds: float | None = None) -> TranscriptQuality:
+    """Score cues for repetition loops, abnormal cue rates and timestamp anomalies, in one pass."""
+    word_ids: dict[str, int] = {}
+    recent: dict[int, int] = {}  # window hash -> word position it last ended at
+    window: list[int] = []
+    drop = pow(_HASH_BASE, WORD_NGRAM - 1, _HASH_MOD)
+    rolling = 0
+    words = windows = repeated = run = loop = 0
+
+    per_minute: dict[int, int] = {}
+    prev_end: int | None = None
+    timing_errors = 0
+    past_end = 0
+    end_limit = audio_seconds * 1000 + END_SLACK_MS if audio_seconds else None
+
+    for cue in cues:
+        minute = cue.start_ms // 60_000
+        per_minute[minute] = per_minute.get(minute, 0) + 1
+        if cue.end_ms < cue.start_ms or (prev_end is not None and cue.start_ms < prev_end):
+            timing_errors += 1
+        if end_limit is not None and cue.end_ms > end_limit:
+            past_end += 1
+        prev_end = cue.end_ms
+
+        for word in WORD_PATTERN.findall(cue.text.lower()):
+            word_id = word_ids.setdefault(word, len(word_ids) + 1)
+            words += 1
+            if len(window) == WORD_NGRAM:
+                rolling = (rolling - window.pop(0) * drop) % _HASH_MOD
+            window.append(word_id)
+            rolling = (rolling * _HASH_BASE + word_id) % _HASH_MOD
+            if len(window) < WORD_NGRAM:
+                continue
+            windows += 1
+            last = recent.get(rolling)
+            recent[rolling] = words
+            if last is not None and words - last <= RECENT_WORDS:
+                repeated += 1
+                run += 1
+                loop = max(loop, run)
+            else:
+                run = 0
+
+    repeat_share = repeated / windows if windows else 0.0
+    peak_rate = max(per_minute.values(), default=0)
+    # A loop of n repeated windows covers n + WORD_NGRAM - 1 words.
+    loop_words = loop + WORD_NGRAM - 1 if loop else 0
+
+    measures = {
+        f"a {loop_words}-word loop": loop_words / MAX_LOOP_WORDS,
+        f"{repeat_share:.0%} of the text repeats": repeat_share / MAX_REPEAT_SHARE,
+        f"{peak_rate} cues in one minute": peak_rate / MAX_CUES_PER_MINUTE,
+        f"{timing_errors} backwards or overlapping cues": timing_errors / MAX_TIMING_ERRORS,
+    }
+    reasons = [reason for reason, ratio in measures.items() if ratio > 1.0]
+    score = max(measures.values())
+    if past_end:
+        # Text past the end of the audio cannot be real, so any of it flags the transcript.
+        reasons.append(f"{past_end} cues end after the audio does")
+        score = max(score, 1.0 + past_end)
+    return {
+        "flagged": bool(reasons),
+        "score": round(score, 3),
+        "reasons": reasons,
+        "words": words,
+        "loop_words": loop_words,
+        "repeat_share": round(repeat_share, 3),
+        "peak_cues_per_minute": peak_rate,
+        "timing_errors": timing_errors,
+        "past_end": past_end,
+    }
+
+
+def assess_file(srt_path: str, audio_seconds: float | None = None) -> TranscriptQuality:
+    """assess_cues over an .srt file, streamed."""
+    return assess_cues(iter_cues(srt_path), audio_seconds)
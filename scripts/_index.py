@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+Persistent on-disk index of every file under BASE_DIR.
+
+Each file is stored with the metadata parsed from its name (streamer, date,
+type, title, ID), its size and mtime, and a content hash computed on demand.
+A refresh only re-lists directories whose mtime changed since the last one;
+adding, deleting or renaming a file (including an atomic write via os.replace)
+bumps its directory's mtime. Editing a file in place does not, so pass
+full=True, or call update_file(), after in-place edits.
+
+    with TranscriptIndex() as index:
+        for row in index.query(ext=".srt", date_prefix="202503"):
+            ...
+"""
+
+import hashlib
+import os
+import sqlite3
+from typing import TypedDict
+
+from _common import BASE_DIR, FILENAME_PATTERN
+
+INDEX_FILE = ".transcript-index.sqlite"
+
+# Bump when the schema changes; an index with another version is rebuilt.
+SCHEMA_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS dirs (
+    path TEXT PRIMARY KEY,
+    parent TEXT,
+    mtime_ns INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    dir TEXT NOT NULL,
+    name TEXT NOT NULL,
+    ext TEXT NOT NULL,
+    streamer TEXT,
+    date TEXT,
+    type TEXT,
+    title TEXT,
+    id TEXT,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    hash TEXT
+);
+CREATE INDEX IF NOT EXISTS files_dir ON files (dir);
+CREATE INDEX IF NOT EXISTS files_ext_date ON files (ext, date);
+CREATE INDEX IF NOT EXISTS files_id ON files (id);
+CREATE INDEX IF NOT EXISTS files_type ON files (type);
+"""
+
+
+class IndexedFile(TypedDict):
+    path: str
+    dir: str
+    name: str
+    ext: str
+    streamer: str | None  # first folder under BASE_DIR; None for files directly in it
+    date: str | None  # YYYYMMDD; None when the name does not match FILENAME_PATTERN
+    type: str | None
+    title: str | None
+    id: str | None
+    size: int
+    mtime_ns: int
+    hash: str | None  # sha256 of the file bytes, filled in by ensure_hashes()
+
+
+def parse_name(name: str) -> tuple[str, str, str, str] | None:
+    """
+    (date, type, title, id) from a '{YYYYMMDD} - {Type} - {Title} - [{id}].{ext}' name.
+    Works for media and thumbnails as well as .srt files.
+    """
+    stem, _ = os.path.splitext(name)
+    match = FILENAME_PATTERN.match(stem + ".srt")
+    if not match:
+        return None
+    return match.group(1), match.group(2), match.group(3).strip(), match.group(4)
+
+
+def hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class TranscriptIndex:
+    """SQLite-backed file index for BASE_DIR. Refreshed when opened as a context manager."""
+
+    def __init__(self, path: str = INDEX_FILE):
+        self.base_dir = os.path.normpath(BASE_DIR)
+        self.conn = sqlite3.connect(path, timeout=30)
+        self.conn.row_factory = sqlite3.Row
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        if version != SCHEMA_VERSION:
+            self.conn.executescript("DROP TABLE IF EXISTS dirs; DROP TABLE IF EXISTS files;")
+            self.conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self.conn.executescript(SCHEMA)
+
+    def __enter__(self):
+        self.refresh()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    def _streamer_for(self, dir_path: str) -> str | None:
+        rel = os.path.relpath(dir_path, self.base_dir)
+        if rel == ".":
+            return None
+        return rel.split(os.path.sep)[0]
+
+    def _scan_dir(self, dir_path: str, mtime_ns: int) -> list[str]:
+        """Re-list one directory into the index. Returns its subdirectories."""
+        streamer = self._streamer_for(dir_path)
+        subdirs: list[str] = []
+        rows = []
+        with os.scandir(dir_path) as entries:
+            for entry in entries:
+                if entry.is_dir():
+                    subdirs.append(entry.path)
+                    continue
+                if not entry.is_file():
+                    continue
+                st = entry.stat()
+                parsed = parse_name(entry.name)
+                date, stream_type, title, stream_id = parsed if parsed else (None, None, None, None)
+                rows.append(
+                    (
+                        entry.path,
+                        dir_path,
+                        entry.name,
+                        os.path.splitext(entry.name)[1].lower(),
+                        streamer,
+                        date,
+                        stream_type,
+                        title,
+                        stream_id,
+                        st.st_size,
+                        st.st_mtime_ns,
+                    )
+                )
+
+        # Keep known hashes for files whose size and mtime did not change.
+        known = {
+            r["path"]: (r["size"], r["mtime_ns"], r["hash"])
+            for r in self.conn.execute("SELECT path, size, mtime_ns, hash FROM files WHERE dir = ?", (dir_path,))
+        }
+        for i, row in enumerate(rows):
+            size, mtime_ns_, file_hash = known.get(row[0], (None, None, None))
+            rows[i] = row + ((file_hash if (size, mtime_ns_) == (row[9], row[10]) else None),)
+
+        self.conn.execute("DELETE FROM files WHERE dir = ?", (dir_path,))
+        self.conn.executemany("INSERT INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        self.conn.execute(
+            f"DELETE FROM dirs WHERE parent = ? AND path NOT IN ({','.join('?' * len(subdirs))})",
+            (dir_path, *subdirs),
+        )
+        self.conn.execute(
+            "INSERT OR REPLACE INTO dirs (path, parent, mtime_ns) VALUES (?, ?, ?)",
+            (dir_path, os.path.dirname(dir_path) if dir_path != self.base_dir else None, mtime_ns),
+        )
+        return subdirs
+
+    def refresh(self, full: bool = False) -> int:
+        """
+        Bring the index up to date with the disk. Only directories whose mtime
+        changed are re-listed, unless full is set. Returns how many were re-listed.
+        """
+        if not os.path.isdir(self.base_dir):
+            return 0
+
+        stored = {r["path"]: r["mtime_ns"] for r in self.conn.execute("SELECT path, mtime_ns FROM dirs")}
+        children: dict[str, list[str]] = {}
+        for r in self.conn.execute("SELECT path, parent FROM dirs WHERE parent IS NOT NULL"):
+            children.setdefault(r["parent"], []).append(r["path"])
+
+        rescanned = 0
+        visited: set[str] = set()
+        stack = [self.base_dir]
+        with self.conn:
+            while stack:
+                dir_path = stack.pop()
+                try:
+                    mtime_ns = os.stat(dir_path).st_mtime_ns
+                except OSError:
+                    continue
+                visited.add(dir_path)
+
+                if full or stored.get(dir_path) != mtime_ns:
+                    stack.extend(self._scan_dir(dir_path, mtime_ns))
+                    rescanned += 1
+                else:
+                    stack.extend(children.get(dir_path, []))
+
+            # Directories that vanished take their files with them.
+            for gone in set(stored) - visited:
+                self.conn.execute("DELETE FROM dirs WHERE path = ?", (gone,))
+                self.conn.execute("DELETE FROM files WHERE dir = ?", (gone,))
+
+        return rescanned
+
+    def update_file(self, path: str):
+        """Re-stat one file after it was edited in place, dropping its stale hash."""
+        try:
+            st = os.stat(path)
+        except OSError:
+            with self.conn:
+                self.conn.execute("DELETE FROM files WHERE path = ?", (path,))
+            return
+        with self.conn:
+            self.conn.execute(
+                "UPDATE files SET size = ?, mtime_ns = ?, hash = NULL WHERE path = ? AND (size != ? OR mtime_ns != ?)",
+                (st.st_size, st.st_mtime_ns, path, st.st_size, st.st_mtime_ns),
+            )
+
+    def query(
+        self,
+        ext: str | tuple[str, ...] | None = ".srt",
+        streamer: str | None = None,
+        date_prefix: str | None = None,
+        since: str | None = None,
+        types: set[str] | None = None,
+        include_unparsed: bool = False,
+    ) -> list[IndexedFile]:
+        """
+        Files matching every given filter, ordered by path.
+
+        ext:              extension or tuple of extensions (lowercase, with dot); None for all
+        streamer:         first folder under BASE_DIR
+        date_prefix:      YYYY, YYYYMM or YYYYMMDD prefix of the name's date
+        since:            YYYYMMDD; only files dated on or after it
+        types:            stream types to keep, e.g. {"Stream", "Video"}
+        include_unparsed: also return files whose name does not match FILENAME_PATTERN
+                          (they have no date or type, so date/type filters skip them)
+        """
+        clauses: list[str] = []
+        params: list = []
+
+        if isinstance(ext, str):
+            clauses.append("ext = ?")
+            params.append(ext)
+        elif ext:
+            clauses.append(f"ext IN ({','.join('?' * len(ext))})")
+            params.extend(ext)
+
+        if streamer:
+            clauses.append("streamer = ?")
+            params.append(streamer)
+
+        parsed: list[str] = []
+        if date_prefix:
+            # A range keeps this on the date index; ':' sorts right after '9'.
+            parsed.append("date >= ? AND date < ?")
+            params.extend([date_prefix, date_prefix + ":"])
+        if since:
+            parsed.append("date >= ?")
+            params.append(since)
+        if types:
+            parsed.append(f"type IN ({','.join('?' * len(types))})")
+            params.extend(sorted(types))
+
+        if parsed:
+            condition = " AND ".join(parsed)
+            clauses.append(f"(({condition}) OR date IS NULL)" if include_unparsed else condition)
+        if not include_unparsed:
+            clauses.append("date IS NOT NULL")
+
+        sql = "SELECT * FROM files"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY path"
+        return [IndexedFile(**dict(row)) for row in self.conn.execute(sql, params)]
+
+    def count(self, ext: str = ".srt") -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM files WHERE ext = ?", (ext,)).fetchone()[0]
+
+    def ensure_hashes(self, rows: list[IndexedFile]) -> list[IndexedFile]:
+        """Fill in (and store) the content hash of any row that does not have one yet."""
+        missing = [row for row in rows if not row["hash"]]
+        if not missing:
+            return rows
+        with self.conn:
+            for row in missing:
+                try:
+                    row["hash"] = hash_file(row["path"])
+                except OSError:
+                    continue
+                self.conn.execute(
+                    "UPDATE files SET hash = ? WHERE path = ? AND size = ? AND mtime_ns = ?",
+                    (row["hash"], row["path"], row["size"], row["mtime_ns"]),
+                )
+        return rows
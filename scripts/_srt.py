@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Streaming SRT reader and writer.
+
+Cues are read one at a time from the open file, so a long transcript is never
+held in memory whole. Blocks are separated by blank lines; the line with '-->'
+holds the timing, the line before it (if any) the index and every line after it
+the text. Blocks without a valid timing line are skipped.
+
+    for cue in iter_cues(path):
+        print(cue.start_ms, cue.text)
+"""
+
+import re
+from collections.abc import Iterable, Iterator
+from typing import TextIO
+
+TIMING_PATTERN = re.compile(r"^\s*(\d+):(\d{2}):(\d{2})[,.](\d{3})\s*-->\s*(\d+):(\d{2}):(\d{2})[,.](\d{3})")
+
+
+class Cue:
+    """One subtitle: its index, start and end in milliseconds, and its text (lines joined with '\\n')."""
+
+    __slots__ = ("index", "start_ms", "end_ms", "text")
+
+    def __init__(self, index: int | None, start_ms: int, end_ms: int, text: str):
+        self.index = index
+        self.start_ms = start_ms
+        self.end_ms = end_ms
+        self.text = text
+
+    def __repr__(self):
+        return f"Cue({self.index}, {format_timestamp(self.start_ms)} --> {format_timestamp(self.end_ms)}, {self.text!r})"
+
+    def __eq__(self, other):
+        if not isinstance(other, Cue):
+            return NotImplemented
+        return (self.index, self.start_ms, self.end_ms, self.text) == (other.index, other.start_ms, other.end_ms, other.text)
+
+    @property
+    def line_count(self) -> int:
+        return self.text.count("\n") + 1 if self.text else 0
+
+
+def parse_timing(line: str) -> tuple[int, int] | None:
+    """(start_ms, end_ms) from an 'HH:MM:SS,mmm --> HH:MM:SS,mmm' line, or None if it is not one."""
+    # Fast path for the fixed-width form every transcript here uses.
+    if len(line) == 29 and line[13:16] == "-->":
+        try:
+            return (
+                ((int(line[0:2]) * 60 + int(line[3:5])) * 60 + int(line[6:8])) * 1000 + int(line[9:12]),
+                ((int(line[17:19]) * 60 + int(line[20:22])) * 60 + int(line[23:25])) * 1000 + int(line[26:29]),
+            )
+        except ValueError:
+            pass
+    match = TIMING_PATTERN.match(line)
+    if not match:
+        return None
+    h1, m1, s1, ms1, h2, m2, s2, ms2 = map(int, match.groups())
+    return ((h1 * 60 + m1) * 60 + s1) * 1000 + ms1, ((h2 * 60 + m2) * 60 + s2) * 1000 + ms2
+
+
+def format_timestamp(ms: int) -> str:
+    """Milliseconds as an SRT 'HH:MM:SS,mmm' timestamp."""
+    seconds, ms = divmod(ms, 1000)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours:02}:{minutes:02}:{seconds:02},{ms:03}"
+
+
+def parse_cues(lines: Iterable[str]) -> Iterator[Cue]:
+    """Cues from an iterable of SRT lines, e.g. an open file."""
+    previous: str | None = None  # last non-blank line before a timing line, the index
+    timing: tuple[int, int] | None = None
+    index: int | None = None
+    text: list[str] = []
+    for raw in lines:
+        line = raw.strip()
+        if not line:
+            if timing:
+                yield Cue(index, timing[0], timing[1], "\n".join(text))
+                timing = None
+                text = []
+            previous = None
+            continue
+        if timing:
+            text.append(line)
+        elif "-->" in line:
+            timing = parse_timing(line)
+            if timing is None:
+                # Not a valid block; drop it up to the next blank line.
+                previous = None
+                continue
+            index = int(previous) if previous and previous.isdigit() else None
+        else:
+            previous = line.lstrip("\ufeff")
+    if timing:
+        yield Cue(index, timing[0], timing[1], "\n".join(text))
+
+
+def iter_cues(path: str) -> Iterator[Cue]:
+    """Stream the cues of an .srt file. Undecodable bytes are replaced rather than raising."""
+    with open(path, encoding="utf-8", errors="replace") as f:
+        yield from parse_cues(f)
+
+
+def write_cues(f: TextIO, cues: Iterable[Cue], renumber: bool = True) -> int:
+    """
+    Write cues to an open text file in SRT format. Cues are numbered from 1
+    unless renumber is False, in which case their own index is kept where set.
+    Returns how many were written.
+    """
+    count = 0
+    for count, cue in enumerate(cues, start=1):
+        index = count if renumber or cue.index is None else cue.index
+        f.write(f"{index}\n{format_timestamp(cue.start_ms)} --> {format_timestamp(cue.end_ms)}\n{cue.text}\n\n")
+    return count
+
+
+def write_srt(path: str, cues: Iterable[Cue], renumber: bool = True) -> int:
+    """Write cues to an .srt file, replacing it. Returns how many were written."""
+    with open(path, "w", encoding="utf-8", newline="\n") as f:
+        return write_cues(f, cues, renumber)
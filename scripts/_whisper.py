@@ -0,0 +1,578 @@
+#!/usr/bin/env python3
+"""
+Running faster-whisper: the command line, media durations, and a scheduler
+that transcribes several files at once in a fixed number of worker slots.
+
+Jobs start longest first so the run does not end waiting on one long file.
+Each job's stdout and stderr go to its own log file, and a failed job is
+reported without stopping the others. Whisper writes into a temp folder and
+the .srt is moved into place only once it is complete, so an interrupted job
+never leaves a partial transcript behind. A journal records every job's state
+so a restarted run picks up exactly the unfinished work.
+
+Every finished transcript is checked for hallucinations (see _hallucination.py).
+A flagged one is transcribed again right away with RETRY_OVERRIDES, while the
+audio is certainly still on disk, and whichever transcript scores better is kept.
+Until the retry finishes the flagged one waits beside it as .srt.flagged, so an
+interrupted or failed retry leaves the file to be transcribed again.
+"""
+
+import contextlib
+import json
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from typing import Literal, TypedDict
+
+from _hallucination import TranscriptQuality, assess_file
+from _srt import iter_cues
+
+# The command to run whisper.
+# The local folder (like .\[cmd]) is checked first, then the system's PATH.
+WHISPER_EXECUTABLE = "faster-whisper-xxl.exe" if sys.platform == "win32" else "faster-whisper-xxl"
+
+# File types to look for
+MEDIA_EXTENSIONS = (".webm", ".m4a", ".mp3", ".mp4", ".mkv")
+
+# Per-job whisper output is written here as <media name>.log
+LOG_DIR = "transcribe-logs"
+
+# Records the state of every transcription job so an interrupted run can resume.
+JOURNAL_FILE = "transcribe-journal.json"
+
+# A job that failed this many times is not retried until asked to (--retry-failed).
+DEFAULT_MAX_ATTEMPTS = 3
+
+# Whisper writes into a folder with this prefix next to the media, then the .srt is moved out.
+TEMP_DIR_PREFIX = ".whisper-"
+
+# A flagged transcript is moved to <name>.srt<FLAGGED_SUFFIX> while the file is transcribed
+# again, so a retry that fails or is interrupted leaves no .srt and the next run redoes the file.
+FLAGGED_SUFFIX = ".flagged"
+
+# One JSON line per finished job: audio duration, wall time, realtime factor, cue count and settings.
+METRICS_FILE = "transcribe-metrics.jsonl"
+
+# Exit codes of a whisper process stopped by Ctrl+C (POSIX signal, shell convention, Windows).
+INTERRUPTED_EXIT_CODES = {-signal.SIGINT, 128 + signal.SIGINT, 0xC000013A}
+
+# Each worker runs its own whisper process with its own copy of the model, so
+# more than one only helps when there is GPU memory and compute to spare.
+DEFAULT_WORKERS = 1
+
+
+class WhisperSettings(TypedDict):
+    model: str
+    compute_type: str
+    batch_size: int
+    language: str
+    max_line_width: int  # characters per line. 60 with two lines is about 10 seconds per block
+    max_line_count: int  # lines per block
+    condition_on_previous_text: bool  # off stops one hallucinated line from seeding the next
+
+
+DEFAULT_SETTINGS: WhisperSettings = {
+    "model": "distil-large-v3.5",
+    "compute_type": "float32",
+    "batch_size": 16,
+    "language": "English",
+    "max_line_width": 60,
+    "max_line_count": 2,
+    "condition_on_previous_text": True,
+}
+
+# Changed from the run's own settings to transcribe a file again when its transcript looks hallucinated.
+RETRY_OVERRIDES = {"condition_on_previous_text": False}
+
+
+JobState = Literal["queued", "running", "done", "failed"]
+
+
+class JournalEntry(TypedDict):
+    state: JobState
+    attempts: int  # times whisper was started for this file
+    exit_code: int | None
+    seconds: float | None  # wall time of the last attempt
+    duration: float | None  # seconds of audio
+    error: str | None
+    updated_at: str
+    quality: TranscriptQuality | None  # of the kept transcript; absent in entries from before the check existed
+    retried: bool  # transcribed again with RETRY_OVERRIDES because the first transcript was flagged
+
+
+class JobResult(TypedDict):
+    media_path: str
+    srt_path: str
+    duration: float | None  # seconds of audio, None if it could not be probed
+    returncode: int | None  # None if whisper could not be started
+    seconds: float  # wall time, including a retry
+    whisper_seconds: float  # wall time of the first whisper pass, which the realtime factor is based on
+    log_path: str
+    ok: bool  # exited with 0 and wrote the .srt
+    interrupted: bool  # stopped by Ctrl+C; left as running in the journal so it resumes
+    error: str | None
+    cues: int | None  # cues in the written .srt
+    quality: TranscriptQuality | None  # of the kept transcript, None if it was not checked
+    retried: bool
+
+
+class JobMetrics(TypedDict):
+    finished_at: str
+    media_path: str
+    ok: bool
+    model: str
+    compute_type: str
+    batch_size: int
+    workers: int
+    audio_seconds: float | None
+    wall_seconds: float
+    realtime_factor: float | None  # seconds of audio transcribed per second of wall time
+    cues: int | None
+    flagged: bool | None  # the kept transcript still looks hallucinated
+    retried: bool
+
+
+def srt_path_for(media_path: str) -> str:
+    """Whisper is run with '-o source', so the .srt lands next to the media with the same name."""
+    return os.path.splitext(media_path)[0] + ".srt"
+
+
+def get_whisper_command(executable: str = WHISPER_EXECUTABLE) -> str:
+    """Finds the whisper executable, preferring a local one."""
+    if os.path.dirname(executable):
+        # Already a path, e.g. a stub whisper passed with --whisper
+        return executable
+
+    local_cmd = os.path.join(".", executable)
+
+    if os.path.exists(local_cmd):
+        print(f"Found local executable: {local_cmd}")
+        return local_cmd
+    else:
+        print(f"Using PATH to find executable: {executable}")
+        return executable
+
+
+def build_command(whisper_cmd: str, media_path: str, settings: WhisperSettings, output_dir: str = "source") -> list[str]:
+    command_args = [
+        whisper_cmd,
+        media_path,
+        "-l",
+        settings["language"],
+        "--compute_type",
+        settings["compute_type"],
+        "--batch_size",
+        str(settings["batch_size"]),
+        "-m",
+        settings["model"],
+        "--sentence",
+        "-o",
+        output_dir,
+        "-pp",
+        "--beep_off",
+        "--max_line_width",
+        str(settings["max_line_width"]),
+        "--max_line_count",
+        str(settings["max_line_count"]),
+    ]
+    if not settings.get("condition_on_previous_text", True):
+        command_args.extend(["--condition_on_previous_text", "False"])
+
+    # Uncomment the line below to run the "translate" task instead
+    # command_args.extend(["--task", "translate"])
+
+    return command_args
+
+
+def probe_duration(media_path: str) -> float | None:
+    """Audio duration in seconds from ffprobe, or None if ffprobe is missing or fails."""
+    ffprobe = shutil.which("ffprobe")
+    if not ffprobe:
+        return None
+    try:
+        result = subprocess.run(
+            [ffprobe, "-v", "error", "-show_entries", "format=duration", "-of", "default=noprint_wrappers=1:nokey=1", media_path],
+            capture_output=True,
+            text=True,
+            encoding="utf-8",
+            timeout=60,
+        )
+        return float(result.stdout.strip())
+    except (OSError, ValueError, subprocess.SubprocessError):
+        return None
+
+
+def realtime_factor(audio_seconds: float | None, wall_seconds: float) -> float | None:
+    """Seconds of audio per second of wall time; 60 means an hour of audio took a minute."""
+    if not audio_seconds or wall_seconds <= 0:
+        return None
+    return audio_seconds / wall_seconds
+
+
+def append_metrics(path: str, metrics: JobMetrics):
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(metrics, ensure_ascii=False) + "\n")
+
+
+def load_metrics(path: str = METRICS_FILE) -> list[JobMetrics]:
+    """Every metrics line in the file, skipping any that do not parse."""
+    metrics: list[JobMetrics] = []
+    if not os.path.exists(path):
+        return metrics
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                metrics.append(json.loads(line))
+            except ValueError:
+                continue
+    return metrics
+
+
+def read_log_tail(log_path: str, lines: int = 10) -> list[str]:
+    try:
+        with open(log_path, encoding="utf-8", errors="replace") as f:
+            return f.read().splitlines()[-lines:]
+    except OSError:
+        return []
+
+
+def remove_stale_temp_dirs(scan_path: str) -> int:
+    """Delete whisper temp folders left behind by an interrupted run. Returns how many were removed."""
+    removed = 0
+    for root, dirs, _files in os.walk(scan_path):
+        for name in list(dirs):
+            if name.startswith(TEMP_DIR_PREFIX):
+                shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+                dirs.remove(name)
+                removed += 1
+    return removed
+
+
+class JobJournal:
+    """
+    Durable record of each transcription job, keyed by media path: its state
+    (queued, running, done or failed), attempt count, exit code, wall time and
+    audio duration. Saved atomically after every change, so a job still marked
+    running after a restart was interrupted.
+    """
+
+    def __init__(self, path: str = JOURNAL_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._jobs: dict[str, JournalEntry] = {}
+
+        if os.path.exists(path):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    self._jobs = json.load(f).get("jobs", {})
+            except (OSError, ValueError, AttributeError) as e:
+                print(f"Warning: could not read '{path}' ({e}). Starting with an empty journal.")
+
+    @staticmethod
+    def _key(media_path: str) -> str:
+        return os.path.normpath(media_path)
+
+    def get(self, media_path: str) -> JournalEntry | None:
+        with self._lock:
+            return self._jobs.get(self._key(media_path))
+
+    def queue(self, media_paths: list[str], reset_attempts: bool = False):
+        """
+        Mark jobs as queued. Attempts carry over from earlier runs so the retry cap
+        holds across restarts, except for jobs that had finished (their .srt was
+        since removed, so this is a fresh transcription) or when reset_attempts is set.
+        """
+        with self._lock:
+            for media_path in media_paths:
+                key = self._key(media_path)
+                entry = self._jobs.get(key)
+                attempts = 0 if entry is None or reset_attempts or entry["state"] == "done" else entry["attempts"]
+                self._jobs[key] = {
+                    "state": "queued",
+                    "attempts": attempts,
+                    "exit_code": None,
+                    "seconds": None,
+                    "duration": entry["duration"] if entry else None,
+                    "error": None,
+                    "updated_at": datetime.now().isoformat(timespec="seconds"),
+                    "quality": None,
+                    "retried": False,
+                }
+            self._save()
+
+    def start(self, media_path: str, duration: float | None):
+        with self._lock:
+            entry = self._jobs.setdefault(self._key(media_path), JobJournal._blank())
+            entry["state"] = "running"
+            entry["attempts"] += 1
+            entry["duration"] = duration
+            entry["updated_at"] = datetime.now().isoformat(timespec="seconds")
+            self._save()
+
+    def finish(self, result: JobResult):
+        with self._lock:
+            entry = self._jobs.setdefault(self._key(result["media_path"]), JobJournal._blank())
+            entry["state"] = "done" if result["ok"] else "failed"
+            entry["exit_code"] = result["returncode"]
+            entry["seconds"] = round(result["seconds"], 3)
+            entry["error"] = result["error"]
+            entry["quality"] = result["quality"]
+            entry["retried"] = result["retried"]
+            entry["updated_at"] = datetime.now().isoformat(timespec="seconds")
+            self._save()
+
+    @staticmethod
+    def _blank() -> JournalEntry:
+        return {
+            "state": "queued",
+            "attempts": 0,
+            "exit_code": None,
+            "seconds": None,
+            "duration": None,
+            "error": None,
+            "updated_at": "",
+            "quality": None,
+            "retried": False,
+        }
+
+    def _save(self):
+        """Write the journal atomically so an interrupted save never corrupts it. Caller holds the lock."""
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": 1, "jobs": self._jobs}, f, indent=1, sort_keys=True, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+
+class TranscriptionScheduler:
+    """
+    Transcribes media files with up to `workers` whisper processes at once.
+
+    Jobs are ordered by audio duration, longest first. When ffprobe cannot give
+    a duration for every file, file size is used instead. on_start(media_path,
+    started, total) and on_finish(result, finished, total) are called from
+    worker threads, one call at a time. With a journal, every job's state
+    changes are recorded in it; with metrics_path, every finished job's timing
+    is appended to that file. Unless retry is False, a transcript flagged as
+    hallucinated is redone once with RETRY_OVERRIDES applied to settings.
+    """
+
+    def __init__(
+        self,
+        whisper_cmd: str,
+        settings: WhisperSettings = DEFAULT_SETTINGS,
+        workers: int = DEFAULT_WORKERS,
+        log_dir: str = LOG_DIR,
+        on_start: Callable[[str, int, int], None] | None = None,
+        on_finish: Callable[[JobResult, int, int], None] | None = None,
+        journal: JobJournal | None = None,
+        metrics_path: str | None = None,
+        retry: bool = True,
+    ):
+        self.whisper_cmd = whisper_cmd
+        self.settings = settings
+        self.workers = max(1, workers)
+        self.log_dir = log_dir
+        self.on_start = on_start
+        self.on_finish = on_finish
+        self.journal = journal
+        self.metrics_path = metrics_path
+        retry_settings: WhisperSettings = {**settings, **RETRY_OVERRIDES}  # type: ignore[typeddict-item]
+        self.retry_settings = retry_settings if retry and retry_settings != settings else None
+        self._lock = threading.Lock()
+        self._started = 0
+        self._finished = 0
+
+    def order(self, media_paths: list[str]) -> list[tuple[str, float | None]]:
+        """
+        (media_path, duration) longest first. Durations are probed in parallel,
+        once per file: ones already in the journal are reused.
+        """
+
+        def duration_of(media_path: str) -> float | None:
+            entry = self.journal.get(media_path) if self.journal else None
+            if entry and entry["duration"] is not None:
+                return entry["duration"]
+            return probe_duration(media_path)
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            durations = list(executor.map(duration_of, media_paths))
+
+        if all(d is not None for d in durations):
+            keys: list[float] = [d for d in durations if d is not None]
+        else:
+            keys = [float(os.path.getsize(p)) if os.path.exists(p) else 0.0 for p in media_paths]
+
+        ranked = sorted(zip(keys, media_paths, durations, strict=True), key=lambda item: item[0], reverse=True)
+        return [(path, duration) for _, path, duration in ranked]
+
+    def run_job(self, media_path: str, duration: float | None, total: int = 0) -> JobResult:
+        """
+        Transcribe one file on the calling thread. run() uses this for every job;
+        a caller that finds files over time (see pipeline.py) can call it from its
+        own workers. total is only passed through to the callbacks.
+        """
+        with self._lock:
+            self._started += 1
+            if self.on_start:
+                self.on_start(media_path, self._started, total)
+        if self.journal:
+            self.journal.start(media_path, duration)
+
+        os.makedirs(self.log_dir, exist_ok=True)
+        stem = os.path.basename(os.path.splitext(media_path)[0])
+        log_path = os.path.join(self.log_dir, stem + ".log")
+        result: JobResult = {
+            "media_path": media_path,
+            "srt_path": srt_path_for(media_path),
+            "duration": duration,
+            "returncode": None,
+            "seconds": 0.0,
+            "whisper_seconds": 0.0,
+            "log_path": log_path,
+            "ok": False,
+            "interrupted": False,
+            "error": None,
+            "cues": None,
+            "quality": None,
+            "retried": False,
+        }
+
+        start = time.perf_counter()
+        try:
+            returncode, error = self._run_whisper(media_path, self.settings, log_path, result["srt_path"])
+            result["whisper_seconds"] = time.perf_counter() - start
+            result["returncode"] = returncode
+            if returncode in INTERRUPTED_EXIT_CODES:
+                result["interrupted"] = True
+                result["error"] = "interrupted"
+            elif error:
+                result["error"] = error
+            else:
+                result["ok"] = True
+                self._check_quality(result, log_path)
+                if result["ok"]:
+                    result["cues"] = sum(1 for _ in iter_cues(result["srt_path"]))
+        except Exception as e:
+            result["error"] = str(e)
+        result["seconds"] = time.perf_counter() - start
+
+        if self.journal and not result["interrupted"]:
+            self.journal.finish(result)
+        with self._lock:
+            if self.metrics_path and not result["interrupted"]:
+                append_metrics(self.metrics_path, self._metrics_for(result))
+            self._finished += 1
+            if self.on_finish:
+                self.on_finish(result, self._finished, total)
+        return result
+
+    def _run_whisper(self, media_path: str, settings: WhisperSettings, log_path: str, srt_dest: str, append_log: bool = False):
+        """
+        Run whisper on one file and move its .srt to srt_dest. Returns (exit code,
+        error or None). Whisper writes into a temp folder next to the media, so the
+        finished .srt can be renamed into place and a partial one never is.
+        """
+        stem = os.path.basename(os.path.splitext(media_path)[0])
+        tmp_dir = tempfile.mkdtemp(prefix=TEMP_DIR_PREFIX, dir=os.path.dirname(media_path) or ".")
+        try:
+            tmp_srt = os.path.join(tmp_dir, stem + ".srt")
+            with open(log_path, "a" if append_log else "w", encoding="utf-8") as log:
+                if append_log:
+                    log.write(f"\n--- Retrying with {settings} ---\n")
+                    log.flush()
+                proc = subprocess.run(
+                    build_command(self.whisper_cmd, media_path, settings, output_dir=tmp_dir),
+                    stdout=log,
+                    stderr=subprocess.STDOUT,
+                    stdin=subprocess.DEVNULL,
+                    check=False,
+                )
+            if proc.returncode != 0:
+                return proc.returncode, f"whisper exited with code {proc.returncode}"
+            if not os.path.exists(tmp_srt):
+                return proc.returncode, "whisper exited cleanly but wrote no .srt"
+            os.replace(tmp_srt, srt_dest)
+            return proc.returncode, None
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    def _check_quality(self, result: JobResult, log_path: str):
+        """
+        Score the new transcript and, if it is flagged, transcribe the file again
+        with retry_settings, keeping whichever transcript scores better. The flagged
+        transcript is moved aside first, so if the retry fails or is interrupted
+        there is no .srt and the next run transcribes the file again.
+        """
+        srt_path = result["srt_path"]
+        flagged_srt = srt_path + FLAGGED_SUFFIX
+        quality = assess_file(srt_path, result["duration"])
+        result["quality"] = quality
+        if not (quality["flagged"] and self.retry_settings):
+            # A transcript set aside by an earlier, unfinished retry is superseded by this one.
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(flagged_srt)
+            return
+
+        os.replace(srt_path, flagged_srt)
+        returncode, error = self._run_whisper(result["media_path"], self.retry_settings, log_path, srt_path, append_log=True)
+        result["ok"] = False
+        if returncode in INTERRUPTED_EXIT_CODES:
+            # Left running in the journal like any interrupted job.
+            result["interrupted"] = True
+            result["error"] = "interrupted"
+            return
+        if error is not None:
+            result["error"] = f"transcript looked hallucinated and the retry failed: {error}"
+            return
+
+        result["ok"] = True
+        result["retried"] = True
+        retry_quality = assess_file(srt_path, result["duration"])
+        if retry_quality["score"] < quality["score"]:
+            os.remove(flagged_srt)
+            result["quality"] = retry_quality
+        else:
+            os.replace(flagged_srt, srt_path)
+
+    def _metrics_for(self, result: JobResult) -> JobMetrics:
+        return {
+            "finished_at": datetime.now().isoformat(timespec="seconds"),
+            "media_path": result["media_path"],
+            "ok": result["ok"],
+            "model": self.settings["model"],
+            "compute_type": self.settings["compute_type"],
+            "batch_size": self.settings["batch_size"],
+            "workers": self.workers,
+            "audio_seconds": result["duration"],
+            "wall_seconds": round(result["seconds"], 3),
+            "realtime_factor": realtime_factor(result["duration"], result["whisper_seconds"]),
+            "cues": result["cues"],
+            "flagged": result["quality"]["flagged"] if result["quality"] else None,
+            "retried": result["retried"],
+        }
+
+    def run(self, media_paths: list[str]) -> list[JobResult]:
+        """Transcribe every file. Returns one result per file in the order they finished."""
+        jobs = self.order(media_paths)
+        self._started = self._finished = 0
+
+        results: list[JobResult] = []
+        # The pool takes jobs in submission order, so the longest start first.
+        executor = ThreadPoolExecutor(max_workers=self.workers)
+        try:
+            futures = [executor.submit(self.run_job, path, duration, len(jobs)) for path, duration in jobs]
+            for future in as_completed(futures):
+                results.append(future.result())
+        except KeyboardInterrupt:
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+        executor.shutdown()
+        return results
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""Shared zstd helpers: transcript dictionaries, compression level policy and compressor reuse."""
+
+import json
+import os
+import random
+import threading
+from datetime import datetime
+from typing import Any
+
+import zstandard as zstd
+
+# Trained dictionaries live here as transcripts-<dict_id>.zdict, with index.json
+# recording every version and which one is current. The server needs the same
+# files to decode dictionary-compressed uploads.
+DICT_DIR = "zstd-dicts"
+DICT_INDEX_FILE = os.path.join(DICT_DIR, "index.json")
+
+# zstd's own default dictionary size (110 KB).
+DEFAULT_DICT_SIZE = 112_640
+
+# Payloads are split into chunks of this size before training. zstd trains on
+# many small samples; whole 1 MB transcripts would mostly be ignored.
+SAMPLE_CHUNK_SIZE = 16 * 1024
+
+# Cap on total sample bytes fed to the trainer (about 100x the dictionary size).
+DEFAULT_SAMPLE_BYTES = 12 * 1024 * 1024
+
+
+def split_samples(payloads: list[bytes], max_total: int = DEFAULT_SAMPLE_BYTES, seed: int = 0) -> list[bytes]:
+    """
+    Cut payloads into SAMPLE_CHUNK_SIZE pieces and pick a random subset up to max_total bytes.
+    The first chunk of every payload is always kept so the JSON header fields are learned.
+    """
+    heads: list[bytes] = []
+    rest: list[bytes] = []
+    for payload in payloads:
+        for offset in range(0, len(payload), SAMPLE_CHUNK_SIZE):
+            chunk = payload[offset : offset + SAMPLE_CHUNK_SIZE]
+            (heads if offset == 0 else rest).append(chunk)
+
+    random.Random(seed).shuffle(rest)
+    samples = heads
+    total = sum(len(s) for s in samples)
+    for chunk in rest:
+        if total >= max_total:
+            break
+        samples.append(chunk)
+        total += len(chunk)
+    return samples
+
+
+def train_dictionary(samples: list[bytes], dict_size: int = DEFAULT_DICT_SIZE) -> zstd.ZstdCompressionDict:
+    """Train a dictionary from samples using every available core."""
+    return zstd.train_dictionary(dict_size, samples, threads=-1)
+
+
+def _load_index() -> dict[str, Any]:
+    if not os.path.exists(DICT_INDEX_FILE):
+        return {"current": None, "versions": []}
+    with open(DICT_INDEX_FILE, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def dictionary_path(dict_id: int) -> str:
+    return os.path.join(DICT_DIR, f"transcripts-{dict_id}.zdict")
+
+
+def save_dictionary(dictionary: zstd.ZstdCompressionDict, sample_count: int, sample_bytes: int) -> str:
+    """Write a new dictionary version, mark it current, and return its path."""
+    os.makedirs(DICT_DIR, exist_ok=True)
+    dict_id = dictionary.dict_id()
+    path = dictionary_path(dict_id)
+    with open(path, "wb") as f:
+        f.write(dictionary.as_bytes())
+
+    index = _load_index()
+    index["versions"] = [v for v in index["versions"] if v["id"] != dict_id]
+    index["versions"].append(
+        {
+            "id": dict_id,
+            "file": os.path.basename(path),
+            "size": len(dictionary),
+            "samples": sample_count,
+            "sampleBytes": sample_bytes,
+            "created": datetime.now().isoformat(timespec="seconds"),
+        }
+    )
+    index["current"] = dict_id
+
+    tmp_path = DICT_INDEX_FILE + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(index, f, indent=2)
+    os.replace(tmp_path, DICT_INDEX_FILE)
+    return path
+
+
+def current_dictionary_id() -> int | None:
+    return _load_index()["current"]
+
+
+def load_dictionary(dict_id: int | None = None) -> zstd.ZstdCompressionDict:
+    """
+    Load a dictionary by ID, or the current version when dict_id is None.
+    Raises FileNotFoundError if there is no such dictionary.
+    """
+    if dict_id is None:
+        dict_id = current_dictionary_id()
+        if dict_id is None:
+            raise FileNotFoundError(f"No trained dictionary in '{DICT_DIR}'. Run `upload_transcripts.py train-dict` first.")
+
+    with open(dictionary_path(dict_id), "rb") as f:
+        return zstd.ZstdCompressionDict(f.read())
+
+
+# --- Level selection ---
+
+# Starting estimates of (compress MB/s, compression ratio) per candidate level on
+# transcript payloads, single-threaded, without and with a trained dictionary.
+# Measured on a 30-file sample of the corpus; refined at runtime by LevelPolicy.
+LEVEL_PROFILES: dict[int, tuple[float, float]] = {
+    3: (147.0, 2.95),
+    9: (24.0, 3.25),
+    15: (8.4, 3.37),
+    19: (2.45, 3.61),
+}
+DICTIONARY_LEVEL_PROFILES: dict[int, tuple[float, float]] = {
+    3: (123.0, 2.99),
+    9: (20.0, 3.33),
+    15: (5.5, 3.69),
+    19: (4.3, 3.73),
+}
+
+# Payloads at or below this size take the highest candidate level; the CPU cost is
+# a few milliseconds at most, so any ratio gain is free.
+SMALL_PAYLOAD_BYTES = 64 * 1024
+
+# Assumed upload throughput until the first uploads have been measured (1 MB/s).
+DEFAULT_THROUGHPUT = 1024 * 1024
+
+# Weight given to each new sample in the running averages.
+EWMA_ALPHA = 0.2
+
+
+class LevelPolicy:
+    """
+    Picks a zstd level per payload from its size and the measured link throughput.
+
+    For each candidate level the expected cost of a payload is its compress time
+    plus the time to send the compressed bytes; the cheapest level wins. A slow
+    link therefore pays for extra CPU and a fast local link does not. Both the
+    link throughput and the per-level compress speed are running averages of
+    what was actually observed. With fixed_level set, that level is always used.
+    """
+
+    def __init__(self, dictionary: bool = False, fixed_level: int | None = None):
+        self.fixed_level = fixed_level
+        self._lock = threading.Lock()
+        profiles = DICTIONARY_LEVEL_PROFILES if dictionary else LEVEL_PROFILES
+        self._speed = {level: mb_s * 1024 * 1024 for level, (mb_s, _) in profiles.items()}
+        self._ratio = {level: ratio for level, (_, ratio) in profiles.items()}
+        self._throughput: float | None = None
+        self._min_upload_seconds: float | None = None
+
+    @property
+    def throughput(self) -> float:
+        """Estimated link throughput in bytes/s."""
+        return self._throughput or DEFAULT_THROUGHPUT
+
+    def choose(self, size: int) -> int:
+        if self.fixed_level is not None:
+            return self.fixed_level
+        if size <= SMALL_PAYLOAD_BYTES:
+            return max(self._speed)
+
+        with self._lock:
+            throughput = self.throughput
+            return min(self._speed, key=lambda level: size / self._speed[level] + size / self._ratio[level] / throughput)
+
+    def observe_compress(self, level: int, size: int, seconds: float):
+        if level not in self._speed or seconds <= 0 or size <= SMALL_PAYLOAD_BYTES:
+            return
+        with self._lock:
+            self._speed[level] += EWMA_ALPHA * (size / seconds - self._speed[level])
+
+    def observe_upload(self, size: int, seconds: float):
+        """
+        Record one upload. The fastest upload seen so far approximates the fixed
+        per-request round trip, which is subtracted before estimating bandwidth.
+        """
+        if seconds <= 0:
+            return
+        with self._lock:
+            if self._min_upload_seconds is None or seconds < self._min_upload_seconds:
+                self._min_upload_seconds = seconds
+            transfer_seconds = seconds - self._min_upload_seconds
+            if size <= SMALL_PAYLOAD_BYTES or transfer_seconds <= 0:
+                return
+            sample = size / transfer_seconds
+            if self._throughput is None:
+                self._throughput = sample
+            else:
+                self._throughput += EWMA_ALPHA * (sample - self._throughput)
+
+
+class CompressorCache:
+    """
+    Reuses one ZstdCompressor per thread and level. Compressors are not thread-safe,
+    but building one (and digesting a dictionary into it) per file is wasted work.
+    """
+
+    def __init__(self, dictionary: zstd.ZstdCompressionDict | None = None):
+        self.dictionary = dictionary
+        self._local = threading.local()
+
+    def get(self, level: int) -> zstd.ZstdCompressor:
+        compressors = getattr(self._local, "compressors", None)
+        if compressors is None:
+            compressors = self._local.compressors = {}
+        if level not in compressors:
+            compressors[level] = zstd.ZstdCompressor(level=level, dict_data=self.dictionary)
+        return compressors[level]
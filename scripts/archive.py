@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Inspect and tidy yt-dlp's download archive (yt-dlp-archive.txt).
+
+    archive.py check ID [ID ...]   whether each video ID is archived
+    archive.py missing             archived IDs with no transcript under BASE_DIR
+    archive.py compact             drop duplicate and blank lines
+"""
+
+import argparse
+import sys
+
+from _archive import ARCHIVE_FILE, DownloadArchive
+from _index import TranscriptIndex
+
+# Ensure UTF-8 output for terminal
+if sys.stdout.encoding != "utf-8":
+    sys.stdout.reconfigure(encoding="utf-8")  # type: ignore
+
+
+def main():
+    parser = argparse.ArgumentParser(description=f"Inspect and tidy the yt-dlp download archive ('{ARCHIVE_FILE}').")
+    parser.add_argument("--archive", default=ARCHIVE_FILE, help=f"Archive file (default: {ARCHIVE_FILE}).")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    check_parser = subparsers.add_parser("check", help="Show whether each video ID is archived.")
+    check_parser.add_argument("ids", nargs="+", help="Video IDs, e.g. dQw4w9WgXcQ or v2012345678.")
+    subparsers.add_parser("missing", help="List archived IDs that have no transcript.")
+    subparsers.add_parser("compact", help="Drop duplicate and blank lines.")
+    args = parser.parse_args()
+
+    archive = DownloadArchive(args.archive)
+
+    if args.command == "check":
+        missing = 0
+        for video_id in args.ids:
+            archived = archive.is_archived(video_id)
+            missing += not archived
+            print(f"{video_id}: {'archived' if archived else 'not archived'}")
+        sys.exit(1 if missing else 0)
+
+    if args.command == "missing":
+        with TranscriptIndex() as index:
+            entries = archive.without_transcript(index)
+        for entry in entries:
+            print(entry)
+        print(f"\n{len(entries)} of {len(archive)} archived entries have no transcript.")
+        return
+
+    removed = archive.compact()
+    print(f"Removed {removed} duplicate or blank lines from '{args.archive}'. {len(archive)} entries left.")
+
+
+if __name__ == "__main__":
+    main()
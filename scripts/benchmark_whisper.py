@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+Benchmark whisper settings against a fixed sample of audio clips.
+
+Every combination of the given models, compute types, batch sizes and line
+widths is run over the same clips, and records wall time, realtime factor,
+peak memory of the whisper process, and how far the output is from each
+clip's reference .srt (word error rate). Results are printed as a table and
+written as JSON so settings can be picked on speed vs. quality.
+
+Clips are media files in --clips; a clip's reference is the .srt with the same
+name next to it. --whisper can point at a stub executable to try the harness.
+"""
+
+import argparse
+import ctypes
+import difflib
+import itertools
+import json
+import os
+import random
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from _srt import iter_cues
+from _whisper import (
+    DEFAULT_SETTINGS,
+    MEDIA_EXTENSIONS,
+    WHISPER_EXECUTABLE,
+    WhisperSettings,
+    build_command,
+    get_whisper_command,
+    probe_duration,
+    realtime_factor,
+)
+
+# --- Configuration ---
+
+DEFAULT_CLIPS_DIR = "benchmark-clips"
+DEFAULT_SAMPLE = 5
+DEFAULT_JSON_FILE = "benchmark_whisper.json"
+
+# --- End Configuration ---
+
+WORD_PATTERN = re.compile(r"[\w']+")
+
+
+def parse_list(spec: str, cast=str) -> list:
+    """'a,b,c' into [a, b, c], cast to the given type, in order and without duplicates."""
+    return list(dict.fromkeys(cast(part.strip()) for part in spec.split(",") if part.strip()))
+
+
+def find_clips(clips_dir: str) -> list[str]:
+    return sorted(os.path.join(clips_dir, f) for f in os.listdir(clips_dir) if f.endswith(MEDIA_EXTENSIONS))
+
+
+def srt_words(path: str) -> list[str]:
+    """The transcript's words, lowercased and without punctuation, so only wording is compared."""
+    return [word for cue in iter_cues(path) for word in WORD_PATTERN.findall(cue.text.lower())]
+
+
+def word_error_rate(reference: list[str], hypothesis: list[str]) -> float:
+    """
+    Substitutions, deletions and insertions per reference word. The alignment comes
+    from difflib rather than a full edit distance, which keeps hour-long clips
+    fast at the cost of sometimes counting an edit or two extra.
+    """
+    if not reference:
+        return 0.0 if not hypothesis else 1.0
+    edits = 0
+    matcher = difflib.SequenceMatcher(None, reference, hypothesis, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag != "equal":
+            edits += max(i2 - i1, j2 - j1)
+    return edits / len(reference)
+
+
+def _peak_memory_windows(proc: subprocess.Popen) -> int | None:
+    """PeakWorkingSetSize of a finished process, read through its still-open handle."""
+
+    class ProcessMemoryCounters(ctypes.Structure):
+        _fields_ = [
+            ("cb", ctypes.c_ulong),
+            ("PageFaultCount", ctypes.c_ulong),
+            ("PeakWorkingSetSize", ctypes.c_size_t),
+            ("WorkingSetSize", ctypes.c_size_t),
+            ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+            ("PagefileUsage", ctypes.c_size_t),
+            ("PeakPagefileUsage", ctypes.c_size_t),
+        ]
+
+    counters = ProcessMemoryCounters()
+    counters.cb = ctypes.sizeof(counters)
+    handle = int(proc._handle)  # type: ignore[attr-defined]
+    if not ctypes.windll.psapi.GetProcessMemoryInfo(handle, ctypes.byref(counters), counters.cb):  # type: ignore[attr-defined]
+        return None
+    return counters.PeakWorkingSetSize
+
+
+def run_measured(command: list[str], log_path: str) -> tuple[int, float, int | None]:
+    """
+    Run a command with its output sent to log_path. Returns (exit code, wall seconds,
+    peak resident memory in bytes or None if the platform cannot tell). This is host
+    memory only; GPU memory is not visible here.
+    """
+    with open(log_path, "w", encoding="utf-8") as log:
+        start = time.perf_counter()
+        proc = subprocess.Popen(command, stdout=log, stderr=subprocess.STDOUT, stdin=subprocess.DEVNULL)
+
+        if sys.platform == "win32":
+            returncode = proc.wait()
+            seconds = time.perf_counter() - start
+            return returncode, seconds, _peak_memory_windows(proc)
+
+        _, status, usage = os.wait4(proc.pid, 0)
+        seconds = time.perf_counter() - start
+        proc.returncode = os.waitstatus_to_exitcode(status)
+        # ru_maxrss is in bytes on macOS and kilobytes everywhere else.
+        peak = usage.ru_maxrss if sys.platform == "darwin" else usage.ru_maxrss * 1024
+        return proc.returncode, seconds, peak
+
+
+def run_case(whisper_cmd: str, settings: WhisperSettings, clips: list[str], durations: dict[str, float | None], work_dir: str) -> dict:
+    """Transcribe every clip with one set of settings and score the output."""
+    clip_results = []
+    for clip in clips:
+        stem = os.path.splitext(os.path.basename(clip))[0]
+        out_dir = tempfile.mkdtemp(dir=work_dir)
+        log_path = os.path.join(out_dir, "whisper.log")
+        returncode, seconds, peak = run_measured(build_command(whisper_cmd, clip, settings, output_dir=out_dir), log_path)
+
+        out_srt = os.path.join(out_dir, stem + ".srt")
+        reference = os.path.splitext(clip)[0] + ".srt"
+        ok = returncode == 0 and os.path.exists(out_srt)
+        wer = None
+        cues = None
+        if ok:
+            cues = sum(1 for _ in iter_cues(out_srt))
+            if os.path.exists(reference):
+                wer = word_error_rate(srt_words(reference), srt_words(out_srt))
+        clip_results.append(
+            {
+                "clip": os.path.basename(clip),
+                "ok": ok,
+                "exitCode": returncode,
+                "wallSeconds": seconds,
+                "audioSeconds": durations[clip],
+                "realtimeFactor": realtime_factor(durations[clip], seconds),
+                "peakMemoryBytes": peak,
+                "cues": cues,
+                "wer": wer,
+            }
+        )
+        shutil.rmtree(out_dir, ignore_errors=True)
+
+    done = [c for c in clip_results if c["ok"]]
+    scored = [c["wer"] for c in done if c["wer"] is not None]
+    peaks = [c["peakMemoryBytes"] for c in clip_results if c["peakMemoryBytes"] is not None]
+    wall = sum(c["wallSeconds"] for c in done)
+    audio = sum(c["audioSeconds"] or 0.0 for c in done)
+    return {
+        "settings": dict(settings),
+        "clips": clip_results,
+        "failed": len(clip_results) - len(done),
+        "wallSeconds": wall,
+        "realtimeFactor": realtime_factor(audio, wall) if all(c["audioSeconds"] for c in done) else None,
+        "peakMemoryBytes": max(peaks) if peaks else None,
+        "wer": sum(scored) / len(scored) if scored else None,
+    }
+
+
+def print_table(results: list[dict]):
+    header = (
+        f"{'Model':<22}  {'Compute':<8}  {'Batch':>5}  {'Width':>5}  {'Wall s':>8}  {'RTF':>7}  {'Peak MB':>8}  {'WER %':>6}  {'Failed':>6}"
+    )
+    print("\n" + header)
+    print("-" * len(header))
+    for r in results:
+        s = r["settings"]
+        rtf = f"{r['realtimeFactor']:.1f}x" if r["realtimeFactor"] else "-"
+        peak = f"{r['peakMemoryBytes'] / 1024 / 1024:.0f}" if r["peakMemoryBytes"] else "-"
+        wer = f"{r['wer'] * 100:.2f}" if r["wer"] is not None else "-"
+        print(
+            f"{s['model']:<22}  {s['compute_type']:<8}  {s['batch_size']:>5}  {s['max_line_width']:>5}  "
+            f"{r['wallSeconds']:>8.1f}  {rtf:>7}  {peak:>8}  {wer:>6}  {r['failed']:>6}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark whisper settings for speed and quality on a fixed sample of clips.")
+    parser.add_argument(
+        "--clips",
+        default=DEFAULT_CLIPS_DIR,
+        help=f"Folder of media clips, each with an optional reference .srt of the same name (default: {DEFAULT_CLIPS_DIR}).",
+    )
+    parser.add_argument("--sample", type=int, default=DEFAULT_SAMPLE, help=f"Number of clips to sample (default: {DEFAULT_SAMPLE}).")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for the sample, so runs are comparable (default: 0).")
+    parser.add_argument(
+        "--model", default=DEFAULT_SETTINGS["model"], help=f"Models to test, comma separated (default: {DEFAULT_SETTINGS['model']})."
+    )
+    parser.add_argument(
+        "--compute-type",
+        default=DEFAULT_SETTINGS["compute_type"],
+        help=f"Compute types to test, e.g. float32,float16,int8 (default: {DEFAULT_SETTINGS['compute_type']}).",
+    )
+    parser.add_argument(
+        "--batch-size",
+        default=str(DEFAULT_SETTINGS["batch_size"]),
+        help=f"Batch sizes to test, e.g. 8,16,32 (default: {DEFAULT_SETTINGS['batch_size']}).",
+    )
+    parser.add_argument(
+        "--max-line-width",
+        default=str(DEFAULT_SETTINGS["max_line_width"]),
+        help=f"Line widths to test (default: {DEFAULT_SETTINGS['max_line_width']}).",
+    )
+    parser.add_argument("--whisper", default=WHISPER_EXECUTABLE, help=f"Whisper executable to run (default: {WHISPER_EXECUTABLE}).")
+    parser.add_argument("--json", default=DEFAULT_JSON_FILE, help=f"Where to write the results (default: {DEFAULT_JSON_FILE}).")
+    args = parser.parse_args()
+
+    try:
+        batch_sizes = parse_list(args.batch_size, int)
+        line_widths = parse_list(args.max_line_width, int)
+    except ValueError as e:
+        parser.error(f"invalid number: {e}")
+
+    if not os.path.isdir(args.clips):
+        print(f"Error: Clips folder '{args.clips}' not found. Put a few media files (and reference .srt files) in it.")
+        sys.exit(1)
+
+    all_clips = find_clips(args.clips)
+    if not all_clips:
+        print(f"No media files found in '{args.clips}'.")
+        sys.exit(1)
+
+    clips = sorted(random.Random(args.seed).sample(all_clips, min(args.sample, len(all_clips))))
+    durations = {clip: probe_duration(clip) for clip in clips}
+    references = sum(1 for clip in clips if os.path.exists(os.path.splitext(clip)[0] + ".srt"))
+    print(f"Sampled {len(clips)} of {len(all_clips)} clips ({references} with a reference .srt).")
+
+    whisper_cmd = get_whisper_command(args.whisper)
+    matrix = list(itertools.product(parse_list(args.model), parse_list(args.compute_type), batch_sizes, line_widths))
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix="benchmark-whisper-") as work_dir:
+        for i, (model, compute_type, batch_size, line_width) in enumerate(matrix, start=1):
+            print(f"[{i}/{len(matrix)}] {model}, {compute_type}, batch {batch_size}, width {line_width}...", flush=True)
+            settings = DEFAULT_SETTINGS.copy()
+            settings.update(model=model, compute_type=compute_type, batch_size=batch_size, max_line_width=line_width)
+            results.append(run_case(whisper_cmd, settings, clips, durations, work_dir))
+
+    print_table(results)
+
+    report = {
+        "generated": datetime.now().isoformat(timespec="seconds"),
+        "sample": {
+            "clips": [os.path.basename(clip) for clip in clips],
+            "seed": args.seed,
+            "audioSeconds": {os.path.basename(clip): d for clip, d in durations.items()},
+        },
+        "results": results,
+    }
+    with open(args.json, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"\nResults written to '{args.json}'.")
+
+
+if __name__ == "__main__":
+    main()
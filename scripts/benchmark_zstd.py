@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Benchmark zstd levels against real transcript payloads.
+
+Payloads are built exactly as upload_transcripts.py builds them. Every level is
+run with and without a trained dictionary, and single- vs multi-threaded, and
+reports compression ratio, compress MB/s and decompress MB/s. Results are
+printed as a table and written as JSON so upload changes can be compared.
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime
+
+import zstandard as zstd
+from _common import BASE_DIR
+from _zstd_utils import DICT_DIR, current_dictionary_id, load_dictionary, split_samples, train_dictionary
+from upload_transcripts import build_payload, encode_payload, find_transcripts
+
+# --- Configuration ---
+
+DEFAULT_LEVELS = "1-22"
+DEFAULT_SAMPLE = 20
+DEFAULT_JSON_FILE = "benchmark_zstd.json"
+
+# --- End Configuration ---
+
+
+def parse_levels(spec: str) -> list[int]:
+    """Parse '1-22', '3,9,19' or a mix like '1-5,19' into a sorted list of levels."""
+    levels: set[int] = set()
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            start, end = part.split("-", 1)
+            levels.update(range(int(start), int(end) + 1))
+        else:
+            levels.add(int(part))
+
+    bad = [level for level in levels if not 1 <= level <= 22]
+    if bad:
+        raise ValueError(f"levels must be between 1 and 22, got {bad}")
+    return sorted(levels)
+
+
+def read_payload(root: str, file: str, streamer_name: str) -> bytes | None:
+    with open(os.path.join(root, file), encoding="utf-8") as f:
+        payload = build_payload(streamer_name, file, f.read())
+    return encode_payload(payload) if payload else None
+
+
+def get_dictionary(args, held_out: list[tuple[str, str, str]]) -> zstd.ZstdCompressionDict | None:
+    """
+    The dictionary to benchmark: the given or current trained version, or one trained
+    here on files outside the sample so the results are not flattered. Raises
+    ValueError if --dictionary names no usable dictionary.
+    """
+    if args.no_dictionary:
+        return None
+
+    if args.dictionary or current_dictionary_id() is not None:
+        try:
+            dict_id = None if args.dictionary in (None, "current") else int(args.dictionary)
+        except ValueError:
+            raise ValueError(f"expected a dictionary ID or 'current', got {args.dictionary!r}") from None
+        try:
+            dictionary = load_dictionary(dict_id)
+        except FileNotFoundError as e:
+            if dict_id is None:
+                raise ValueError(str(e)) from None
+            raise ValueError(f"no dictionary {dict_id} in '{DICT_DIR}'") from None
+        print(f"Using trained dictionary {dictionary.dict_id()}.")
+        return dictionary
+
+    print(f"No trained dictionary found. Training a temporary one on {len(held_out)} files outside the sample...")
+    payloads = [p for p in (read_payload(*item) for item in held_out) if p]
+    if not payloads:
+        print("No files left to train on. Skipping dictionary runs.")
+        return None
+    return train_dictionary(split_samples(payloads))
+
+
+def run_case(payloads: list[bytes], level: int, dictionary, threads: int, repeat: int) -> dict:
+    """Compress and decompress every payload, keeping the best time of `repeat` runs."""
+    cctx = zstd.ZstdCompressor(level=level, dict_data=dictionary, threads=threads)
+    dctx = zstd.ZstdDecompressor(dict_data=dictionary)
+    total_in = sum(len(p) for p in payloads)
+
+    compress_seconds = float("inf")
+    decompress_seconds = float("inf")
+    frames: list[bytes] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        frames = [cctx.compress(p) for p in payloads]
+        compress_seconds = min(compress_seconds, time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for frame in frames:
+            dctx.decompress(frame)
+        decompress_seconds = min(decompress_seconds, time.perf_counter() - start)
+
+    total_out = sum(len(f) for f in frames)
+    mb = total_in / 1024 / 1024
+    return {
+        "level": level,
+        "dictionary": dictionary.dict_id() if dictionary else None,
+        "threads": threads,
+        "inputBytes": total_in,
+        "outputBytes": total_out,
+        "ratio": total_in / total_out,
+        "compressMBps": mb / compress_seconds if compress_seconds else 0.0,
+        "decompressMBps": mb / decompress_seconds if decompress_seconds else 0.0,
+        "compressSeconds": compress_seconds,
+        "decompressSeconds": decompress_seconds,
+    }
+
+
+def print_table(results: list[dict]):
+    header = f"{'Level':>5}  {'Dict':>4}  {'Threads':>7}  {'Ratio':>6}  {'Comp MB/s':>9}  {'Decomp MB/s':>11}  {'Size KB':>9}"
+    print("\n" + header)
+    print("-" * len(header))
+    for r in results:
+        print(
+            f"{r['level']:>5}  {'yes' if r['dictionary'] else 'no':>4}  {r['threads'] or 'single':>7}  {r['ratio']:>6.3f}  "
+            f"{r['compressMBps']:>9.1f}  {r['decompressMBps']:>11.1f}  {r['outputBytes'] / 1024:>9.1f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark zstd levels against real transcript payloads.")
+    parser.add_argument("--levels", default=DEFAULT_LEVELS, help=f"Levels to test, e.g. 1-22 or 3,9,19 (default: {DEFAULT_LEVELS}).")
+    parser.add_argument("--sample", type=int, default=DEFAULT_SAMPLE, help=f"Number of transcripts to sample (default: {DEFAULT_SAMPLE}).")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for the sample, so runs are comparable (default: 0).")
+    parser.add_argument(
+        "--threads",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Worker threads for the multi-threaded runs (default: CPU count). Use 0 to skip them.",
+    )
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per case; the fastest is kept (default: 1).")
+    parser.add_argument(
+        "--dictionary",
+        metavar="ID",
+        help="Dictionary to test (default: the current trained version, or a temporary one trained outside the sample).",
+    )
+    parser.add_argument("--no-dictionary", action="store_true", help="Skip the dictionary runs.")
+    parser.add_argument("--json", default=DEFAULT_JSON_FILE, help=f"Where to write the results (default: {DEFAULT_JSON_FILE}).")
+    args = parser.parse_args()
+
+    try:
+        levels = parse_levels(args.levels)
+    except ValueError as e:
+        parser.error(f"invalid --levels: {e}")
+
+    if not os.path.isdir(BASE_DIR):
+        print(f"Error: Base directory '{BASE_DIR}' not found.")
+        sys.exit(1)
+
+    files = find_transcripts()
+    if not files:
+        print("No .srt files found to benchmark.")
+        sys.exit(1)
+
+    rng = random.Random(args.seed)
+    sample = rng.sample(files, min(args.sample, len(files)))
+    sampled = set(sample)
+    held_out = [f for f in files if f not in sampled]
+
+    payloads = [p for p in (read_payload(*item) for item in sample) if p]
+    total_mb = sum(len(p) for p in payloads) / 1024 / 1024
+    print(f"Sampled {len(payloads)} payloads ({total_mb:.1f} MB) from {len(files)} transcripts.")
+
+    try:
+        dictionary = get_dictionary(args, held_out)
+    except ValueError as e:
+        parser.error(f"invalid --dictionary: {e}")
+    dictionaries = [None, dictionary] if dictionary else [None]
+    # threads=0 is zstd's single-threaded mode; threads=1 already hands the work to one worker thread.
+    thread_counts = [0, args.threads] if args.threads > 0 else [0]
+
+    results = []
+    cases = [(level, d, t) for level in levels for d in dictionaries for t in thread_counts]
+    for i, (level, d, threads) in enumerate(cases, start=1):
+        mode = f"{threads} thread(s)" if threads else "single-threaded"
+        print(f"\r[{i}/{len(cases)}] level {level}, {'dictionary' if d else 'no dictionary'}, {mode}...", end="", flush=True)
+        results.append(run_case(payloads, level, d, threads, args.repeat))
+    print()
+
+    print_table(results)
+
+    report = {
+        "generated": datetime.now().isoformat(timespec="seconds"),
+        "sample": {
+            "files": [file for _, file, _ in sample],
+            "seed": args.seed,
+            "payloads": len(payloads),
+            "bytes": sum(len(p) for p in payloads),
+        },
+        "results": results,
+    }
+    with open(args.json, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"\nResults written to '{args.json}'.")
+
+
+if __name__ == "__main__":
+    main()
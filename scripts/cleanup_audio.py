@@ -1,13 +1,34 @@
 #!/usr/bin/env python3
 
+import argparse
 import os
 import sys
 
+from _hallucination import assess_file
+from _index import TranscriptIndex
+from _whisper import JOURNAL_FILE, JobJournal, srt_path_for
 
-def clear_media_files():
+
+def looks_hallucinated(journal: JobJournal, media_path: str) -> bool:
     """
-    Finds and deletes specific media files from the 'Transcript' directory
-    after user confirmation.
+    Whether the media's transcript was flagged as hallucinated. Transcripts from
+    before the check existed have no verdict in the journal and are scored here.
+    """
+    entry = journal.get(media_path)
+    quality = entry.get("quality") if entry else None
+    if quality is not None:
+        return quality["flagged"]
+    srt_path = srt_path_for(media_path)
+    if not os.path.exists(srt_path):
+        return False
+    return assess_file(srt_path, entry["duration"] if entry else None)["flagged"]
+
+
+def clear_media_files(include_flagged: bool = False):
+    """
+    Finds (via the local index) and deletes specific media files from the
+    'Transcript' directory after user confirmation. Media whose transcript looks
+    hallucinated is kept unless include_flagged is set, so it can be redone.
     """
 
     base_dir = "Transcript"
@@ -28,27 +49,41 @@ def clear_media_files():
     if confirmation == "y":
         print("Scanning and deleting files...")
         deleted_count = 0
+        kept = []
+
+        with TranscriptIndex() as index:
+            media_files = index.query(ext=media_extensions, include_unparsed=True)
+        journal = JobJournal(JOURNAL_FILE)
+
+        for row in media_files:
+            full_path = row["path"]
+            if not include_flagged and looks_hallucinated(journal, full_path):
+                kept.append(full_path)
+                continue
 
-        # os.walk recurses through the directory tree
-        for root, _dirs, files in os.walk(base_dir):
-            for file in files:
-                # Check if the file ends with any of the target extensions
-                if file.endswith(media_extensions):
-                    full_path = os.path.join(root, file)
-
-                    try:
-                        os.remove(full_path)
-                        deleted_count += 1
-                        # Optional: print every file deleted
-                        # print(f"Deleted: {full_path}")
-                    except OSError as e:
-                        print(f"Error: Could not delete {full_path}: {e}")
+            try:
+                os.remove(full_path)
+                deleted_count += 1
+                # Optional: print every file deleted
+                # print(f"Deleted: {full_path}")
+            except OSError as e:
+                print(f"Error: Could not delete {full_path}: {e}")
 
         print(f"Deleted {deleted_count} media files.")
+        if kept:
+            print(f"\nKept {len(kept)} media file(s) whose transcript looks hallucinated:")
+            for path in kept:
+                print(f"  {path}")
+            print("Delete their .srt and run transcribe_audio.py to redo them, or pass --include-flagged to delete them anyway.")
 
     else:
         print("Operation canceled.")
 
 
 if __name__ == "__main__":
-    clear_media_files()
+    parser = argparse.ArgumentParser(description="Delete the downloaded media files under Transcript.")
+    parser.add_argument(
+        "--include-flagged", action="store_true", help="Also delete media whose transcript looks hallucinated (kept by default)."
+    )
+    args = parser.parse_args()
+    clear_media_files(include_flagged=args.include_flagged)
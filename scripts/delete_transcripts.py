@@ -1,11 +1,12 @@
 #!/usr/bin/env python3
 
 import argparse
-import os
-import re
 import sys
 from pathlib import Path
 
+from _archive import ARCHIVE_FILE, DownloadArchive
+from _index import TranscriptIndex
+
 # Ensure UTF-8 output for terminal
 if sys.stdout.encoding != "utf-8":
     sys.stdout.reconfigure(encoding="utf-8")  # type: ignore
@@ -16,16 +17,6 @@ def parse_date(date_str):
     return date_str.replace("-", "")
 
 
-def get_id_from_filename(filename):
-    # Extract ID between [ and ] at the end before extension.
-    # Use [^\[\]]+ to ensure we don't capture multiple sets of brackets.
-    # We want the LAST set of brackets.
-    match = re.search(r"\[([^\[\]]+)\]\.srt$", filename)
-    if match:
-        return match.group(1)
-    return None
-
-
 def main():
     parser = argparse.ArgumentParser(description="Delete transcript files and clean archive based on date.")
     parser.add_argument("date", help="Date in YYYY-MM-DD, YYYY-MM, or YYYY format.")
@@ -38,41 +29,20 @@ def main():
 
     date_prefix = parse_date(args.date)
     transcript_dir = Path("Transcript")
-    archive_file = Path("yt-dlp-archive.txt")
+    archive_file = Path(ARCHIVE_FILE)
 
     allowed_types = {"Stream", "Video", "TwitchVod"}
 
-    matched_files = []
-    matched_ids = set()
-
     if not transcript_dir.exists():
         print(f"Error: Transcript directory '{transcript_dir}' not found.")
         return
 
-    # Walk through transcripts
-    for root, _dirs, files in os.walk(transcript_dir):
-        for file in files:
-            if not file.endswith(".srt"):
-                continue
-
-            # Check date prefix
-            if not file.startswith(date_prefix):
-                continue
-
-            # Split filename to get stream type
-            # Format: 20240101 - Stream Type - Title - [ID].srt
-            parts = file.split(" - ")
-            if len(parts) < 2:
-                continue
-
-            stream_type = parts[1]
-            if stream_type not in allowed_types:
-                continue
+    # Look up transcripts by date prefix and stream type in the local index
+    with TranscriptIndex() as index:
+        rows = index.query(ext=".srt", date_prefix=date_prefix, types=allowed_types)
 
-            video_id = get_id_from_filename(file)
-            if video_id:
-                matched_files.append(Path(root) / file)
-                matched_ids.add(video_id)
+    matched_files = [Path(row["path"]) for row in rows]
+    matched_ids = {row["id"] for row in rows}
 
     if not matched_files:
         print(f"No matching files found for date prefix '{date_prefix}'.")
@@ -91,22 +61,7 @@ def main():
     # 1. Update archive file
     if archive_file.exists():
         print(f"Cleaning up {archive_file}...")
-        with open(archive_file, encoding="utf-8") as f:
-            lines = f.readlines()
-
-        original_count = len(lines)
-        # yt-dlp-archive.txt format: "extractor ID"
-        new_lines = []
-        for line in lines:
-            parts = line.strip().split()
-            if len(parts) >= 2 and parts[1] in matched_ids:
-                continue
-            new_lines.append(line)
-
-        removed_count = original_count - len(new_lines)
-
-        with open(archive_file, "w", encoding="utf-8") as f:
-            f.writelines(new_lines)
+        removed_count = DownloadArchive(str(archive_file)).remove_ids(matched_ids)
         print(f"Removed {removed_count} lines from {archive_file}.")
     else:
         print(f"Warning: {archive_file} not found, skipping archive cleanup.")
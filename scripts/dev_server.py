@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for archived-transcript-server.
+
+Implements just enough of the server API (POST /transcript, POST
+/transcripts/batch, GET /info) for the upload/verify scripts to run against
+offline. /info also answers If-None-Match with 304, ?since=<cursor> with only
+the transcripts stored after that cursor, and ?limit=N with pages linked by a
+Link header, and compresses responses with zstd when asked.
+verify_transcript.py uses each of these when a server offers them. Everything
+is held in memory and lost on exit. Uploads compressed with a trained
+dictionary are decoded using the matching file from zstd-dicts/.
+
+    uv run .\\scripts\\dev_server.py --port 8080 --latency-ms 50
+
+Then point `server_url` in config.yaml at http://localhost:8080.
+"""
+
+import argparse
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+import zstandard as zstd
+from _zstd_utils import load_dictionary
+
+# --- Configuration ---
+
+DEFAULT_PORT = 8080
+
+# Fields returned by /info for each stored transcript. "hash" is the sha256 of
+# the srt text, the same hash the upload manifest records.
+INFO_FIELDS = ("streamer", "date", "streamType", "streamTitle", "id", "hash")
+
+# --- End Configuration ---
+
+
+class DictionaryCache:
+    """Loads trained zstd dictionaries from DICT_DIR on first use, keyed by dictionary ID."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._dicts: dict[int, zstd.ZstdCompressionDict] = {}
+
+    def get(self, dict_id: int) -> zstd.ZstdCompressionDict:
+        with self._lock:
+            if dict_id not in self._dicts:
+                self._dicts[dict_id] = load_dictionary(dict_id)
+            return self._dicts[dict_id]
+
+
+class TranscriptStore:
+    """
+    Thread-safe in-memory transcript table keyed by stream ID. Every put bumps
+    a revision counter, which doubles as the /info ETag and ?since cursor.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._items: dict[str, dict] = {}
+        self._revisions: dict[str, int] = {}
+        self.revision = 0
+
+    def put(self, payload: dict):
+        payload = {**payload, "hash": hashlib.sha256(payload.get("srt", "").encode("utf-8")).hexdigest()}
+        with self._lock:
+            self.revision += 1
+            self._items[payload["id"]] = payload
+            self._revisions[payload["id"]] = self.revision
+
+    def info(self, since: int = 0) -> list[dict]:
+        """Every stored transcript's /info fields, or only those stored after revision `since`."""
+        with self._lock:
+            return [{k: item.get(k, "") for k in INFO_FIELDS} for item_id, item in self._items.items() if self._revisions[item_id] > since]
+
+
+class Handler(BaseHTTPRequestHandler):
+    server: "DevServer"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+    def _send_json(self, code: int, body, headers: dict[str, str] | None = None):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        if "zstd" in self.headers.get("Accept-Encoding", "").lower():
+            data = zstd.ZstdCompressor().compress(data)
+            self.send_header("Content-Encoding", "zstd")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_info(self, query: dict[str, list[str]]):
+        """
+        The full /info list, or with since=<cursor> a delta object. Both carry the
+        current revision as ETag and X-Info-Cursor, and a matching If-None-Match gets 304.
+        With limit=N the list is paged, each page linking the next with Link: rel="next".
+        """
+        since = query.get("since", [""])[0]
+        store = self.server.store
+        revision = store.revision
+        etag = f'"{revision}"'
+        headers = {"ETag": etag, "X-Info-Cursor": str(revision)}
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if not since:
+            items = store.info()
+            try:
+                limit = int(query.get("limit", ["0"])[0])
+                offset = int(query.get("offset", ["0"])[0])
+            except ValueError:
+                self._send_json(400, {"error": "limit and offset must be numbers"})
+                return
+            if limit > 0:
+                if offset + limit < len(items):
+                    headers["Link"] = f'</info?limit={limit}&offset={offset + limit}>; rel="next"'
+                items = items[offset : offset + limit]
+            self._send_json(200, items, headers)
+            return
+        try:
+            cursor = int(since)
+        except ValueError:
+            self._send_json(400, {"error": "since must be a cursor from X-Info-Cursor"})
+            return
+        # This store never deletes, so "deleted" is always empty.
+        self._send_json(200, {"cursor": str(revision), "changed": store.info(since=cursor), "deleted": []}, headers)
+
+    def _read_body(self) -> bytes:
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length)
+        if self.headers.get("Content-Encoding", "").lower() == "zstd":
+            # Prefer the explicit header; fall back to the ID in the zstd frame header.
+            dict_id = int(self.headers.get("X-Zstd-Dictionary-Id") or zstd.get_frame_parameters(body).dict_id)
+            dict_data = self.server.dictionaries.get(dict_id) if dict_id else None
+            body = zstd.ZstdDecompressor(dict_data=dict_data).decompress(body)
+        return body
+
+    def _simulate_latency(self):
+        if self.server.latency > 0:
+            time.sleep(self.server.latency)
+
+    def do_GET(self):
+        self._simulate_latency()
+        path, _, query = self.path.partition("?")
+        if path == "/info":
+            self._send_info(parse_qs(query))
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        self._simulate_latency()
+        path = self.path.split("?")[0]
+        if path == "/transcripts/batch" and not self.server.batch:
+            self._send_json(404, {"error": "not found"})
+            return
+        if path not in ("/transcript", "/transcripts/batch"):
+            self._send_json(404, {"error": "not found"})
+            return
+
+        if self.server.api_key and self.headers.get("X-API-Key") != self.server.api_key:
+            self._send_json(401, {"error": "invalid api key"})
+            return
+
+        try:
+            body = self._read_body()
+        except OSError as e:
+            self._send_json(400, {"error": f"unknown zstd dictionary: {e}"})
+            return
+        except zstd.ZstdError as e:
+            self._send_json(400, {"error": f"bad payload: {e}"})
+            return
+
+        if path == "/transcript":
+            error = self._store_payload(body)
+            if error:
+                self._send_json(400, {"error": error})
+            else:
+                self._send_json(200, {"ok": True})
+            return
+
+        # NDJSON: one payload per line, each answered with its own result.
+        results = []
+        for line_no, line in enumerate(body.splitlines(), start=1):
+            if not line.strip():
+                continue
+            error = self._store_payload(line)
+            try:
+                item_id = json.loads(line).get("id")
+            except (ValueError, AttributeError):
+                item_id = None
+            result = {"id": item_id if item_id else f"line {line_no}", "ok": error is None}
+            if error:
+                result["error"] = error
+            results.append(result)
+        self._send_json(200, {"results": results})
+
+    def _store_payload(self, data: bytes) -> str | None:
+        """Validate and store one JSON payload. Returns an error message, or None on success."""
+        try:
+            payload = json.loads(data)
+        except ValueError as e:
+            return f"bad payload: {e}"
+
+        if not isinstance(payload, dict) or not payload.get("id"):
+            return "payload missing 'id'"
+
+        self.server.store.put(payload)
+        return None
+
+
+class DevServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, api_key: str = "", latency: float = 0.0, quiet: bool = False, batch: bool = True):
+        super().__init__(address, Handler)
+        self.batch = batch
+        self.store = TranscriptStore()
+        self.dictionaries = DictionaryCache()
+        self.api_key = api_key
+        self.latency = latency
+        self.quiet = quiet
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local stand-in for the archive server.")
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to bind (default: 127.0.0.1).")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"Port to listen on (default: {DEFAULT_PORT}).")
+    parser.add_argument("--api-key", default="", help="Require this X-API-Key on uploads (default: accept any).")
+    parser.add_argument(
+        "--latency-ms",
+        type=float,
+        default=0.0,
+        help="Artificial delay added to every request, to mimic a remote server.",
+    )
+    parser.add_argument("--no-batch", action="store_true", help="Answer /transcripts/batch with 404, like a server without batch support.")
+    parser.add_argument("--quiet", action="store_true", help="Do not log each request.")
+    args = parser.parse_args()
+
+    server = DevServer(
+        (args.host, args.port),
+        api_key=args.api_key,
+        latency=args.latency_ms / 1000,
+        quiet=args.quiet,
+        batch=not args.no_batch,
+    )
+    print(f"Dev server listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"\nStopped. {len(server.store.info())} transcripts received.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,20 @@
 #!/usr/bin/env python3
 
 import argparse
+import json
 import os
+import queue
+import re
 import subprocess
 import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from typing import TypedDict
 
+from _archive import ARCHIVE_FILE, DownloadArchive
 from _common import BASE_DIR, load_channels
 
 # --- Configuration ---
@@ -16,12 +25,126 @@ YT_DLP_CMD = "yt-dlp"
 
 VALID_TYPES = {"Video", "Stream", "Members", "Twitch", "TwitchVod", "External"}
 
+# Flat listings of each source are cached here, so a re-run shortly after does
+# not list every channel tab again.
+LISTING_CACHE_FILE = "yt-dlp-listing-cache.json"
+DEFAULT_LISTING_TTL_MINUTES = 60
+
 # yt-dlp ERROR/WARNING lines are mirrored to this file for post-run debugging.
 # The file is truncated at the start of each run.
 LOG_FILE = "yt-dlp-errors.log"
 
+# Sources on different hosts download at the same time, up to this many yt-dlp
+# processes in total. Within a host they run one after another by default.
+DEFAULT_PARALLEL = 2
+
+# Seconds yt-dlp waits between requests to one host. With several downloads on
+# the same host, each one waits proportionally longer so the host sees the same
+# request rate as a single download.
+SLEEP_REQUESTS = 1
+
+# With several downloads running, each one's progress is shown only when it has
+# moved on by this many percent (and when it finishes) instead of on every refresh.
+PROGRESS_STEP_PERCENT = 10
+
 # --- End Configuration ---
 
+# Terminal and log writes from concurrent downloads go through this lock so
+# lines never interleave mid-line.
+_output_lock = threading.Lock()
+
+
+# A yt-dlp progress line as printed with --newline, e.g. "[download]  42.0% of 10.00MiB at ...".
+PROGRESS_PATTERN = re.compile(r"^\[download\]\s+(\d+(?:\.\d+)?)%")
+
+
+class ListedItem(TypedDict):
+    archive_id: str  # "<extractor> <id>", the same form yt-dlp writes to ARCHIVE_FILE
+    url: str
+
+
+class ListingCache:
+    """
+    Flat listings per source URL, kept for ttl_seconds. Safe to use from
+    several download lanes at once; every put() is saved atomically.
+    """
+
+    def __init__(self, path: str = LISTING_CACHE_FILE, ttl_seconds: float = DEFAULT_LISTING_TTL_MINUTES * 60):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._sources: dict[str, dict] = {}
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == 1:
+                self._sources = data.get("sources", {})
+        except (OSError, ValueError):
+            pass
+
+    def get(self, url: str) -> list[ListedItem] | None:
+        """The cached listing of url, or None if there is none younger than the TTL."""
+        with self._lock:
+            cached = self._sources.get(url)
+        if cached is None or time.time() - cached["fetched_at"] > self.ttl_seconds:
+            return None
+        return cached["items"]
+
+    def put(self, url: str, items: list[ListedItem]):
+        with self._lock:
+            self._sources[url] = {"fetched_at": time.time(), "items": items}
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"version": 1, "sources": self._sources}, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+
+
+def list_source(url: str) -> list[ListedItem] | None:
+    """
+    Every entry of a channel tab or playlist from one flat listing (no per-video
+    requests). Returns None if yt-dlp could not list it.
+    """
+    command = [
+        YT_DLP_CMD,
+        "--flat-playlist",
+        "--cookies",
+        "cookies.txt",
+        "--print",
+        "%(ie_key,extractor_key)s\t%(id)s\t%(url,webpage_url)s",
+        url,
+    ]
+    try:
+        result = subprocess.run(command, capture_output=True, text=True, encoding="utf-8", errors="replace")
+    except FileNotFoundError:
+        _print(f"\n[Error] '{YT_DLP_CMD}' command not found.", "Please ensure yt-dlp is installed and in your system's PATH.")
+        sys.exit(1)
+    if result.returncode != 0:
+        return None
+
+    items: list[ListedItem] = []
+    for line in result.stdout.splitlines():
+        parts = line.split("\t")
+        if len(parts) != 3 or parts[2] == "NA":
+            continue
+        ie_key, video_id, entry_url = parts
+        items.append({"archive_id": f"{ie_key.lower()} {video_id}", "url": entry_url})
+    return items
+
+
+def discover_new(url: str, archive: DownloadArchive, cache: ListingCache) -> tuple[list[str], int] | None:
+    """
+    URLs of the source's entries that are not in the archive, and how many entries
+    were listed. Uses the cached listing when it is fresh. None if the source
+    could not be listed, in which case the whole source should be handed to yt-dlp.
+    """
+    items = cache.get(url)
+    if items is None:
+        items = list_source(url)
+        if items is None:
+            return None
+        cache.put(url, items)
+    return [item["url"] for item in items if item["archive_id"] not in archive], len(items)
+
 
 def _init_log_file():
     """Truncate the log file and write a run-start header."""
@@ -29,16 +152,68 @@ def _init_log_file():
         f.write(f"=== yt-dlp run started at {datetime.now().isoformat(timespec='seconds')} ===\n")
 
 
-def _run_and_log_stderr(command: list[str], url: str, download_type: str, channel: str) -> int:
+def source_host(url: str) -> str:
+    """The host a source downloads from, used to group sources for concurrency limits."""
+    url = url.lower()
+    if "twitch.tv" in url:
+        return "twitch"
+    if "youtube.com" in url or "youtu.be" in url:
+        return "youtube"
+    return "other"
+
+
+def _print(*lines: str):
+    """Print lines while holding _output_lock, so they never land inside another download's output."""
+    with _output_lock:
+        for line in lines:
+            print(line)
+        sys.stdout.flush()
+
+
+def _append_log(text: str):
+    """Append to LOG_FILE while holding _output_lock, like the tagged yt-dlp lines."""
+    with _output_lock, open(LOG_FILE, "a", encoding="utf-8") as log:
+        log.write(text)
+
+
+def _forward_stdout(stream, tag: str):
+    """
+    Print each stdout line with the download's tag. yt-dlp runs with --newline
+    here, so every progress refresh is its own line; only one per
+    PROGRESS_STEP_PERCENT, and the final 100%, are shown.
     """
-    Run `command`, streaming stderr through to the terminal (so yt-dlp progress
-    stays visible) while appending every line to LOG_FILE. Returns the count
-    of ERROR:/WARNING: lines seen (for summary reporting).
+    shown = -PROGRESS_STEP_PERCENT
+    for line in stream:
+        if progress := PROGRESS_PATTERN.match(line):
+            percent = float(progress.group(1))
+            if percent < 100 and percent - shown < PROGRESS_STEP_PERCENT:
+                continue
+            # A new file starts over from 0%.
+            shown = -PROGRESS_STEP_PERCENT if percent >= 100 else percent
+        with _output_lock:
+            sys.stdout.write(f"[{tag}] {line}")
+            sys.stdout.flush()
+
+
+def _run_and_log_stderr(command: list[str], url: str, download_type: str, channel: str, shared_terminal: bool = True) -> int:
     """
+    Run `command`, appending every stderr line to LOG_FILE and showing it in the
+    terminal, prefixed with the channel and type so output from downloads running
+    at the same time can be told apart. Returns the count of ERROR:/WARNING:
+    lines seen (for summary reporting).
+
+    When this is the only download running (shared_terminal=False), stdout goes
+    straight to the terminal, so yt-dlp's progress bar updates in place. Otherwise
+    it is read line by line and tagged too, with progress thinned out by
+    _forward_stdout().
+    """
+    tag = f"{channel}/{download_type}"
     problem_count = 0
+    if shared_terminal:
+        command = [command[0], "--newline", *command[1:]]
     process = subprocess.Popen(
         command,
-        stdout=None,  # pass-through
+        stdout=subprocess.PIPE if shared_terminal else None,
         stderr=subprocess.PIPE,
         text=True,
         encoding="utf-8",
@@ -47,20 +222,39 @@ def _run_and_log_stderr(command: list[str], url: str, download_type: str, channe
     )
 
     assert process.stderr is not None  # PIPE guarantees this; hint for type checkers
+    stdout_thread = None
+    if process.stdout is not None:
+        stdout_thread = threading.Thread(target=_forward_stdout, args=(process.stdout, tag), daemon=True)
+        stdout_thread.start()
+
     with open(LOG_FILE, "a", encoding="utf-8") as log:
-        log.write(f"\n--- {channel} | {download_type} | {url} ---\n")
+        with _output_lock:
+            log.write(f"\n--- {channel} | {download_type} | {url} ---\n")
+            log.flush()
         for line in process.stderr:
-            sys.stderr.write(line)
-            sys.stderr.flush()
-            log.write(line)
+            with _output_lock:
+                sys.stderr.write(f"[{tag}] {line}")
+                sys.stderr.flush()
+                log.write(f"[{tag}] {line}")
+                log.flush()
             if "ERROR:" in line or "WARNING:" in line:
                 problem_count += 1
 
     process.wait()
+    if stdout_thread is not None:
+        stdout_thread.join()
     return problem_count
 
 
-def get_audio(url: str, download_type: str, channel: str):
+def get_audio(
+    url: str,
+    download_type: str,
+    channel: str,
+    downloaded_list: str | None = None,
+    host_downloads: int = 1,
+    targets: list[str] | None = None,
+    shared_terminal: bool = True,
+):
     """
     Calls yt-dlp to download audio for a given URL.
 
@@ -68,6 +262,15 @@ def get_audio(url: str, download_type: str, channel: str):
         url: The URL to download from.
         download_type: The type of content (e.g., "Members", "Video").
         channel: The streamer's name, used for the folder.
+        downloaded_list: If set, yt-dlp appends the final path of every file it
+            finishes to this file, so another process can pick them up right away.
+        host_downloads: How many downloads run against this source's host at
+            once. The wait between requests is multiplied by it to share the
+            host's request budget.
+        targets: If set, download only these entry URLs (found by
+            discover_new) instead of listing the whole source again.
+        shared_terminal: Whether other downloads may print at the same time.
+            If not, yt-dlp's output goes straight to the terminal.
     """
 
     output_template = f"{BASE_DIR}/{channel}/%(upload_date)s - {download_type} - %(title)s - [%(id)s].%(ext)s"
@@ -75,15 +278,15 @@ def get_audio(url: str, download_type: str, channel: str):
     command = [
         YT_DLP_CMD,
         "--download-archive",
-        "yt-dlp-archive.txt",
+        ARCHIVE_FILE,
         "--cookies",
         "cookies.txt",
     ]
 
     if download_type == "Members":
-        print(f"\nDownloading (Members): {channel}")
+        _print(f"\nDownloading (Members): {channel}")
     else:
-        print(f"\nDownloading (Regular): {channel} - {download_type}")
+        _print(f"\nDownloading (Regular): {channel} - {download_type}")
 
     # Filter for non-members download, it filters out members content.
     # And for members download, it filters only members content.
@@ -106,30 +309,41 @@ def get_audio(url: str, download_type: str, channel: str):
             output_template,
             "--windows-filenames",
             "--sleep-requests",
-            "1",
+            str(SLEEP_REQUESTS * host_downloads),
             "--sleep-interval",
             "15",
         ]
     )
 
+    if downloaded_list:
+        command.extend(["--print-to-file", "after_move:filepath", downloaded_list])
+
     if "twitch.tv" in url.lower():
-        print("-> Twitch URL detected, skipping thumbnail.")
+        _print("-> Twitch URL detected, skipping thumbnail.")
     else:
-        print("-> YouTube URL detected, adding thumbnail.")
+        _print("-> YouTube URL detected, adding thumbnail.")
         command.append("--write-thumbnail")
 
-    command.append(url)
+    batch_file = None
+    if targets is None:
+        command.append(url)
+    else:
+        with tempfile.NamedTemporaryFile("w", encoding="utf-8", suffix=".txt", delete=False) as f:
+            f.write("\n".join(targets) + "\n")
+            batch_file = f.name
+        command.extend(["--batch-file", batch_file])
 
     try:
-        _run_and_log_stderr(command, url, download_type, channel)
+        _run_and_log_stderr(command, url, download_type, channel, shared_terminal)
     except FileNotFoundError:
-        print(f"\n[Error] '{YT_DLP_CMD}' command not found.")
-        print("Please ensure yt-dlp is installed and in your system's PATH.")
+        _print(f"\n[Error] '{YT_DLP_CMD}' command not found.", "Please ensure yt-dlp is installed and in your system's PATH.")
         sys.exit(1)
     except Exception as e:
-        print(f"\nAn error occurred while processing {url}: {e}")
-        with open(LOG_FILE, "a", encoding="utf-8") as log:
-            log.write(f"PYTHON EXCEPTION: {e}\n")
+        _print(f"\nAn error occurred while processing {url}: {e}")
+        _append_log(f"PYTHON EXCEPTION: {e}\n")
+    finally:
+        if batch_file:
+            os.remove(batch_file)
 
 
 def update_tools():
@@ -160,6 +374,87 @@ def update_tools():
         print(f"An unknown error occurred during update: {e}")
 
 
+def validate_channels(channels: list[dict]):
+    """Exit with an error if any channel or source entry is incomplete or has an unknown type."""
+    for channel in channels:
+        name = channel.get("name")
+        if not name:
+            print("Error: channel entry missing 'name' field.")
+            sys.exit(1)
+        for source in channel.get("sources", []):
+            stype = source.get("type")
+            if stype not in VALID_TYPES:
+                print(f"Error: invalid type '{stype}' for channel '{name}'. Must be one of {VALID_TYPES}.")
+                sys.exit(1)
+            if not source.get("url"):
+                print(f"Error: source for channel '{name}' missing 'url'.")
+                sys.exit(1)
+
+
+def download_all(
+    channels: list[dict],
+    parallel: int = DEFAULT_PARALLEL,
+    per_host: int = 1,
+    downloaded_list: str | None = None,
+    listing_cache: ListingCache | None = None,
+):
+    """
+    Download every source in channels. Each host gets per_host lanes that work
+    through its sources in config order, and at most `parallel` downloads run at
+    once across all hosts, so a Twitch source does not wait for YouTube ones.
+
+    With a listing cache, each source is first listed flat and compared with the
+    download archive, and yt-dlp is only started for the new entries (or not at
+    all). Without one, yt-dlp goes through each whole source itself.
+    """
+    archive = DownloadArchive() if listing_cache else None
+    by_host: dict[str, queue.Queue] = {}
+    for channel in channels:
+        for source in channel.get("sources", []):
+            by_host.setdefault(source_host(source["url"]), queue.Queue()).put((channel["name"], source))
+
+    lanes = [jobs for jobs in by_host.values() for _ in range(max(1, per_host))]
+    if not lanes:
+        return
+    budget = threading.Semaphore(max(1, parallel))
+    # With one download at a time there is nothing to tell apart, so yt-dlp keeps the terminal.
+    shared_terminal = min(max(1, parallel), len(lanes)) > 1
+
+    def lane(jobs: queue.Queue):
+        while True:
+            try:
+                name, source = jobs.get_nowait()
+            except queue.Empty:
+                return
+            with budget:
+                targets = None
+                if listing_cache and archive is not None:
+                    # Another lane's downloads may have added entries since the last source.
+                    archive.refresh()
+                    found = discover_new(source["url"], archive, listing_cache)
+                    if found is None:
+                        _print(f"\n{name} - {source['type']}: could not list {source['url']}, letting yt-dlp go through all of it.")
+                    else:
+                        targets, listed = found
+                        _print(f"\n{name} - {source['type']}: {len(targets)} new of {listed} listed.")
+                        if not targets:
+                            continue
+                get_audio(
+                    url=source["url"],
+                    download_type=source["type"],
+                    channel=name,
+                    downloaded_list=downloaded_list,
+                    host_downloads=per_host,
+                    targets=targets,
+                    shared_terminal=shared_terminal,
+                )
+
+    with ThreadPoolExecutor(max_workers=len(lanes)) as executor:
+        # result() re-raises anything a lane raised, including sys.exit() from get_audio.
+        for future in [executor.submit(lane, jobs) for jobs in lanes]:
+            future.result()
+
+
 def main():
     parser = argparse.ArgumentParser(description="Download audio from configured channels.")
     parser.add_argument(
@@ -167,6 +462,29 @@ def main():
         action="store_true",
         help="Skip updating yt-dlp and deno before downloading.",
     )
+    parser.add_argument(
+        "--parallel",
+        type=int,
+        default=DEFAULT_PARALLEL,
+        help=f"Most downloads to run at once across all hosts (default: {DEFAULT_PARALLEL}).",
+    )
+    parser.add_argument(
+        "--per-host",
+        type=int,
+        default=1,
+        help="Downloads to run at once against one host (YouTube, Twitch). They share the host's request budget (default: 1).",
+    )
+    parser.add_argument(
+        "--no-discovery",
+        action="store_true",
+        help="Let yt-dlp go through every source itself instead of listing it first and downloading only new entries.",
+    )
+    parser.add_argument(
+        "--listing-ttl",
+        type=float,
+        default=DEFAULT_LISTING_TTL_MINUTES,
+        help=f"Minutes a source listing is reused before listing it again (default: {DEFAULT_LISTING_TTL_MINUTES}).",
+    )
     args = parser.parse_args()
 
     if not args.skip_update:
@@ -177,28 +495,14 @@ def main():
     channels = load_channels()
 
     # Validate config before running any downloads
-    for channel in channels:
-        name = channel.get("name")
-        if not name:
-            print("Error: channel entry missing 'name' field.")
-            sys.exit(1)
-        for source in channel.get("sources", []):
-            stype = source.get("type")
-            if stype not in VALID_TYPES:
-                print(f"Error: invalid type '{stype}' for channel '{name}'. Must be one of {VALID_TYPES}.")
-                sys.exit(1)
-            if not source.get("url"):
-                print(f"Error: source for channel '{name}' missing 'url'.")
-                sys.exit(1)
+    validate_channels(channels)
 
     _init_log_file()
     print(f"Errors/warnings will be logged to '{LOG_FILE}'.")
     print("\n--- Starting Downloads ---")
 
-    for channel in channels:
-        name = channel["name"]
-        for source in channel.get("sources", []):
-            get_audio(url=source["url"], download_type=source["type"], channel=name)
+    listing_cache = None if args.no_discovery else ListingCache(ttl_seconds=args.listing_ttl * 60)
+    download_all(channels, parallel=args.parallel, per_host=args.per_host, listing_cache=listing_cache)
 
     print("\n--- Download process finished. ---")
     print(f"See '{LOG_FILE}' for any errors/warnings from this run.")
@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""
+Export every transcript's cues into the columnar corpus (see _corpus.py).
+
+Only partitions (one per channel and year) whose .srt files were added,
+removed or changed since the last export are rebuilt, in parallel.
+Partitions whose transcripts are all gone are deleted.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+from _corpus import CORPUS_DIR, update_corpus
+
+# Ensure UTF-8 output for terminal
+if sys.stdout.encoding != "utf-8":
+    sys.stdout.reconfigure(encoding="utf-8")  # type: ignore
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export transcripts to a columnar corpus partitioned by channel and year.")
+    parser.add_argument("--out", default=CORPUS_DIR, help=f"Output folder (default: {CORPUS_DIR}).")
+    parser.add_argument("--full", action="store_true", help="Rebuild every partition, even unchanged ones.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Partitions to build at once (default: CPU count).")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    summary = update_corpus(args.out, full=args.full, workers=args.workers)
+    print(f"Done in {time.perf_counter() - start:.1f} s. Wrote {summary['cues']} cues to '{args.out}'.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""
+Check every .srt file under BASE_DIR for quality problems.
+
+Each file is read once, line by line, and every rule runs on the same pass:
+
+    multi_line      a cue with more than one line of text
+    backwards       a cue that ends before it starts
+    overlap         a cue that starts before the previous one ends
+    zero_length     a cue that starts and ends at the same time
+    long_cue        a cue longer than LONG_CUE_MS
+    gap             silence between two cues longer than GAP_MS
+    repeated_line   the same text in REPEAT_RUN or more cues in a row (a whisper loop)
+    censored        a word still masked with asterisks, e.g. one word_fixer.py does not know
+    encoding        bytes that are not valid UTF-8, U+FFFD or control characters in the text
+
+Files are linted in parallel. Results are cached in srt-lint-cache.json by
+content hash, so a rerun only parses files that actually changed. The full
+report, with per-rule counts, is written to srt-lint.json.
+
+    uv run .\\scripts\\lint_srt.py
+    uv run .\\scripts\\lint_srt.py --rule multi_line --rule censored
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+from collections import Counter
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+from typing import TypedDict
+
+from _common import BASE_DIR
+from _index import TranscriptIndex
+from _srt import format_timestamp, parse_cues
+from tqdm import tqdm
+
+# Ensure UTF-8 output for terminal
+if sys.stdout.encoding != "utf-8":
+    sys.stdout.reconfigure(encoding="utf-8")  # type: ignore
+
+# --- Configuration ---
+
+LINT_CACHE_FILE = "srt-lint-cache.json"
+LINT_REPORT_FILE = "srt-lint.json"
+
+WORKERS = os.cpu_count() or 4
+
+# Cues longer than this are reported as long_cue.
+LONG_CUE_MS = 30_000
+
+# Silences between cues longer than this are reported as gap.
+GAP_MS = 120_000
+
+# This many cues in a row with the same text are reported as repeated_line.
+REPEAT_RUN = 4
+
+# Findings kept per rule per file; the counts always include every one.
+MAX_FINDINGS_PER_RULE = 20
+
+# --- End Configuration ---
+
+# Bump when a rule changes; cached results from another version are discarded.
+LINT_VERSION = 1
+
+RULES = ("multi_line", "backwards", "overlap", "zero_length", "long_cue", "gap", "repeated_line", "censored", "encoding")
+
+# A word with one or more asterisks in it, like the masked words word_fixer.py's word_map restores.
+CENSORED_PATTERN = re.compile(r"[A-Za-z]+\*+[A-Za-z]+|[A-Za-z]+\*{2,}|\*{3,}")
+
+# C0 control characters other than tab, and the Unicode replacement character.
+BAD_CHAR_PATTERN = re.compile("[\x00-\x08\x0b-\x1f\x7f\ufffd]")
+
+
+class Finding(TypedDict):
+    rule: str
+    cue: int | None  # the cue's number in the file, or None for findings that are not about one cue
+    start: str | None  # HH:MM:SS,mmm of the cue
+    detail: str
+
+
+class FileResult(TypedDict):
+    hash: str
+    counts: dict[str, int]
+    findings: list[Finding]
+
+
+class _Collector:
+    """Per-rule counts for one file, keeping only the first few findings of each rule."""
+
+    def __init__(self):
+        self.counts: Counter[str] = Counter()
+        self.findings: list[Finding] = []
+        # Lines already reported as invalid UTF-8, so their U+FFFD is not reported again per cue.
+        self.undecodable: set[str] = set()
+
+    def add(self, rule: str, cue: int | None, start_ms: int | None, detail: str):
+        self.counts[rule] += 1
+        if self.counts[rule] <= MAX_FINDINGS_PER_RULE:
+            self.findings.append(
+                {"rule": rule, "cue": cue, "start": format_timestamp(start_ms) if start_ms is not None else None, "detail": detail}
+            )
+
+
+def _decode_lines(f: Iterable[bytes], digest, collector: _Collector) -> Iterator[str]:
+    """Decode a binary file line by line, hashing it (unless digest is None) and reporting undecodable lines as it goes."""
+    for number, raw in enumerate(f, start=1):
+        if digest is not None:
+            digest.update(raw)
+        try:
+            yield raw.decode("utf-8")
+        except UnicodeDecodeError as e:
+            collector.add("encoding", None, None, f"line {number}: invalid UTF-8 at byte {e.start}")
+            line = raw.decode("utf-8", errors="replace")
+            collector.undecodable.add(line.strip())
+            yield line
+
+
+def _bad_char(text: str, undecodable: set[str]) -> str | None:
+    """The first control or replacement character in text, ignoring lines already reported as invalid UTF-8."""
+    if undecodable:
+        text = "\n".join(line for line in text.split("\n") if line not in undecodable)
+    bad = BAD_CHAR_PATTERN.search(text)
+    return bad.group(0) if bad else None
+
+
+def lint_cues(cues: Iterable, collector: _Collector):
+    """Run every cue rule over the cues of one file."""
+    prev_end: int | None = None
+    run_text, run_length, run_start, run_cue = None, 0, 0, 0
+    for position, cue in enumerate(cues, start=1):
+        number = cue.index if cue.index is not None else position
+        duration = cue.end_ms - cue.start_ms
+
+        if cue.line_count > 1:
+            collector.add("multi_line", number, cue.start_ms, f"{cue.line_count} lines")
+        if duration < 0:
+            collector.add("backwards", number, cue.start_ms, f"ends at {format_timestamp(cue.end_ms)}")
+        elif duration == 0:
+            collector.add("zero_length", number, cue.start_ms, "")
+        elif duration > LONG_CUE_MS:
+            collector.add("long_cue", number, cue.start_ms, f"{duration / 1000:.1f} s")
+        if prev_end is not None:
+            if cue.start_ms < prev_end:
+                collector.add("overlap", number, cue.start_ms, f"previous cue ends at {format_timestamp(prev_end)}")
+            elif cue.start_ms - prev_end > GAP_MS:
+                collector.add("gap", number, cue.start_ms, f"{(cue.start_ms - prev_end) / 1000:.0f} s of silence before it")
+        prev_end = cue.end_ms
+
+        if cue.text and "*" in cue.text:
+            for word in CENSORED_PATTERN.findall(cue.text):
+                collector.add("censored", number, cue.start_ms, word)
+        if cue.text and (bad := _bad_char(cue.text, collector.undecodable)):
+            collector.add("encoding", number, cue.start_ms, f"{bad!r} in the text")
+
+        if cue.text and cue.text == run_text:
+            run_length += 1
+        else:
+            if run_length >= REPEAT_RUN:
+                collector.add("repeated_line", run_cue, run_start, f"{run_length}x {run_text!r}")
+            run_text, run_length, run_start, run_cue = cue.text, 1, cue.start_ms, number
+    if run_length >= REPEAT_RUN:
+        collector.add("repeated_line", run_cue, run_start, f"{run_length}x {run_text!r}")
+
+
+def lint_file(path: str, known_hash: str | None) -> tuple[str, FileResult | str | None]:
+    """
+    Lint one file. Runs in a worker process. Returns (path, result), where result
+    is None if the content hash still equals known_hash (the cached result holds)
+    and an error message if the file could not be read. With a known_hash the raw
+    bytes are hashed first and only parsed if the hash differs; either way the
+    file is read once.
+    """
+    try:
+        collector = _Collector()
+        if known_hash is not None:
+            with open(path, "rb") as f:
+                data = f.read()
+            content_hash = hashlib.sha256(data).hexdigest()
+            if content_hash == known_hash:
+                return path, None
+            lint_cues(parse_cues(_decode_lines(data.splitlines(keepends=True), None, collector)), collector)
+        else:
+            digest = hashlib.sha256()
+            with open(path, "rb") as f:
+                lint_cues(parse_cues(_decode_lines(f, digest, collector)), collector)
+            content_hash = digest.hexdigest()
+        return path, {"hash": content_hash, "counts": dict(collector.counts), "findings": collector.findings}
+    except OSError as e:
+        return path, str(e)
+
+
+class LintCache:
+    """Lint results per path, with the size and mtime they were computed at and the content hash."""
+
+    def __init__(self, path: str = LINT_CACHE_FILE):
+        self.path = path
+        self.settings = {
+            "version": LINT_VERSION,
+            "long_cue_ms": LONG_CUE_MS,
+            "gap_ms": GAP_MS,
+            "repeat_run": REPEAT_RUN,
+            "max_findings_per_rule": MAX_FINDINGS_PER_RULE,
+        }
+        self.files: dict[str, dict] = {}
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("settings") == self.settings:
+                self.files = data["files"]
+        except (OSError, ValueError, KeyError):
+            pass
+
+    def lookup(self, path: str, size: int, mtime_ns: int) -> tuple[FileResult | None, str | None]:
+        """(result, None) if the file is unchanged since it was linted, else (None, the hash it had then, if any)."""
+        entry = self.files.get(path)
+        if entry is None:
+            return None, None
+        if entry["size"] == size and entry["mtime_ns"] == mtime_ns:
+            return entry["result"], None
+        return None, entry["result"]["hash"]
+
+    def store(self, path: str, size: int, mtime_ns: int, result: FileResult):
+        self.files[path] = {"size": size, "mtime_ns": mtime_ns, "result": result}
+
+    def save(self, keep: set[str]):
+        """Write the cache atomically, dropping files that no longer exist."""
+        data = {"settings": self.settings, "files": {path: entry for path, entry in self.files.items() if path in keep}}
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, separators=(",", ":"))
+        os.replace(tmp_path, self.path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check every .srt file for quality problems and write a JSON report.")
+    parser.add_argument("--rule", action="append", dest="rules", choices=RULES, help="Only report this rule. Can be repeated.")
+    parser.add_argument("--out", default=LINT_REPORT_FILE, help=f"JSON report to write (default: {LINT_REPORT_FILE}).")
+    parser.add_argument("--full", action="store_true", help="Ignore the cache and lint every file again.")
+    parser.add_argument("--workers", type=int, default=WORKERS, help=f"Files to lint at once (default: {WORKERS}).")
+    args = parser.parse_args()
+
+    if not os.path.isdir(BASE_DIR):
+        print(f"Error: {BASE_DIR} not found.")
+        return
+    rules = set(args.rules or RULES)
+
+    with TranscriptIndex() as index:
+        paths = [row["path"] for row in index.query(ext=".srt", include_unparsed=True)]
+
+    cache = LintCache()
+    results: dict[str, FileResult] = {}
+    todo: list[tuple[str, str | None]] = []
+    stats: dict[str, os.stat_result] = {}
+    for path in paths:
+        try:
+            stats[path] = os.stat(path)
+        except OSError:
+            continue
+        result, known_hash = cache.lookup(path, stats[path].st_size, stats[path].st_mtime_ns)
+        if result is not None and not args.full:
+            results[path] = result
+        else:
+            todo.append((path, None if args.full else known_hash))
+
+    print(f"Linting {len(todo)} of {len(stats)} .srt files ({len(stats) - len(todo)} unchanged since the last run)...")
+    errors = 0
+    if todo:
+        with ProcessPoolExecutor(max_workers=max(1, args.workers)) as executor:
+            futures = executor.map(lint_file, *zip(*todo, strict=True), chunksize=8)
+            for path, result in tqdm(futures, total=len(todo), unit="file"):
+                if isinstance(result, str):
+                    tqdm.write(f"Error reading {path}: {result}")
+                    errors += 1
+                    continue
+                if result is None:
+                    # Only the mtime changed; the content and so the findings did not.
+                    result = cache.files[path]["result"]
+                cache.store(path, stats[path].st_size, stats[path].st_mtime_ns, result)
+                results[path] = result
+    cache.save(set(stats))
+
+    totals: Counter[str] = Counter()
+    report_files = {}
+    for path in sorted(results):
+        counts = {rule: n for rule, n in results[path]["counts"].items() if rule in rules}
+        if not counts:
+            continue
+        totals.update(counts)
+        report_files[path] = {
+            "counts": counts,
+            "findings": [finding for finding in results[path]["findings"] if finding["rule"] in rules],
+        }
+
+    report = {
+        "files": len(results),
+        "files_with_findings": len(report_files),
+        "counts": {rule: totals[rule] for rule in RULES if rule in rules},
+        "results": report_files,
+    }
+    tmp_path = args.out + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=1)
+    os.replace(tmp_path, args.out)
+
+    print(f"\n{'Rule':<14} {'Findings':>9} {'Files':>6}")
+    for rule in report["counts"]:
+        files = sum(1 for entry in report_files.values() if rule in entry["counts"])
+        print(f"{rule:<14} {totals[rule]:>9} {files:>6}")
+    print(f"\n{len(report_files)} of {len(results)} files have findings. Full report written to '{args.out}'.")
+    if errors:
+        print(f"{errors} file(s) could not be read.")
+
+
+if __name__ == "__main__":
+    main()
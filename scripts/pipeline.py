@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+"""
+Download, transcribe and (optionally) upload and clean up in one run.
+
+download_audio.py has to finish every channel before transcribe_audio.py can
+start. Here each file yt-dlp finishes goes straight onto a transcription queue,
+so whisper works while yt-dlp waits out its sleep intervals between downloads.
+A finished transcript can then be uploaded, and its audio deleted, right away.
+
+Media already in BASE_DIR without an .srt is queued too, so an earlier run that
+was cut short is picked up. The transcription journal and metrics are shared
+with transcribe_audio.py.
+"""
+
+import argparse
+import os
+import queue
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from _common import BASE_DIR, load_channels, load_config
+from _whisper import (
+    DEFAULT_MAX_ATTEMPTS,
+    DEFAULT_SETTINGS,
+    DEFAULT_WORKERS,
+    JOURNAL_FILE,
+    MEDIA_EXTENSIONS,
+    METRICS_FILE,
+    WHISPER_EXECUTABLE,
+    JobJournal,
+    JobResult,
+    TranscriptionScheduler,
+    get_whisper_command,
+    probe_duration,
+    read_log_tail,
+    remove_stale_temp_dirs,
+    srt_path_for,
+)
+from colorama import Fore, init
+from download_audio import (
+    DEFAULT_LISTING_TTL_MINUTES,
+    DEFAULT_PARALLEL,
+    LOG_FILE,
+    ListingCache,
+    _init_log_file,
+    download_all,
+    update_tools,
+    validate_channels,
+)
+
+# --- Configuration ---
+
+# How often the list of finished downloads is checked for new lines, in seconds.
+POLL_SECONDS = 1.0
+
+# --- End Configuration ---
+
+
+class DownloadWatcher(threading.Thread):
+    """
+    Follows the file yt-dlp appends finished paths to (--print-to-file) and puts
+    each new media path on the queue. stop() reads whatever is left and ends.
+    """
+
+    def __init__(self, list_path: str, out: "queue.Queue[str]"):
+        super().__init__(daemon=True)
+        self.list_path = list_path
+        self.out = out
+        self._stop_event = threading.Event()
+        self._offset = 0
+        self.count = 0
+
+    def _read_new(self):
+        try:
+            with open(self.list_path, "rb") as f:
+                f.seek(self._offset)
+                data = f.read()
+        except OSError:
+            return
+        # Only consume complete lines; yt-dlp may be mid-write on the last one.
+        end = data.rfind(b"\n") + 1
+        self._offset += end
+        for line in data[:end].decode("utf-8", errors="replace").splitlines():
+            path = line.strip()
+            if path.endswith(MEDIA_EXTENSIONS):
+                self.count += 1
+                self.out.put(os.path.normpath(path))
+
+    def run(self):
+        while not self._stop_event.wait(POLL_SECONDS):
+            self._read_new()
+        self._read_new()
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+class Uploader:
+    """Uploads finished transcripts one at a time on a background thread, sharing upload_transcripts' manifest."""
+
+    def __init__(self):
+        # Imported here so a run without --upload does not need config.yaml.
+        from _zstd_utils import CompressorCache, LevelPolicy
+        from upload_transcripts import MANIFEST_FILE, UploadManifest, build_session, process_and_upload
+
+        config = load_config()
+        self.server_url = config["server_url"]
+        self.headers = {"X-API-Key": config["api_key"], "Content-Type": "application/json"}
+        self.manifest = UploadManifest(MANIFEST_FILE, self.server_url)
+        self.session = build_session()
+        self.compressors = CompressorCache()
+        self.policy = LevelPolicy()
+        self._process_and_upload = process_and_upload
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self.results: list[Future] = []
+
+    def submit(self, srt_path: str):
+        self.results.append(self._executor.submit(self._upload, srt_path))
+
+    def _upload(self, srt_path: str) -> str:
+        root, file = os.path.split(srt_path)
+        streamer_name = os.path.relpath(root, BASE_DIR).split(os.path.sep)[0]
+        status, *_ = self._process_and_upload(
+            self.session,
+            root,
+            file,
+            streamer_name,
+            None,
+            None,
+            self.headers,
+            self.server_url,
+            self.manifest,
+            False,
+            self.compressors,
+            self.policy,
+        )
+        color = Fore.GREEN if status in ("success", "skipped_unchanged") else Fore.RED
+        print(color + f"[upload] {status}: {file}")
+        return status
+
+    def close(self) -> dict[str, int]:
+        """Wait for pending uploads, save the manifest and return a count per status."""
+        self._executor.shutdown()
+        self.manifest.save()
+        self.session.close()
+        counts: dict[str, int] = {}
+        for future in self.results:
+            status = future.result()
+            counts[status] = counts.get(status, 0) + 1
+        return counts
+
+
+def find_untranscribed(journal: JobJournal, max_attempts: int) -> list[str]:
+    """Media in BASE_DIR with no .srt yet, leaving out files that already failed max_attempts times."""
+    found = []
+    for root, _dirs, files in os.walk(BASE_DIR):
+        for file in files:
+            if not file.endswith(MEDIA_EXTENSIONS):
+                continue
+            path = os.path.normpath(os.path.join(root, file))
+            entry = journal.get(path)
+            if os.path.exists(srt_path_for(path)):
+                continue
+            if entry and entry["state"] == "failed" and entry["attempts"] >= max_attempts:
+                continue
+            found.append(path)
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Download new audio and transcribe each file as soon as it finishes.")
+    parser.add_argument("--skip-update", action="store_true", help="Skip updating yt-dlp and deno before downloading.")
+    parser.add_argument(
+        "--parallel",
+        type=int,
+        default=DEFAULT_PARALLEL,
+        help=f"Most downloads to run at once across all hosts (default: {DEFAULT_PARALLEL}).",
+    )
+    parser.add_argument("--per-host", type=int, default=1, help="Downloads to run at once against one host (default: 1).")
+    parser.add_argument(
+        "--no-discovery", action="store_true", help="Let yt-dlp go through every source itself instead of listing it first."
+    )
+    parser.add_argument(
+        "--listing-ttl",
+        type=float,
+        default=DEFAULT_LISTING_TTL_MINUTES,
+        help=f"Minutes a source listing is reused (default: {DEFAULT_LISTING_TTL_MINUTES}).",
+    )
+    parser.add_argument("--skip-download", action="store_true", help="Only transcribe (and upload) media already on disk.")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=DEFAULT_WORKERS,
+        help=f"Whisper processes to run at once. Each loads its own model (default: {DEFAULT_WORKERS}).",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=DEFAULT_SETTINGS["batch_size"],
+        help=f"Whisper --batch_size (default: {DEFAULT_SETTINGS['batch_size']}).",
+    )
+    parser.add_argument(
+        "--max-attempts",
+        type=int,
+        default=DEFAULT_MAX_ATTEMPTS,
+        help=f"Skip files that already failed this many times (default: {DEFAULT_MAX_ATTEMPTS}).",
+    )
+    parser.add_argument("--upload", action="store_true", help="Upload each transcript as soon as it is written (needs config.yaml).")
+    parser.add_argument("--cleanup", action="store_true", help="Delete each media file once its transcript is written.")
+    parser.add_argument("--no-retry", action="store_true", help="Do not transcribe a file again when its transcript looks hallucinated.")
+    parser.add_argument("--whisper", default=WHISPER_EXECUTABLE, help=f"Whisper executable to run (default: {WHISPER_EXECUTABLE}).")
+    args = parser.parse_args()
+
+    # Initialize colorama to auto-reset colors after each print
+    init(autoreset=True)
+    os.makedirs(BASE_DIR, exist_ok=True)
+
+    channels = []
+    if not args.skip_download:
+        if not args.skip_update:
+            update_tools()
+        else:
+            print("Skipping tool updates (--skip-update).")
+        channels = load_channels()
+        validate_channels(channels)
+
+    uploader = Uploader() if args.upload else None
+    whisper_cmd = get_whisper_command(args.whisper)
+
+    journal = JobJournal(JOURNAL_FILE)
+    if remove_stale_temp_dirs(BASE_DIR):
+        print(Fore.YELLOW + "Removed unfinished whisper output from an interrupted run.")
+
+    settings = DEFAULT_SETTINGS.copy()
+    settings["batch_size"] = args.batch_size
+    scheduler = TranscriptionScheduler(
+        whisper_cmd, settings=settings, workers=args.workers, journal=journal, metrics_path=METRICS_FILE, retry=not args.no_retry
+    )
+
+    results: list[JobResult] = []
+    results_lock = threading.Lock()
+
+    def transcribe(media_path: str):
+        print(f"[transcribe] Starting {media_path}")
+        journal.queue([media_path])
+        result = scheduler.run_job(media_path, probe_duration(media_path))
+        with results_lock:
+            results.append(result)
+
+        if result["interrupted"]:
+            print(Fore.YELLOW + f"[transcribe] Interrupted {media_path}")
+            return
+        if not result["ok"]:
+            print(Fore.RED + f"[transcribe] FAILED {media_path}: {result['error']}")
+            for line in read_log_tail(result["log_path"], lines=5):
+                print(Fore.RED + f"    {line}")
+            return
+
+        print(Fore.GREEN + f"[transcribe] Done {media_path} ({result['seconds']:.0f} s, {result['cues']} cues)")
+        flagged = bool(result["quality"] and result["quality"]["flagged"])
+        if result["retried"]:
+            print(
+                Fore.YELLOW + f"[transcribe] Looked hallucinated, transcribed again{' and still flagged' if flagged else ''}: {media_path}"
+            )
+        if uploader:
+            uploader.submit(result["srt_path"])
+        if args.cleanup and flagged:
+            # Keep the audio so the transcript can be checked and redone by hand.
+            print(Fore.YELLOW + f"[cleanup] Keeping {media_path}, its transcript looks hallucinated")
+        elif args.cleanup:
+            try:
+                os.remove(media_path)
+            except OSError as e:
+                print(Fore.RED + f"[cleanup] Could not delete {media_path}: {e}")
+
+    existing = find_untranscribed(journal, args.max_attempts)
+    if existing:
+        print(f"Queueing {len(existing)} file(s) already on disk without a transcript.")
+
+    start = time.perf_counter()
+    executor = ThreadPoolExecutor(max_workers=max(1, args.workers))
+    queued: set[str] = set()
+
+    def enqueue(media_path: str):
+        if media_path not in queued and not os.path.exists(srt_path_for(media_path)):
+            queued.add(media_path)
+            executor.submit(transcribe, media_path)
+
+    # Longest first for what is already here; new downloads go in as they arrive.
+    for media_path, _ in scheduler.order(existing):
+        enqueue(media_path)
+
+    downloaded: queue.Queue[str] = queue.Queue()
+    watcher = None
+    try:
+        if channels:
+            with tempfile.TemporaryDirectory(prefix="pipeline-") as tmp_dir:
+                list_path = os.path.join(tmp_dir, "downloaded.txt")
+                watcher = DownloadWatcher(list_path, downloaded)
+                watcher.start()
+
+                # Hand downloads to the transcription pool from a separate thread so
+                # the main thread can run the downloads.
+                feeding = threading.Event()
+
+                def feed():
+                    while not (feeding.is_set() and downloaded.empty()):
+                        try:
+                            enqueue(downloaded.get(timeout=POLL_SECONDS))
+                        except queue.Empty:
+                            continue
+
+                feeder = threading.Thread(target=feed, daemon=True)
+                feeder.start()
+
+                _init_log_file()
+                print(f"Errors/warnings will be logged to '{LOG_FILE}'.")
+                print("\n--- Starting Downloads ---")
+                listing_cache = None if args.no_discovery else ListingCache(ttl_seconds=args.listing_ttl * 60)
+                download_all(
+                    channels,
+                    parallel=args.parallel,
+                    per_host=args.per_host,
+                    downloaded_list=list_path,
+                    listing_cache=listing_cache,
+                )
+                print("\n--- Download process finished. Waiting for transcriptions. ---")
+
+                watcher.stop()
+                feeding.set()
+                feeder.join()
+
+        executor.shutdown(wait=True)
+    except KeyboardInterrupt:
+        executor.shutdown(wait=False, cancel_futures=True)
+        print(Fore.YELLOW + "\nOperation canceled. Run again to resume the unfinished files.")
+        sys.exit(1)
+
+    failed = [r for r in results if not r["ok"]]
+    elapsed = time.perf_counter() - start
+    print(f"\nDownloaded {watcher.count if watcher else 0} file(s) in {elapsed / 60:.1f} min.")
+    print(f"Transcribed {len(results) - len(failed)} of {len(results)} file(s).")
+    if uploader:
+        counts = uploader.close()
+        print("Uploads: " + (", ".join(f"{count} {status}" for status, count in sorted(counts.items())) or "none"))
+    if failed:
+        print(Fore.RED + f"{len(failed)} failed:")
+        for result in failed:
+            print(Fore.RED + f"  {result['media_path']}: {result['error']}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+"""
+Full-text search over the local transcripts.
+
+Cue text is kept in an SQLite FTS5 index next to the file index. Each run
+brings it up to date first, re-reading only transcripts whose size or mtime
+changed since they were last indexed, so searches stay fast after the first build.
+
+    uv run .\\scripts\\search.py "bird up"
+    uv run .\\scripts\\search.py "\\"top 500\\" apex*" --streamer Dokibird --type Stream --from 2025-01 --to 2025-06
+    uv run .\\scripts\\search.py "bird up" --context 3
+
+--context reads the surrounding cues from the memory-mapped corpus that
+export_corpus.py writes, instead of re-parsing each hit's .srt file.
+"""
+
+import argparse
+import bisect
+import re
+import sqlite3
+import sys
+import time
+from typing import TypedDict
+
+from _corpus import CORPUS_DIR, Corpus, stale_partitions
+from _index import TranscriptIndex
+from _srt import format_timestamp, iter_cues
+from tqdm import tqdm
+
+# Ensure UTF-8 output for terminal
+if sys.stdout.encoding != "utf-8":
+    sys.stdout.reconfigure(encoding="utf-8")  # type: ignore
+
+# --- Configuration ---
+
+SEARCH_INDEX_FILE = ".transcript-search.sqlite"
+
+# Bump when the schema or tokenizer changes; an index with another version is rebuilt.
+SCHEMA_VERSION = 1
+
+DEFAULT_LIMIT = 50
+
+# --- End Configuration ---
+
+# A "quoted phrase" or a bare term, in a user's query.
+QUERY_TERM_PATTERN = re.compile(r'"([^"]*)"|(\S+)')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS docs (
+    doc_id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    streamer TEXT,
+    date TEXT,
+    type TEXT,
+    title TEXT,
+    stream_id TEXT,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS docs_date ON docs (date);
+CREATE TABLE IF NOT EXISTS cues (
+    cue_id INTEGER PRIMARY KEY,
+    doc_id INTEGER NOT NULL,
+    start TEXT NOT NULL,
+    text TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS cues_doc ON cues (doc_id);
+CREATE VIRTUAL TABLE IF NOT EXISTS cue_fts USING fts5 (
+    text,
+    content = 'cues',
+    content_rowid = 'cue_id',
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS cues_ai AFTER INSERT ON cues BEGIN
+    INSERT INTO cue_fts (rowid, text) VALUES (new.cue_id, new.text);
+END;
+CREATE TRIGGER IF NOT EXISTS cues_ad AFTER DELETE ON cues BEGIN
+    INSERT INTO cue_fts (cue_fts, rowid, text) VALUES ('delete', old.cue_id, old.text);
+END;
+"""
+
+
+class SearchHit(TypedDict):
+    streamer: str | None
+    date: str
+    type: str
+    title: str
+    stream_id: str
+    start: str  # HH:MM:SS of the cue
+    text: str
+
+
+def read_cues(path: str) -> list[tuple[str, str]]:
+    """(start, text) for every cue in an .srt file. Multi-line cue text is joined with spaces."""
+    return [(format_timestamp(cue.start_ms)[:8], cue.text.replace("\n", " ")) for cue in iter_cues(path) if cue.text]
+
+
+def parse_date_bound(value: str, end: bool) -> str:
+    """YYYY, YYYY-MM or YYYY-MM-DD (dashes optional) to a YYYYMMDD bound, inclusive on both ends."""
+    digits = value.replace("-", "")
+    if not digits.isdigit() or len(digits) not in (4, 6, 8):
+        raise argparse.ArgumentTypeError(f"invalid date '{value}', expected YYYY, YYYY-MM or YYYY-MM-DD")
+    if len(digits) == 8:
+        return digits
+    # '99' pads past any real month/day, so the range covers the whole year or month.
+    return digits.ljust(8, "9" if end else "0")
+
+
+def to_fts_query(query: str) -> str:
+    """
+    A user's query as FTS5 syntax. Every bare term is quoted, so punctuation such
+    as don't, a-b or well... is searched as text rather than parsed as FTS5 syntax.
+    Only "quoted phrases" and a trailing * (a prefix) keep their meaning. Terms
+    with no letters or digits are dropped. Returns "" if nothing is left.
+    """
+    terms = []
+    for phrase, bare in QUERY_TERM_PATTERN.findall(query):
+        prefix = False
+        if not phrase:
+            # A stray quote is not a phrase; drop it.
+            phrase = bare.replace('"', "")
+            prefix = phrase.endswith("*")
+            phrase = phrase.rstrip("*")
+        if any(ch.isalnum() for ch in phrase):
+            terms.append(f'"{phrase}"' + ("*" if prefix else ""))
+    return " ".join(terms)
+
+
+class SearchIndex:
+    """FTS5 index of cue text, kept in sync with the file index."""
+
+    def __init__(self, path: str = SEARCH_INDEX_FILE, rebuild: bool = False):
+        self.conn = sqlite3.connect(path, timeout=30)
+        self.conn.row_factory = sqlite3.Row
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        if rebuild or version != SCHEMA_VERSION:
+            self.conn.executescript("DROP TABLE IF EXISTS cue_fts; DROP TABLE IF EXISTS cues; DROP TABLE IF EXISTS docs;")
+            self.conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self.conn.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    def update(self, show_progress: bool = True) -> tuple[int, int]:
+        """
+        Re-index transcripts that are new or changed and drop ones that are gone.
+        Returns (files re-indexed, files removed).
+        """
+        with TranscriptIndex() as index:
+            rows = index.query(ext=".srt")
+
+        indexed = {
+            r["path"]: (r["doc_id"], r["size"], r["mtime_ns"]) for r in self.conn.execute("SELECT doc_id, path, size, mtime_ns FROM docs")
+        }
+        current = {row["path"] for row in rows}
+        changed = [row for row in rows if indexed.get(row["path"], (None,))[1:] != (row["size"], row["mtime_ns"])]
+        removed = [doc_id for path, (doc_id, _, _) in indexed.items() if path not in current]
+
+        with self.conn:
+            for doc_id in removed:
+                self._drop_doc(doc_id)
+
+            for row in tqdm(changed, unit="file", desc="Indexing", disable=not show_progress or not changed):
+                try:
+                    cues = read_cues(row["path"])
+                except OSError as e:
+                    tqdm.write(f"Error reading {row['path']}: {e}")
+                    continue
+
+                if row["path"] in indexed:
+                    self._drop_doc(indexed[row["path"]][0])
+                cursor = self.conn.execute(
+                    "INSERT INTO docs (path, streamer, date, type, title, stream_id, size, mtime_ns) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (row["path"], row["streamer"], row["date"], row["type"], row["title"], row["id"], row["size"], row["mtime_ns"]),
+                )
+                doc_id = cursor.lastrowid
+                self.conn.executemany(
+                    "INSERT INTO cues (doc_id, start, text) VALUES (?, ?, ?)",
+                    [(doc_id, start, text) for start, text in cues],
+                )
+
+        return len(changed), len(removed)
+
+    def _drop_doc(self, doc_id: int):
+        self.conn.execute("DELETE FROM cues WHERE doc_id = ?", (doc_id,))
+        self.conn.execute("DELETE FROM docs WHERE doc_id = ?", (doc_id,))
+
+    def search(
+        self,
+        query: str,
+        streamer: str | None = None,
+        types: set[str] | None = None,
+        date_from: str | None = None,
+        date_to: str | None = None,
+        limit: int = DEFAULT_LIMIT,
+    ) -> list[SearchHit]:
+        """
+        Cues matching a query, newest stream first and in cue order within a stream.
+        Words are ANDed; "quoted words" match a phrase and word* matches a prefix.
+        Anything else is taken literally (see to_fts_query).
+        """
+        fts_query = to_fts_query(query)
+        if not fts_query:
+            return []
+        clauses = ["cue_fts MATCH ?"]
+        params: list = [fts_query]
+        if streamer:
+            clauses.append("docs.streamer = ? COLLATE NOCASE")
+            params.append(streamer)
+        if types:
+            clauses.append(f"docs.type IN ({','.join('?' * len(types))})")
+            params.extend(sorted(types))
+        if date_from:
+            clauses.append("docs.date >= ?")
+            params.append(date_from)
+        if date_to:
+            clauses.append("docs.date <= ?")
+            params.append(date_to)
+
+        sql = (
+            "SELECT docs.streamer, docs.date, docs.type, docs.title, docs.stream_id, cues.start, cues.text"
+            " FROM cue_fts JOIN cues ON cues.cue_id = cue_fts.rowid JOIN docs ON docs.doc_id = cues.doc_id"
+            f" WHERE {' AND '.join(clauses)}"
+            " ORDER BY docs.date DESC, docs.path, cues.cue_id"
+        )
+        if limit > 0:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return [SearchHit(**dict(row)) for row in self.conn.execute(sql, params)]
+
+
+def hit_position(corpus: Corpus, hit: SearchHit) -> int | None:
+    """Position of a hit's cue within its stream in the corpus, or None if the corpus does not have it."""
+    if hit["stream_id"] not in corpus:
+        return None
+    part, rows = corpus.locate(hit["stream_id"])
+    hours, minutes, seconds = (int(v) for v in hit["start"].split(":"))
+    start_ms = ((hours * 60 + minutes) * 60 + seconds) * 1000
+    # Cues are in time order, so only the few starting within that second need their text compared.
+    row = bisect.bisect_left(part.column("start_ms"), start_ms, rows.start, rows.stop)
+    while row < rows.stop and part.column("start_ms")[row] < start_ms + 1000:
+        if part.text(row).replace("\n", " ") == hit["text"]:
+            return row - rows.start
+        row += 1
+    return None
+
+
+def format_context(corpus: Corpus, hit: SearchHit, context: int) -> str | None:
+    """The hit's cue with `context` cues either side, or None if the corpus does not have it."""
+    position = hit_position(corpus, hit)
+    if position is None:
+        return None
+    lines = []
+    for offset, cue in enumerate(corpus.cues(hit["stream_id"], max(0, position - context), position + context + 1)):
+        marker = ">" if offset == min(position, context) else " "
+        lines.append(f"  {marker} {format_timestamp(cue.start_ms)[:8]}  {cue.text.replace(chr(10), ' ')}")
+    return "\n".join(lines)
+
+
+def format_hit(hit: SearchHit) -> str:
+    date = hit["date"]
+    return f"{date[:4]}-{date[4:6]}-{date[6:]} [{hit['streamer']}] {hit['type']} - {hit['title']} [{hit['stream_id']}] @ {hit['start']}\n    {hit['text']}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search the text of the local transcripts.")
+    parser.add_argument("query", nargs="?", help='Words to find. Use "quotes" for a phrase and word* for a prefix.')
+    parser.add_argument("--streamer", help="Only this streamer folder, e.g. Dokibird.")
+    parser.add_argument("--type", action="append", dest="types", help="Only this stream type, e.g. Stream. Can be repeated.")
+    parser.add_argument(
+        "--from", dest="date_from", type=lambda v: parse_date_bound(v, end=False), help="Earliest date: YYYY, YYYY-MM or YYYY-MM-DD."
+    )
+    parser.add_argument(
+        "--to", dest="date_to", type=lambda v: parse_date_bound(v, end=True), help="Latest date: YYYY, YYYY-MM or YYYY-MM-DD."
+    )
+    parser.add_argument("--limit", type=int, default=DEFAULT_LIMIT, help=f"Maximum hits to show, 0 for all (default: {DEFAULT_LIMIT}).")
+    parser.add_argument("--rebuild", action="store_true", help="Drop the search index and build it again from scratch.")
+    parser.add_argument("--context", type=int, default=0, help="Also show this many cues before and after each hit.")
+    args = parser.parse_args()
+
+    if not args.query and not args.rebuild:
+        parser.error("a query is required (or pass --rebuild)")
+
+    with SearchIndex(rebuild=args.rebuild) as index:
+        updated, removed = index.update()
+        if updated or removed:
+            print(f"Search index updated: {updated} file(s) indexed, {removed} removed.")
+
+        if not args.query:
+            return
+
+        start = time.perf_counter()
+        try:
+            hits = index.search(
+                args.query,
+                streamer=args.streamer,
+                types=set(args.types) if args.types else None,
+                date_from=args.date_from,
+                date_to=args.date_to,
+                limit=args.limit,
+            )
+        except sqlite3.OperationalError as e:
+            print(f"Error: invalid query '{args.query}': {e}")
+            sys.exit(1)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+    corpus = Corpus(CORPUS_DIR) if args.context > 0 and hits else None
+    stale = 0
+    for hit in hits:
+        print(format_hit(hit))
+        if corpus is not None:
+            context = format_context(corpus, hit, args.context)
+            if context is None:
+                stale += 1
+            else:
+                print(context)
+    if corpus is not None:
+        corpus.close()
+        if stale_partitions(CORPUS_DIR):
+            print(
+                f"\nThe corpus in '{CORPUS_DIR}' is stale (written by an older version); run export_corpus.py to show context for every hit."
+            )
+        elif stale:
+            print(f"\n{stale} hit(s) are not in the corpus yet; run export_corpus.py to show their context.")
+
+    more = " (limit reached, pass --limit to see more)" if args.limit > 0 and len(hits) == args.limit else ""
+    print(f"\n{len(hits)} hit(s) in {elapsed_ms:.1f} ms{more}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Summarize the transcript corpus: hours transcribed per channel, type and month,
+speaking rate, silence gaps, cue durations and growth over time.
+
+Reads the memory-mapped corpus that export_corpus.py writes, first rebuilding
+the partitions whose transcripts changed since the last export (the same
+incremental update export_corpus.py runs; --no-update skips it). Each transcript's
+figures are worked out once over its slice of the timing columns (map/sum over
+the mapped arrays, no per-cue Python loop) and kept in corpus-stats-cache.json
+by file, so after a new download only the new or changed transcripts are read.
+
+    uv run .\\scripts\\stats.py --streamer Dokibird --since 2025-01
+"""
+
+import argparse
+import bisect
+import functools
+import json
+import operator
+import os
+import sys
+import time
+from collections import Counter
+from typing import TypedDict
+
+from _corpus import CORPUS_DIR, CorpusDoc, Partition, iter_partitions, stale_partitions, update_corpus
+
+# Ensure UTF-8 output for terminal
+if sys.stdout.encoding != "utf-8":
+    sys.stdout.reconfigure(encoding="utf-8")  # type: ignore
+
+# --- Configuration ---
+
+STATS_CACHE_FILE = "corpus-stats-cache.json"
+
+# A pause between two cues at least this long counts as a silence gap.
+SILENCE_GAP_MS = 10_000
+
+# Upper edges of the cue duration histogram buckets; the last bucket is open-ended.
+DURATION_BUCKETS_MS = (1_000, 2_000, 3_000, 5_000, 8_000, 13_000, 21_000, 30_000)
+
+# Width of the longest bar in the charts.
+CHART_WIDTH = 40
+
+# --- End Configuration ---
+
+# Bump when FileStats changes; the cache is also dropped if the settings above change.
+CACHE_VERSION = 1
+
+
+class FileStats(TypedDict):
+    size: int
+    mtime_ns: int
+    cues: int
+    span_ms: int  # end of the last cue, i.e. how far into the stream the transcript reaches
+    speech_ms: int  # total time covered by cues
+    words: int
+    gaps: int  # silence gaps of SILENCE_GAP_MS or more
+    gap_ms: int
+    longest_gap_ms: int
+    durations: list[int]  # cue count per DURATION_BUCKETS_MS bucket
+
+
+class StatsCache:
+    """Per-transcript FileStats, keyed by "<streamer>/<file>" and valid while the source's size and mtime match."""
+
+    def __init__(self, path: str = STATS_CACHE_FILE):
+        self.path = path
+        self.settings = {"version": CACHE_VERSION, "silence_gap_ms": SILENCE_GAP_MS, "duration_buckets_ms": list(DURATION_BUCKETS_MS)}
+        self.files: dict[str, FileStats] = {}
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("settings") == self.settings:
+                self.files = data["files"]
+        except (OSError, ValueError, KeyError):
+            pass
+
+    def get(self, key: str, doc: CorpusDoc) -> FileStats | None:
+        cached = self.files.get(key)
+        if cached and cached["size"] == doc.get("size") and cached["mtime_ns"] == doc.get("mtime_ns"):
+            return cached
+        return None
+
+    def save(self, keep: set[str]):
+        """Write the cache atomically, dropping transcripts that are no longer in the corpus."""
+        data = {"settings": self.settings, "files": {key: value for key, value in self.files.items() if key in keep}}
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, separators=(",", ":"))
+        os.replace(tmp_path, self.path)
+
+
+def file_stats(part: Partition, rows: range, doc: CorpusDoc) -> FileStats:
+    """Figures for one transcript, computed over its rows of the mapped columns."""
+    start = part.column("start_ms")[rows.start : rows.stop]
+    end = part.column("end_ms")[rows.start : rows.stop]
+    durations = list(map(operator.sub, end, start))
+    # Gap before each cue: its start minus the previous cue's end.
+    gaps = list(filter(functools.partial(operator.le, SILENCE_GAP_MS), map(operator.sub, start[1:], end[:-1])))
+    buckets = Counter(map(functools.partial(bisect.bisect_left, DURATION_BUCKETS_MS), durations))
+    words = sum(map(len, map(bytes.split, map(bytes, part.text_slices(rows)))))
+    return {
+        "size": doc.get("size", 0),
+        "mtime_ns": doc.get("mtime_ns", 0),
+        "cues": len(rows),
+        "span_ms": max(end, default=0),
+        "speech_ms": sum(durations),
+        "words": words,
+        "gaps": len(gaps),
+        "gap_ms": sum(gaps),
+        "longest_gap_ms": max(gaps, default=0),
+        "durations": [buckets[i] for i in range(len(DURATION_BUCKETS_MS) + 1)],
+    }
+
+
+def collect(corpus_dir: str, cache: StatsCache, streamer: str | None) -> tuple[list[tuple[CorpusDoc, FileStats]], int]:
+    """(doc, stats) for every transcript in the corpus, and how many had to be computed rather than read from the cache."""
+    results = []
+    computed = 0
+    for part in iter_partitions(corpus_dir, streamer=streamer):
+        with part:
+            for position, doc in enumerate(part.docs):
+                key = f"{doc['streamer']}/{doc['file']}"
+                stats = cache.get(key, doc)
+                if stats is None:
+                    stats = file_stats(part, part.rows_of(position), doc)
+                    cache.files[key] = stats
+                    computed += 1
+                results.append((doc, stats))
+    return results, computed
+
+
+def month_of(doc: CorpusDoc) -> str:
+    date = doc["date"]
+    return f"{date[:4]}-{date[4:6]}" if len(date) >= 6 else "unknown"
+
+
+def add_up(group: list[FileStats]) -> dict[str, int]:
+    totals = {key: sum(s[key] for s in group) for key in ("cues", "span_ms", "speech_ms", "words", "gaps", "gap_ms")}
+    totals["files"] = len(group)
+    totals["longest_gap_ms"] = max((s["longest_gap_ms"] for s in group), default=0)
+    return totals
+
+
+def format_hours(ms: int) -> str:
+    return f"{ms / 3_600_000:.1f}"
+
+
+def print_table(title: str, groups: dict[str, list[FileStats]], cumulative: bool = False):
+    label_width = max([len(title), *(len(label) for label in groups)])
+    header = f"{title:<{label_width}} {'Files':>6} {'Hours':>8} {'Speech':>7} {'Words':>11} {'WPM':>6} {'Gaps/h':>7} {'Longest gap':>12}"
+    print(header + (f" {'Total h':>9}" if cumulative else ""))
+    running = 0
+    for label, group in groups.items():
+        t = add_up(group)
+        running += t["span_ms"]
+        speech_minutes = t["speech_ms"] / 60_000
+        wpm = t["words"] / speech_minutes if speech_minutes else 0.0
+        speech_share = t["speech_ms"] / t["span_ms"] * 100 if t["span_ms"] else 0.0
+        gaps_per_hour = t["gaps"] / (t["span_ms"] / 3_600_000) if t["span_ms"] else 0.0
+        line = (
+            f"{label:<{label_width}} {t['files']:>6} {format_hours(t['span_ms']):>8} {speech_share:>6.0f}% {t['words']:>11,} "
+            f"{wpm:>6.0f} {gaps_per_hour:>7.1f} {t['longest_gap_ms'] / 60_000:>10.1f} m"
+        )
+        print(line + (f" {format_hours(running):>9}" if cumulative else ""))
+
+
+def print_histogram(group: list[FileStats]):
+    counts = [sum(s["durations"][i] for s in group) for i in range(len(DURATION_BUCKETS_MS) + 1)]
+    total = sum(counts) or 1
+    most = max(counts) or 1
+    edges = [0, *DURATION_BUCKETS_MS]
+    labels = [f"{lo / 1000:g}-{hi / 1000:g} s" for lo, hi in zip(edges[:-1], DURATION_BUCKETS_MS, strict=True)]
+    labels.append(f"{DURATION_BUCKETS_MS[-1] / 1000:g}+ s")
+    label_width = max(len(label) for label in labels)
+    for label, count in zip(labels, counts, strict=True):
+        bar = "#" * round(count / most * CHART_WIDTH)
+        print(f"{label:<{label_width}} {bar:<{CHART_WIDTH}} {count:>10,} ({count / total * 100:4.1f}%)")
+
+
+def group_by(results: list[tuple[CorpusDoc, FileStats]], key) -> dict[str, list[FileStats]]:
+    groups: dict[str, list[FileStats]] = {}
+    for doc, stats in results:
+        groups.setdefault(key(doc), []).append(stats)
+    return dict(sorted(groups.items()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize the transcript corpus written by export_corpus.py.")
+    parser.add_argument("--streamer", help="Only this streamer folder, e.g. Dokibird.")
+    parser.add_argument("--type", action="append", dest="types", help="Only this stream type, e.g. Stream. Can be repeated.")
+    parser.add_argument("--since", help="Only streams on or after this month (YYYY-MM).")
+    parser.add_argument("--corpus", default=CORPUS_DIR, help=f"Corpus folder (default: {CORPUS_DIR}).")
+    parser.add_argument("--cache", default=STATS_CACHE_FILE, help=f"Per-file stats cache (default: {STATS_CACHE_FILE}).")
+    parser.add_argument("--no-update", action="store_true", help="Use the corpus as last exported, without picking up new transcripts.")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if not args.no_update:
+        summary = update_corpus(args.corpus, log=lambda message: None)
+        if summary["rebuilt"] or summary["removed"]:
+            print(f"Updated the corpus: rebuilt {summary['rebuilt']} and removed {summary['removed']} partition(s).\n")
+    cache = StatsCache(args.cache)
+    results, computed = collect(args.corpus, cache, args.streamer)
+    stale = stale_partitions(args.corpus, streamer=args.streamer)
+    if stale:
+        print(
+            f"The corpus in '{args.corpus}' is stale: {len(stale)} partition(s) were written by an older version and are left out. Run export_corpus.py.\n"
+        )
+    if not results:
+        print(f"No transcripts found in '{args.corpus}'. Run export_corpus.py first.")
+        return
+    # A streamer-filtered run only saw that streamer's files, so it must not prune the others.
+    keep = set(cache.files) if args.streamer else {f"{doc['streamer']}/{doc['file']}" for doc, _ in results}
+    if computed or keep != set(cache.files):
+        cache.save(keep)
+
+    if args.types:
+        results = [(doc, stats) for doc, stats in results if doc["type"] in args.types]
+    if args.since:
+        results = [(doc, stats) for doc, stats in results if month_of(doc) >= args.since]
+    if not results:
+        print("No transcripts match the filters.")
+        return
+
+    print(f"{len(results)} transcripts ({computed} read, the rest cached) in {time.perf_counter() - start:.1f} s\n")
+    print_table("Channel", group_by(results, lambda doc: doc["streamer"]))
+    print()
+    print_table("Type", group_by(results, lambda doc: doc["type"] or "unknown"))
+    print()
+    print_table("Month", group_by(results, month_of), cumulative=True)
+    print(f"\nCue durations (silence gaps are pauses of {SILENCE_GAP_MS / 1000:g} s or more between cues)\n")
+    print_histogram([stats for _, stats in results])
+
+
+if __name__ == "__main__":
+    main()
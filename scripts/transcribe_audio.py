@@ -1,24 +1,37 @@
 #!/usr/bin/env python3
 
+import argparse
 import os
+import statistics
 import subprocess
 import sys
+import time
 
+from _whisper import (
+    DEFAULT_MAX_ATTEMPTS,
+    DEFAULT_SETTINGS,
+    DEFAULT_WORKERS,
+    JOURNAL_FILE,
+    LOG_DIR,
+    MEDIA_EXTENSIONS,
+    METRICS_FILE,
+    WHISPER_EXECUTABLE,
+    JobJournal,
+    JobResult,
+    TranscriptionScheduler,
+    get_whisper_command,
+    read_log_tail,
+    realtime_factor,
+    remove_stale_temp_dirs,
+    srt_path_for,
+)
 from colorama import Fore, init
 
 # --- Configuration ---
 
-# The command to run whisper.
-# This script will first check the local folder (like .\[cmd])
-# and if not found, will assume it's in the system's PATH.
-WHISPER_EXECUTABLE = "faster-whisper-xxl.exe" if sys.platform == "win32" else "faster-whisper-xxl"
-
 # The default directory to scan
 DEFAULT_PATH = "Transcript"
 
-# File types to look for
-MEDIA_EXTENSIONS = (".webm", ".m4a", ".mp3", ".mp4", ".mkv")
-
 # --- End Configuration ---
 
 
@@ -33,18 +46,6 @@ def find_files_to_process(scan_path):
     return files_to_process
 
 
-def get_whisper_command():
-    """Finds the whisper executable, preferring a local one."""
-    local_cmd = os.path.join(".", WHISPER_EXECUTABLE)
-
-    if os.path.exists(local_cmd):
-        print(f"Found local executable: {local_cmd}")
-        return local_cmd
-    else:
-        print(f"Using PATH to find executable: {WHISPER_EXECUTABLE}")
-        return WHISPER_EXECUTABLE
-
-
 def get_scan_path():
     """Asks the user for a path, falling back to the default."""
     # Use os.path.normpath to fix any / or \ issues
@@ -66,18 +67,95 @@ def get_scan_path():
     return default_normalized
 
 
+def format_duration(seconds: float) -> str:
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02}:{seconds:02}"
+
+
+def print_start(media_path: str, started: int, total: int):
+    print(f"[{started}/{total}] Transcribing {media_path}")
+
+
+def print_finish(result: JobResult, finished: int, total: int):
+    took = format_duration(result["seconds"])
+    if result["ok"]:
+        print(Fore.GREEN + f"[{finished}/{total} done] {result['media_path']} ({took})")
+        quality = result["quality"]
+        reasons = "; ".join(quality["reasons"]) if quality else ""
+        if result["retried"]:
+            outcome = f"still flagged: {reasons}" if reasons else "the kept one looks fine"
+            print(Fore.YELLOW + f"    Transcript looked hallucinated and was transcribed again, {outcome}")
+        elif reasons:
+            print(Fore.YELLOW + f"    Transcript looks hallucinated: {reasons}")
+        return
+    if result["interrupted"]:
+        print(Fore.YELLOW + f"[{finished}/{total} done] Interrupted {result['media_path']} ({took})")
+        return
+
+    print(Fore.RED + f"[{finished}/{total} done] FAILED {result['media_path']} ({took}): {result['error']}")
+    for line in read_log_tail(result["log_path"], lines=5):
+        print(Fore.RED + f"    {line}")
+    print(Fore.RED + f"    Full output: {result['log_path']}")
+
+
+def print_summary(results: list[JobResult], wall_seconds: float):
+    """Throughput of the finished jobs: audio transcribed, wall time and realtime factor."""
+    done = [r for r in results if r["ok"]]
+    timed = [r for r in done if r["duration"]]
+    if not timed:
+        return
+
+    audio_seconds = sum(r["duration"] or 0.0 for r in timed)
+    overall = realtime_factor(audio_seconds, wall_seconds)
+    per_job = [(realtime_factor(r["duration"], r["whisper_seconds"]) or 0.0, r) for r in timed]
+    slowest_rtf, slowest = min(per_job, key=lambda item: item[0])
+
+    print(f"\nTranscribed {format_duration(audio_seconds)} of audio in {format_duration(wall_seconds)}", end="")
+    print(f" ({overall:.1f}x realtime overall)." if overall else ".")
+    print(
+        f"Per file: median {statistics.median(rtf for rtf, _ in per_job):.1f}x realtime, slowest {slowest_rtf:.1f}x ({slowest['media_path']})."
+    )
+    print(f"Wrote {sum(r['cues'] or 0 for r in done)} cues. Timings were added to '{METRICS_FILE}'.")
+
+
 def main():
+    parser = argparse.ArgumentParser(description="Transcribe media files that do not have an .srt yet.")
+    parser.add_argument("path", nargs="?", help=f"Folder containing audio (default: ask, or '{DEFAULT_PATH}').")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=DEFAULT_WORKERS,
+        help=f"Whisper processes to run at once. Each loads its own model (default: {DEFAULT_WORKERS}).",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=DEFAULT_SETTINGS["batch_size"],
+        help=f"Whisper --batch_size (default: {DEFAULT_SETTINGS['batch_size']}).",
+    )
+    parser.add_argument(
+        "--max-attempts",
+        type=int,
+        default=DEFAULT_MAX_ATTEMPTS,
+        help=f"Stop retrying a file after it failed this many times across runs (default: {DEFAULT_MAX_ATTEMPTS}).",
+    )
+    parser.add_argument("--retry-failed", action="store_true", help="Retry files that reached --max-attempts, starting their count over.")
+    parser.add_argument("--no-retry", action="store_true", help="Do not transcribe a file again when its transcript looks hallucinated.")
+    parser.add_argument("--whisper", default=WHISPER_EXECUTABLE, help=f"Whisper executable to run (default: {WHISPER_EXECUTABLE}).")
+    args = parser.parse_args()
+
     # Initialize colorama to auto-reset colors after each print
     init(autoreset=True)
 
     # 1. Get the path to scan
-    path_to_scan = get_scan_path()
+    path_to_scan = os.path.normpath(args.path) if args.path else get_scan_path()
     if not os.path.isdir(path_to_scan):
         print(Fore.RED + f"Error: Base directory '{path_to_scan}' not found.")
         sys.exit(1)
 
     # 2. Find the whisper command
-    whisper_cmd_path = get_whisper_command()
+    whisper_cmd_path = get_whisper_command(args.whisper)
     try:
         # Run a quick --help command to ensure it's found BEFORE starting the loop
         # Added encoding='utf-8' to fix UnicodeDecodeError on Windows
@@ -90,7 +168,7 @@ def main():
             encoding="utf-8",
         )
     except FileNotFoundError:
-        print(Fore.RED + f"Error: Whisper command '{WHISPER_EXECUTABLE}' not found.")
+        print(Fore.RED + f"Error: Whisper command '{args.whisper}' not found.")
         print(Fore.RED + "Please make sure it's in your system PATH or in the same folder as this script.")
         sys.exit(1)
     except subprocess.CalledProcessError:
@@ -111,53 +189,78 @@ def main():
 
     print(f"Found {total_files} files to check.\n")
 
-    # 4. Loop through and process each file
-    for i, file_path in enumerate(files):
-        # os.path.splitext creates ('path/to/file/basename', '.ext')
-        base_name, _ = os.path.splitext(file_path)
-        srt_path = base_name + ".srt"
+    # 4. Queue every file that has no transcript yet. The journal tells
+    # interrupted and failed jobs apart from new ones.
+    journal = JobJournal(JOURNAL_FILE)
+    stale = remove_stale_temp_dirs(path_to_scan)
+    if stale:
+        print(Fore.YELLOW + f"Removed {stale} unfinished whisper output folder(s) from an interrupted run.")
 
-        if os.path.exists(srt_path):
+    pending = []
+    gave_up = []
+    for file_path in files:
+        entry = journal.get(file_path)
+        if os.path.exists(srt_path_for(file_path)):
             # File already has a transcript, print in green
             print(Fore.GREEN + file_path)
+        elif entry and entry["state"] == "failed" and entry["attempts"] >= args.max_attempts and not args.retry_failed:
+            print(Fore.YELLOW + f"{file_path} (failed {entry['attempts']} times, skipping)")
+            gave_up.append(file_path)
         else:
             # File needs transcribing, print in red
-            print(Fore.RED + file_path)
-            print(f"Transcribing {i + 1} out of {total_files}")
-
-            # Build the command arguments
-            command_args = [
-                whisper_cmd_path,
-                file_path,
-                "-l",
-                "English",
-                "--compute_type",
-                "float32",
-                "--batch_size",
-                "16",
-                "-m",
-                "distil-large-v3.5",
-                "--sentence",
-                "-o",
-                "source",
-                "-pp",
-                "--beep_off",
-                "--max_line_width",
-                "60",  # characters per line. 60 with two lines is about 10 seconds per block
-                "--max_line_count",
-                "2",  # lines per block
-            ]
-
-            # Uncomment the line below to run the "translate" task instead
-            # command_args.extend(["--task", "translate"])
-
-            try:
-                # Run the transcription command
-                subprocess.run(command_args, check=False)
-            except subprocess.CalledProcessError as e:
-                print(Fore.RED + f"Error running whisper on {file_path}: {e}")
-            except Exception as e:
-                print(Fore.RED + f"An unexpected error occurred: {e}")
+            note = ""
+            if entry and entry["state"] == "running":
+                note = " (interrupted, resuming)"
+            elif entry and entry["state"] == "failed":
+                note = f" (failed {entry['attempts']} of {args.max_attempts} times, retrying)"
+            print(Fore.RED + file_path + note)
+            pending.append(file_path)
+
+    if gave_up:
+        print(
+            Fore.YELLOW + f"\nSkipping {len(gave_up)} file(s) that failed {args.max_attempts} times. Pass --retry-failed to try them again."
+        )
+
+    if not pending:
+        print(Fore.GREEN + "\nNo files left to transcribe.")
+        return
+
+    print(f"\nTranscribing {len(pending)} file(s) with {args.workers} worker(s), longest first. Logs go to '{LOG_DIR}'.")
+
+    journal.queue(pending, reset_attempts=args.retry_failed)
+    settings = DEFAULT_SETTINGS.copy()
+    settings["batch_size"] = args.batch_size
+    scheduler = TranscriptionScheduler(
+        whisper_cmd_path,
+        settings=settings,
+        workers=args.workers,
+        on_start=print_start,
+        on_finish=print_finish,
+        journal=journal,
+        metrics_path=METRICS_FILE,
+        retry=not args.no_retry,
+    )
+    start = time.perf_counter()
+    try:
+        results = scheduler.run(pending)
+    except KeyboardInterrupt:
+        print(Fore.YELLOW + "\nOperation canceled. Run again to resume the unfinished files.")
+        sys.exit(1)
+
+    print_summary(results, time.perf_counter() - start)
+
+    failed = [r for r in results if not r["ok"]]
+    print(f"\nTranscribed {len(results) - len(failed)} of {len(results)} file(s).")
+    flagged = [r for r in results if r["ok"] and r["quality"] and r["quality"]["flagged"]]
+    if flagged:
+        print(Fore.YELLOW + f"{len(flagged)} transcript(s) still look hallucinated; cleanup_audio.py keeps their audio:")
+        for result in flagged:
+            print(Fore.YELLOW + f"  {result['srt_path']}")
+    if failed:
+        print(Fore.RED + f"{len(failed)} failed:")
+        for result in failed:
+            print(Fore.RED + f"  {result['media_path']}: {result['error']}")
+        sys.exit(1)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Report on transcription throughput from transcribe-metrics.jsonl.
+
+Prints the realtime factor (seconds of audio per second of wall time) per day,
+or per week/month, as a text bar chart, then a table comparing each whisper
+setting (model, compute type, batch size, workers) that has been used.
+"""
+
+import argparse
+import statistics
+import sys
+from datetime import datetime
+
+from _whisper import METRICS_FILE, JobMetrics, load_metrics
+
+# Ensure UTF-8 output for terminal
+if sys.stdout.encoding != "utf-8":
+    sys.stdout.reconfigure(encoding="utf-8")  # type: ignore
+
+# Width of the longest bar in the chart.
+CHART_WIDTH = 50
+
+
+def period_of(metrics: JobMetrics, by: str) -> str:
+    finished = datetime.fromisoformat(metrics["finished_at"])
+    if by == "month":
+        return finished.strftime("%Y-%m")
+    if by == "week":
+        year, week, _ = finished.isocalendar()
+        return f"{year}-W{week:02}"
+    return finished.strftime("%Y-%m-%d")
+
+
+def overall_rtf(rows: list[JobMetrics]) -> float:
+    """Total audio over total wall time, so long files weigh more than short ones."""
+    audio = sum(r["audio_seconds"] or 0.0 for r in rows)
+    wall = sum(r["wall_seconds"] for r in rows)
+    return audio / wall if wall else 0.0
+
+
+def print_chart(groups: dict[str, list[JobMetrics]]):
+    best = max(overall_rtf(rows) for rows in groups.values())
+    label_width = max(len(label) for label in groups)
+    for label, rows in groups.items():
+        rtf = overall_rtf(rows)
+        bar = "#" * max(1, round(rtf / best * CHART_WIDTH)) if best else ""
+        audio_hours = sum(r["audio_seconds"] or 0.0 for r in rows) / 3600
+        print(f"{label:<{label_width}} {bar:<{CHART_WIDTH}} {rtf:7.1f}x  ({len(rows)} files, {audio_hours:.1f} h audio)")
+
+
+def print_settings_table(rows: list[JobMetrics]):
+    groups: dict[tuple, list[JobMetrics]] = {}
+    for r in rows:
+        groups.setdefault((r["model"], r["compute_type"], r["batch_size"], r["workers"]), []).append(r)
+
+    print(f"{'Model':<22} {'Compute':<10} {'Batch':>5} {'Workers':>7} {'Files':>6} {'Overall':>9} {'Median':>8} {'Cues/min':>9}")
+    for (model, compute_type, batch_size, workers), group in sorted(groups.items(), key=lambda item: -overall_rtf(item[1])):
+        median = statistics.median(r["realtime_factor"] or 0.0 for r in group)
+        audio_minutes = sum(r["audio_seconds"] or 0.0 for r in group) / 60
+        cues_per_minute = sum(r["cues"] or 0 for r in group) / audio_minutes if audio_minutes else 0.0
+        print(
+            f"{model:<22} {compute_type:<10} {batch_size:>5} {workers:>7} {len(group):>6} "
+            f"{overall_rtf(group):>8.1f}x {median:>7.1f}x {cues_per_minute:>9.1f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=f"Chart transcription realtime factor over time from '{METRICS_FILE}'.")
+    parser.add_argument(
+        "--by", choices=["day", "week", "month"], default="day", help="Group the chart by day, week or month (default: day)."
+    )
+    parser.add_argument("--model", help="Only jobs run with this model.")
+    parser.add_argument("--since", help="Only jobs finished on or after this date (YYYY-MM-DD).")
+    parser.add_argument("--metrics", default=METRICS_FILE, help=f"Metrics file to read (default: {METRICS_FILE}).")
+    args = parser.parse_args()
+
+    rows = [r for r in load_metrics(args.metrics) if r["ok"] and r["realtime_factor"]]
+    if args.model:
+        rows = [r for r in rows if r["model"] == args.model]
+    if args.since:
+        rows = [r for r in rows if r["finished_at"][:10] >= args.since]
+
+    if not rows:
+        print(f"No timed transcriptions found in '{args.metrics}'. Run transcribe_audio.py first (ffprobe is needed for audio durations).")
+        return
+
+    groups: dict[str, list[JobMetrics]] = {}
+    for r in sorted(rows, key=lambda r: r["finished_at"]):
+        groups.setdefault(period_of(r, args.by), []).append(r)
+
+    print(f"Realtime factor per {args.by} (seconds of audio per second of wall time, higher is faster)\n")
+    print_chart(groups)
+    print("\nBy whisper settings\n")
+    print_settings_table(rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,50 @@
 #!/usr/bin/env python3
 
+import argparse
+import hashlib
 import json
 import os
 import re
 import sys
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
+from typing import TypedDict
 
 import requests
-import zstandard as zstd
 from _common import BASE_DIR, FILENAME_PATTERN, load_config
+from _index import TranscriptIndex
+from _zstd_utils import (
+    DEFAULT_DICT_SIZE,
+    DEFAULT_SAMPLE_BYTES,
+    DICT_DIR,
+    CompressorCache,
+    LevelPolicy,
+    load_dictionary,
+    save_dictionary,
+    split_samples,
+    train_dictionary,
+)
 from requests.adapters import HTTPAdapter
 from tqdm import tqdm
 from urllib3.util.retry import Retry
 
+# --- Configuration ---
+
+# Number of files read, compressed and uploaded at the same time.
+# Uploads are bound by round-trip latency, so this can be well above the CPU count.
+DEFAULT_WORKERS = 8
+
+# Records what has already been uploaded, per server, so unchanged transcripts are not re-sent.
+MANIFEST_FILE = "upload-manifest.json"
+
+# With --batch, many payloads are packed into one request up to this many MB of transcripts.
+DEFAULT_BATCH_MB = 8
+
+# Responses to /transcripts/batch that mean the server has no batch support.
+BATCH_UNSUPPORTED_STATUS = (404, 405, 501)
+
 # --- End Configuration ---
 
 
@@ -36,6 +67,116 @@ def build_session() -> requests.Session:
     return session
 
 
+class SessionPool:
+    """
+    Hands out one retrying session per worker thread, since requests.Session
+    is not safe to share between threads. Closes them all on exit.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._sessions: list[requests.Session] = []
+
+    def get(self) -> requests.Session:
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = build_session()
+            self._local.session = session
+            with self._lock:
+                self._sessions.append(session)
+        return session
+
+    def close(self):
+        with self._lock:
+            for session in self._sessions:
+                session.close()
+            self._sessions.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class UploadManifest:
+    """
+    Local record of the last successful upload of each transcript, keyed by stream ID.
+    Each entry stores the file name, a sha256 of the uploaded srt text, its size and
+    mtime, and when it was uploaded. Entries are kept per server_url so pointing the
+    config at another server does not skip anything.
+    """
+
+    def __init__(self, path: str, server_url: str):
+        self.path = path
+        self.server_url = server_url
+        self._lock = threading.Lock()
+        self._servers: dict[str, dict[str, dict]] = {}
+        self._dirty = False
+
+        if os.path.exists(path):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    data = json.load(f)
+                self._servers = data.get("servers", {})
+            except (OSError, ValueError, AttributeError) as e:
+                print(f"Warning: could not read '{path}' ({e}). Starting with an empty manifest.")
+
+        self._entries = self._servers.setdefault(server_url, {})
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def entry(self, stream_id: str) -> dict | None:
+        """The last upload recorded for stream_id (file, hash, size, mtime_ns, uploaded_at), if any."""
+        with self._lock:
+            entry = self._entries.get(stream_id)
+        return dict(entry) if entry else None
+
+    def matches_stat(self, stream_id: str, file: str, size: int, mtime_ns: int) -> bool:
+        """Fast check: same name, size and mtime as the last upload. No file read needed."""
+        with self._lock:
+            entry = self._entries.get(stream_id)
+        return entry is not None and entry["file"] == file and entry["size"] == size and entry["mtime_ns"] == mtime_ns
+
+    def matches_hash(self, stream_id: str, file: str, content_hash: str, size: int, mtime_ns: int) -> bool:
+        """
+        Slow check for files whose mtime moved but content may not have (e.g. re-checked out).
+        Refreshes the stored stat on a match so the next run takes the fast path.
+        """
+        with self._lock:
+            entry = self._entries.get(stream_id)
+            if entry is None or entry["file"] != file or entry["hash"] != content_hash:
+                return False
+            entry["size"] = size
+            entry["mtime_ns"] = mtime_ns
+            self._dirty = True
+            return True
+
+    def record(self, stream_id: str, file: str, content_hash: str, size: int, mtime_ns: int):
+        with self._lock:
+            self._entries[stream_id] = {
+                "file": file,
+                "hash": content_hash,
+                "size": size,
+                "mtime_ns": mtime_ns,
+                "uploaded_at": datetime.now().isoformat(timespec="seconds"),
+            }
+            self._dirty = True
+
+    def save(self):
+        """Write the manifest atomically so an interrupted save never corrupts it."""
+        with self._lock:
+            if not self._dirty:
+                return
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"version": 1, "servers": self._servers}, f, indent=1, sort_keys=True, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+            self._dirty = False
+
+
 def get_upload_selection():
     """
     Asks the user how they want to filter the upload.
@@ -72,96 +213,432 @@ def get_upload_selection():
             print("Invalid input. Please enter a number, YYYY-MM, or press Enter.")
 
 
-def process_and_upload(session, root, file, streamer_name, cutoff_date, month_filter, headers, server_url):
+def build_payload(streamer_name: str, file: str, srt_content: str) -> dict[str, str] | None:
+    """
+    The JSON body POSTed to /transcript for one transcript.
+    Returns None if the filename does not match FILENAME_PATTERN or has an invalid date.
+    """
+    match = FILENAME_PATTERN.match(file)
+    if not match:
+        return None
+
+    try:
+        formatted_date = datetime.strptime(match.group(1), "%Y%m%d").strftime("%Y-%m-%d")
+    except ValueError:
+        return None
+
+    return {
+        "streamer": streamer_name,
+        "date": formatted_date,
+        "streamType": match.group(2),
+        "streamTitle": match.group(3).strip(),
+        "id": match.group(4),
+        "srt": srt_content,
+    }
+
+
+def encode_payload(payload: dict[str, str]) -> bytes:
+    """Serialize a payload exactly as it is sent, before compression."""
+    return json.dumps(payload).encode("utf-8")
+
+
+class PreparedUpload(TypedDict):
+    """A transcript that passed the filters and is ready to send."""
+
+    stream_id: str
+    file: str
+    content_hash: str
+    size: int
+    mtime_ns: int
+    data: bytes  # encoded payload, before compression
+
+
+def prepare_upload(root, file, streamer_name, cutoff_date, month_filter, manifest=None, force=False):
     """
     Parses a single transcript file, checks its date/month (if required),
-    and uploads it to the server.
+    reads it and builds its payload. When a manifest is given and force is
+    not set, files whose content matches the last upload are skipped.
 
     Returns:
-        (status_string, original_size, compressed_size, upload_seconds)
+        (status_string, prepared_upload)
 
         status_string:
-            'success' if uploaded
-            'skipped' if skipped due to date
+            'ready' if the payload should be sent (prepared_upload is set)
+            'skipped_date' if skipped due to date
+            'skipped_unchanged' if identical to the last upload
             'failed' if an error occurred
     """
     match = FILENAME_PATTERN.match(file)
     if not match:
         # Use tqdm.write to print without breaking the bar
         tqdm.write(f"-> Skipping file (does not match pattern): {file}")
-        return "failed", 0, 0, 0.0
+        return "failed", None
 
     # Extract data from regex groups
     date_str = match.group(1)  # This is 'YYYYMMDD'
-    stream_type = match.group(2)
-    stream_title = match.group(3).strip()
     stream_id = match.group(4)
 
     try:
         # Parse the 'YYYYMMDD' string into a date object
         file_date_obj = datetime.strptime(date_str, "%Y%m%d").date()
-
-        # Create the desired 'YYYY-MM-DD' formatted string
-        formatted_date = file_date_obj.strftime("%Y-%m-%d")
-
     except ValueError:
         tqdm.write(f"-> Skipping file (invalid date format): {file}")
-        return "failed", 0, 0, 0.0
+        return "failed", None
 
     if month_filter and not date_str.startswith(month_filter):
-        return "skipped_date", 0, 0, 0.0
+        return "skipped_date", None
 
     if cutoff_date and file_date_obj < cutoff_date:
         # File is too old, skip it
-        return "skipped_date", 0, 0, 0.0
+        return "skipped_date", None
 
     full_path = os.path.join(root, file)
     try:
+        stat = os.stat(full_path)
+        if manifest is not None and not force and manifest.matches_stat(stream_id, file, stat.st_size, stat.st_mtime_ns):
+            return "skipped_unchanged", None
+
         with open(full_path, encoding="utf-8") as f:
             srt_content = f.read()
     except Exception as e:
         tqdm.write(f"-> ERROR reading file {full_path}: {e}")
-        return "failed", 0, 0, 0.0
-
-    payload = {
-        "streamer": streamer_name,
-        "date": formatted_date,
-        "streamType": stream_type,
-        "streamTitle": stream_title,
-        "id": stream_id,
-        "srt": srt_content,
+        return "failed", None
+
+    content_hash = hashlib.sha256(srt_content.encode("utf-8")).hexdigest()
+    if manifest is not None and not force and manifest.matches_hash(stream_id, file, content_hash, stat.st_size, stat.st_mtime_ns):
+        return "skipped_unchanged", None
+
+    payload = build_payload(streamer_name, file, srt_content)
+    assert payload is not None  # filename was validated above
+
+    return "ready", {
+        "stream_id": stream_id,
+        "file": file,
+        "content_hash": content_hash,
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "data": encode_payload(payload),
     }
 
-    try:
-        # Compress payload
-        json_data = json.dumps(payload).encode("utf-8")
-        cctx = zstd.ZstdCompressor(level=22)
-        compressed_data = cctx.compress(json_data)
 
-        # Add compression header to a copy of headers to avoid side effects
-        req_headers = headers.copy()
-        req_headers["Content-Encoding"] = "zstd"
+def compress_for_upload(data: bytes, headers: dict[str, str], compressors: CompressorCache, policy: LevelPolicy):
+    """
+    Compress a request body at the level the policy picks, and return it with the
+    request headers to send. The measured compress time is fed back to the policy.
+
+    Returns:
+        (compressed_data, request_headers, level, compress_seconds)
+    """
+    level = policy.choose(len(data))
+    compress_start = time.perf_counter()
+    compressed_data = compressors.get(level).compress(data)
+    compress_seconds = time.perf_counter() - compress_start
+    policy.observe_compress(level, len(data), compress_seconds)
+
+    # Add compression header to a copy of headers to avoid side effects
+    req_headers = headers.copy()
+    req_headers["Content-Encoding"] = "zstd"
+    if compressors.dictionary:
+        # The dictionary ID is also in the zstd frame header; this saves the server parsing it.
+        req_headers["X-Zstd-Dictionary-Id"] = str(compressors.dictionary.dict_id())
+
+    return compressed_data, req_headers, level, compress_seconds
+
+
+def send_single(session, item: PreparedUpload, headers, server_url, manifest=None, compressors=None, policy=None):
+    """
+    POST one prepared payload to /transcript. The zstd level comes from the policy
+    (see LevelPolicy) and the compressor from the per-thread cache; if it holds a
+    trained dictionary, its ID is sent along. Successful uploads are recorded in
+    the manifest when one is given.
+
+    Returns:
+        (status_string, original_size, compressed_size, upload_seconds, level, compress_seconds)
+    """
+    compressors = compressors or CompressorCache()
+    policy = policy or LevelPolicy(dictionary=compressors.dictionary is not None)
+
+    try:
+        json_data = item["data"]
+        compressed_data, req_headers, level, compress_seconds = compress_for_upload(json_data, headers, compressors, policy)
 
         uri = f"{server_url}/transcript"
         start = time.perf_counter()
         response = session.post(uri, data=compressed_data, headers=req_headers, timeout=30)
         upload_seconds = time.perf_counter() - start
         response.raise_for_status()  # Raise exception for 4xx/5xx errors
+        policy.observe_upload(len(compressed_data), upload_seconds)
 
-        return "success", len(json_data), len(compressed_data), upload_seconds
+        if manifest is not None:
+            manifest.record(item["stream_id"], item["file"], item["content_hash"], item["size"], item["mtime_ns"])
+        return "success", len(json_data), len(compressed_data), upload_seconds, level, compress_seconds
 
     except requests.exceptions.HTTPError as e:
-        tqdm.write(f"-> HTTP ERROR for {file}: {e.response.status_code} - {e.response.text}")
+        tqdm.write(f"-> HTTP ERROR for {item['file']}: {e.response.status_code} - {e.response.text}")
     except requests.exceptions.RequestException as e:
-        tqdm.write(f"-> ERROR uploading {file}: {e}")
+        tqdm.write(f"-> ERROR uploading {item['file']}: {e}")
+
+    return "failed", 0, 0, 0.0, 0, 0.0
+
+
+def process_and_upload(
+    session,
+    root,
+    file,
+    streamer_name,
+    cutoff_date,
+    month_filter,
+    headers,
+    server_url,
+    manifest=None,
+    force=False,
+    compressors=None,
+    policy=None,
+):
+    """
+    Prepares a single transcript file (see prepare_upload) and uploads it
+    to the server (see send_single).
 
-    return "failed", 0, 0, 0.0
+    Returns:
+        (status_string, original_size, compressed_size, upload_seconds, level, compress_seconds)
+
+        status_string:
+            'success' if uploaded
+            'skipped_date' if skipped due to date
+            'skipped_unchanged' if identical to the last upload
+            'failed' if an error occurred
+    """
+    status, item = prepare_upload(root, file, streamer_name, cutoff_date, month_filter, manifest, force)
+    if item is None:
+        return status, 0, 0, 0.0, 0, 0.0
+    return send_single(session, item, headers, server_url, manifest, compressors, policy)
+
+
+class BatchUploader:
+    """
+    Sends many prepared payloads in one POST to /transcripts/batch: one JSON
+    payload per line (NDJSON), compressed as a single zstd frame. The server
+    answers with a result per item:
+
+        {"results": [{"id": "...", "ok": true}, {"id": "...", "ok": false, "error": "..."}]}
+
+    If the server does not know the endpoint, batching is switched off for the
+    rest of the run and every item is sent with send_single instead.
+    """
+
+    def __init__(self, headers, server_url, manifest=None, compressors=None, policy=None):
+        self.headers = {**headers, "Content-Type": "application/x-ndjson"}
+        self.single_headers = headers
+        self.server_url = server_url
+        self.manifest = manifest
+        self.compressors = compressors or CompressorCache()
+        self.policy = policy or LevelPolicy(dictionary=self.compressors.dictionary is not None)
+        self.supported = True
+
+    def upload(self, session, items: list[PreparedUpload]):
+        """
+        Returns:
+            (statuses, requests)
+
+            statuses: one status string per item, as in process_and_upload
+            requests: (original_size, compressed_size, upload_seconds, level, compress_seconds) per request sent
+        """
+        if not items:
+            return [], []
+        if self.supported:
+            result = self._post_batch(session, items)
+            if result is not None:
+                return result
+        return self._upload_singly(session, items)
+
+    def _upload_singly(self, session, items):
+        statuses, requests_sent = [], []
+        for item in items:
+            status, orig, comp, seconds, level, compress_seconds = send_single(
+                session, item, self.single_headers, self.server_url, self.manifest, self.compressors, self.policy
+            )
+            statuses.append(status)
+            if status == "success":
+                requests_sent.append((orig, comp, seconds, level, compress_seconds))
+        return statuses, requests_sent
+
+    def _post_batch(self, session, items):
+        """Returns None if the server does not support batches."""
+        body = b"\n".join(item["data"] for item in items) + b"\n"
+        compressed_data, req_headers, level, compress_seconds = compress_for_upload(body, self.headers, self.compressors, self.policy)
+
+        uri = f"{self.server_url}/transcripts/batch"
+        try:
+            start = time.perf_counter()
+            response = session.post(uri, data=compressed_data, headers=req_headers, timeout=120)
+            upload_seconds = time.perf_counter() - start
+            if response.status_code in BATCH_UNSUPPORTED_STATUS:
+                if self.supported:
+                    self.supported = False
+                    tqdm.write(f"-> Server does not support batch uploads ({response.status_code}). Sending files one at a time.")
+                return None
+            response.raise_for_status()
+            results = {r.get("id"): r for r in response.json().get("results", [])}
+        except requests.exceptions.HTTPError as e:
+            tqdm.write(f"-> HTTP ERROR for batch of {len(items)}: {e.response.status_code} - {e.response.text}")
+            return ["failed"] * len(items), []
+        except (requests.exceptions.RequestException, ValueError, AttributeError) as e:
+            tqdm.write(f"-> ERROR uploading batch of {len(items)}: {e}")
+            return ["failed"] * len(items), []
+
+        self.policy.observe_upload(len(compressed_data), upload_seconds)
+        statuses = []
+        for item in items:
+            result = results.get(item["stream_id"])
+            if result and result.get("ok"):
+                statuses.append("success")
+                if self.manifest is not None:
+                    self.manifest.record(item["stream_id"], item["file"], item["content_hash"], item["size"], item["mtime_ns"])
+            else:
+                error = result.get("error", "unknown error") if result else "no result returned"
+                tqdm.write(f"-> ERROR for {item['file']}: {error}")
+                statuses.append("failed")
+
+        return statuses, [(len(body), len(compressed_data), upload_seconds, level, compress_seconds)]
+
+
+def group_into_batches(files, cap_bytes: int) -> list[list[tuple[str, str, str]]]:
+    """Split (root, file, streamer_name) entries into groups of about cap_bytes on disk."""
+    batches: list[list[tuple[str, str, str]]] = []
+    current: list[tuple[str, str, str]] = []
+    current_bytes = 0
+    for root, file, streamer_name in files:
+        try:
+            size = os.path.getsize(os.path.join(root, file))
+        except OSError:
+            size = 0  # prepare_upload reports the read error
+
+        if current and current_bytes + size > cap_bytes:
+            batches.append(current)
+            current, current_bytes = [], 0
+        current.append((root, file, streamer_name))
+        current_bytes += size
+
+    if current:
+        batches.append(current)
+    return batches
+
+
+def find_transcripts(month_filter=None, cutoff_date=None) -> list[tuple[str, str, str]]:
+    """
+    (root, file, streamer_name) for every .srt file in a streamer folder, from the
+    local index. With month_filter (YYYY or YYYYMM) or cutoff_date, only files dated
+    in that range; names that do not parse are always included so they get reported.
+    """
+    since = cutoff_date.strftime("%Y%m%d") if cutoff_date else None
+    with TranscriptIndex() as index:
+        rows = index.query(ext=".srt", date_prefix=month_filter, since=since, include_unparsed=True)
+    return [(row["dir"], row["name"], row["streamer"]) for row in rows if row["streamer"]]
+
+
+def train_dict(args):
+    """Train a new dictionary version from every local transcript payload."""
+    if not os.path.isdir(BASE_DIR):
+        print(f"Error: Base directory '{BASE_DIR}' not found.")
+        sys.exit(1)
+
+    print("Scanning directories to find transcripts...")
+    payloads = []
+    for root, file, streamer_name in tqdm(find_transcripts(), desc="Reading Transcripts", unit="file"):
+        try:
+            with open(os.path.join(root, file), encoding="utf-8") as f:
+                payload = build_payload(streamer_name, file, f.read())
+        except Exception as e:
+            tqdm.write(f"-> ERROR reading file {file}: {e}")
+            continue
+        if payload:
+            payloads.append(encode_payload(payload))
+
+    if not payloads:
+        print("No transcripts found to train on.")
+        sys.exit(1)
+
+    samples = split_samples(payloads, max_total=int(args.sample_mb * 1024 * 1024))
+    sample_bytes = sum(len(s) for s in samples)
+    print(f"Training a {args.size / 1024:.0f} KB dictionary on {len(samples)} samples ({sample_bytes / 1024 / 1024:.1f} MB)...")
+    start = time.perf_counter()
+    dictionary = train_dictionary(samples, dict_size=args.size)
+    print(f"Trained in {time.perf_counter() - start:.1f} s.")
+
+    path = save_dictionary(dictionary, len(samples), sample_bytes)
+    print(f"Saved dictionary {dictionary.dict_id()} to '{path}' and marked it current.")
 
 
 def main():
     """
     Main function to walk the directory and process files.
     """
+    parser = argparse.ArgumentParser(description="Upload transcripts to the archive server.")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=DEFAULT_WORKERS,
+        help=f"Number of files to upload concurrently (default: {DEFAULT_WORKERS}). Use 1 to upload one at a time.",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help=f"Re-upload every selected transcript, even if '{MANIFEST_FILE}' says it is unchanged.",
+    )
+    parser.add_argument(
+        "--dictionary",
+        nargs="?",
+        const="current",
+        metavar="ID",
+        help="Compress with a trained zstd dictionary (the current version, or the given ID). The server must have the same dictionary.",
+    )
+    parser.add_argument(
+        "--level",
+        type=int,
+        choices=range(1, 23),
+        metavar="1-22",
+        help="Always compress at this zstd level instead of picking one from payload size and measured upload speed.",
+    )
+    parser.add_argument(
+        "--batch",
+        action="store_true",
+        help="Pack many transcripts into each request. Falls back to one file per request if the server does not support it.",
+    )
+    parser.add_argument(
+        "--batch-mb",
+        type=float,
+        default=DEFAULT_BATCH_MB,
+        help=f"Approximate transcript megabytes per batch (default: {DEFAULT_BATCH_MB}).",
+    )
+    subparsers = parser.add_subparsers(dest="command")
+    train_parser = subparsers.add_parser("train-dict", help=f"Train a zstd dictionary from the local transcripts into '{DICT_DIR}'.")
+    train_parser.add_argument(
+        "--size",
+        type=int,
+        default=DEFAULT_DICT_SIZE,
+        help=f"Dictionary size in bytes (default: {DEFAULT_DICT_SIZE}).",
+    )
+    train_parser.add_argument(
+        "--sample-mb",
+        type=float,
+        default=DEFAULT_SAMPLE_BYTES / 1024 / 1024,
+        help=f"Megabytes of payload samples to train on (default: {DEFAULT_SAMPLE_BYTES // 1024 // 1024}).",
+    )
+    args = parser.parse_args()
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+
+    if args.command == "train-dict":
+        train_dict(args)
+        return
+
+    dictionary = None
+    if args.dictionary:
+        try:
+            dictionary = load_dictionary(None if args.dictionary == "current" else int(args.dictionary))
+        except (OSError, ValueError) as e:
+            print(f"Error loading zstd dictionary '{args.dictionary}': {e}")
+            sys.exit(1)
 
     config = load_config()
     api_key = config["api_key"]
@@ -191,6 +668,18 @@ def main():
         print("\nStarting upload: Processing ALL transcripts.")
 
     print(f"Target server: {server_url}")
+    if dictionary:
+        print(f"Compressing with zstd dictionary {dictionary.dict_id()}.")
+    if args.level:
+        print(f"Compressing at fixed zstd level {args.level} (--level).")
+    compressors = CompressorCache(dictionary)
+    policy = LevelPolicy(dictionary=dictionary is not None, fixed_level=args.level)
+
+    manifest = UploadManifest(MANIFEST_FILE, server_url)
+    if args.force:
+        print("Forcing upload of all selected transcripts (--force).")
+    else:
+        print(f"Skipping transcripts unchanged since their last upload ({len(manifest)} recorded in '{MANIFEST_FILE}').")
 
     headers = {
         "X-API-Key": api_key,
@@ -199,65 +688,108 @@ def main():
 
     # --- First pass: Collect all files to process ---
     print("Scanning directories to find transcripts...")
-    files_to_process = []
-    for root, dirs, files in os.walk(BASE_DIR):
-        if root == BASE_DIR:
-            if not dirs:
-                print("No streamer folders found in 'Transcript' directory.")
-            continue
+    all_transcripts = find_transcripts()
 
-        try:
-            streamer_name = os.path.relpath(root, BASE_DIR).split(os.path.sep)[0]
-        except Exception:
-            # This can happen if root == BASE_DIR, which we skip
-            continue
-
-        if not streamer_name:
-            continue
-
-        for file in files:
-            if file.endswith(".srt"):
-                # Store (root, file, streamer_name)
-                files_to_process.append((root, file, streamer_name))
-
-    if not files_to_process:
+    if not all_transcripts:
         print("No .srt files found to upload.")
         sys.exit(0)
 
-    print(f"Found {len(files_to_process)} total transcripts.")
+    print(f"Found {len(all_transcripts)} total transcripts.")
+    files_to_process = find_transcripts(month_filter, cutoff_date) if (month_filter or cutoff_date) else all_transcripts
 
     # --- Second pass: Process files with progress bar ---
     success_count = 0
     fail_count = 0
-    skipped_date_count = 0
+    skipped_date_count = len(all_transcripts) - len(files_to_process)
+    skipped_unchanged_count = 0
     total_original_bytes = 0
     total_compressed_bytes = 0
     upload_times: list[float] = []
+    compress_times: list[float] = []
+    level_counts: dict[int, int] = {}
+
+    # Workers overlap read, encode, compress and POST across files.
+    # Each task returns (statuses, requests): a status per file and the
+    # (original, compressed, seconds, level, compress_seconds) of each request
+    # sent. Results are tallied here on the main thread as they complete.
+    if args.batch:
+        tasks = group_into_batches(files_to_process, int(args.batch_mb * 1024 * 1024))
+        print(f"Uploading in {len(tasks)} batch(es) of up to {args.batch_mb:g} MB with {args.workers} worker(s).")
+    else:
+        tasks = [[item] for item in files_to_process]
+        print(f"Uploading with {args.workers} worker(s).")
+    batcher = BatchUploader(headers, server_url, manifest=manifest, compressors=compressors, policy=policy)
 
-    # Session with retry on transient failures
-    with build_session() as session:
-        # Wrap the list with tqdm for the progress bar
-        for root, file, streamer_name in tqdm(files_to_process, desc="Uploading Transcripts", unit="file"):
-            result, orig_size, comp_size, upload_seconds = process_and_upload(
-                session,
-                root,
-                file,
-                streamer_name,
-                cutoff_date,
-                month_filter,
-                headers,
-                server_url,
-            )
-
-            if result == "success":
-                success_count += 1
-                total_original_bytes += orig_size
-                total_compressed_bytes += comp_size
-                upload_times.append(upload_seconds)
-            elif result == "failed":
-                fail_count += 1
-            elif result == "skipped_date":
-                skipped_date_count += 1
+    wall_start = time.perf_counter()
+    try:
+        with SessionPool() as sessions, ThreadPoolExecutor(max_workers=args.workers) as executor:
+
+            def upload_one(root, file, streamer_name):
+                result, orig_size, comp_size, upload_seconds, level, compress_seconds = process_and_upload(
+                    sessions.get(),
+                    root,
+                    file,
+                    streamer_name,
+                    cutoff_date,
+                    month_filter,
+                    headers,
+                    server_url,
+                    manifest=manifest,
+                    force=args.force,
+                    compressors=compressors,
+                    policy=policy,
+                )
+                sent = [(orig_size, comp_size, upload_seconds, level, compress_seconds)] if result == "success" else []
+                return [result], sent
+
+            def upload_group(group):
+                statuses, items = [], []
+                for root, file, streamer_name in group:
+                    status, item = prepare_upload(root, file, streamer_name, cutoff_date, month_filter, manifest, args.force)
+                    if item is None:
+                        statuses.append(status)
+                    else:
+                        items.append(item)
+                sent_statuses, sent = batcher.upload(sessions.get(), items)
+                return statuses + sent_statuses, sent
+
+            if args.batch:
+                futures = {executor.submit(upload_group, group) for group in tasks}
+            else:
+                futures = {executor.submit(upload_one, *group[0]) for group in tasks}
+
+            try:
+                with tqdm(total=len(files_to_process), desc="Uploading Transcripts", unit="file") as bar:
+                    for future in as_completed(futures):
+                        statuses, sent = future.result()
+                        bar.update(len(statuses))
+
+                        for result in statuses:
+                            if result == "success":
+                                success_count += 1
+                            elif result == "failed":
+                                fail_count += 1
+                            elif result == "skipped_date":
+                                skipped_date_count += 1
+                            elif result == "skipped_unchanged":
+                                skipped_unchanged_count += 1
+
+                        for orig_size, comp_size, upload_seconds, level, compress_seconds in sent:
+                            total_original_bytes += orig_size
+                            total_compressed_bytes += comp_size
+                            upload_times.append(upload_seconds)
+                            compress_times.append(compress_seconds)
+                            level_counts[level] = level_counts.get(level, 0) + 1
+            except KeyboardInterrupt:
+                # Drop queued files; in-flight uploads finish before the pool exits.
+                for future in futures:
+                    future.cancel()
+                print("\nUpload interrupted. Waiting for in-flight uploads to finish...")
+                raise
+    finally:
+        # Saved after the pool drains so in-flight uploads are recorded too.
+        manifest.save()
+    wall_seconds = time.perf_counter() - wall_start
 
     print("\n--- Upload Complete ---")
     print(f"Successfully uploaded: {success_count}")
@@ -265,6 +797,8 @@ def main():
         print(f"Failed to upload:   	{fail_count}")
     if cutoff_date or month_filter:
         print(f"Skipped (non-matching): {skipped_date_count}")
+    if skipped_unchanged_count > 0:
+        print(f"Skipped (unchanged):    {skipped_unchanged_count}")
 
     if total_original_bytes > 0:
         saved_bytes = total_original_bytes - total_compressed_bytes
@@ -279,10 +813,21 @@ def main():
         max_time = max(upload_times)
         min_time = min(upload_times)
         print("\n--- Upload Timing ---")
-        print(f"Total upload time: {total_time:.2f} s")
-        print(f"Average per file:  {avg_time * 1000:.1f} ms")
-        print(f"Largest:           {max_time * 1000:.1f} ms")
-        print(f"Smallest:          {min_time * 1000:.1f} ms")
+        print(f"Wall time:           {wall_seconds:.2f} s ({args.workers} workers)")
+        print(f"Requests sent:       {len(upload_times)}")
+        print(f"Total upload time:   {total_time:.2f} s")
+        print(f"Average per request: {avg_time * 1000:.1f} ms")
+        print(f"Largest:             {max_time * 1000:.1f} ms")
+        print(f"Smallest:            {min_time * 1000:.1f} ms")
+
+    if compress_times:
+        levels_used = ", ".join(f"{level} x{count}" for level, count in sorted(level_counts.items()))
+        print("\n--- Compression ---")
+        print(f"Levels used:         {levels_used}")
+        print(f"Compress time:       {sum(compress_times):.2f} s")
+        print(f"Average per request: {sum(compress_times) / len(compress_times) * 1000:.1f} ms")
+        if not args.level:
+            print(f"Measured link:       {policy.throughput / 1024 / 1024:.2f} MB/s")
 
 
 if __name__ == "__main__":
@@ -1,30 +1,93 @@
 #!/usr/bin/env python3
 
+import argparse
+import codecs
+import hashlib
+import itertools
+import json
 import os
 import sys
+import time
+from collections.abc import Iterable, Iterator
 from datetime import datetime
 from typing import TypedDict
+from urllib.parse import urljoin
 
 import requests
-from _common import BASE_DIR, FILENAME_PATTERN, load_config
+import zstandard as zstd
+from _common import BASE_DIR, load_config
+from _index import IndexedFile, TranscriptIndex
+from upload_transcripts import MANIFEST_FILE, UploadManifest
+from urllib3.util.request import ACCEPT_ENCODING
 
 # --- Configuration ---
 
 REPORT_FILE: str = "missing.txt"
 
+# The same findings as REPORT_FILE, as JSON for other scripts to read. Written on every run.
+JSON_REPORT_FILE: str = "missing.json"
+
+# The last /info response per server, with its ETag and cursor, plus a hash
+# cache for local transcripts. Lets a run fetch only what changed.
+SNAPSHOT_FILE: str = "verify-snapshot.json"
+
+# Fetch the full /info list when the snapshot is older than this, so entries the
+# server deleted (which a delta may not report) are eventually noticed.
+FULL_REFRESH_HOURS: float = 24
+
+# Entries per /info page, for servers that paginate (others ignore ?limit=).
+INFO_PAGE_SIZE: int = 5000
+
+# /info is read in chunks of this many bytes and parsed as it arrives.
+INFO_CHUNK_SIZE: int = 64 * 1024
+
+# Compressed /info responses are asked for; zstd is decoded with zstandard.
+INFO_ACCEPT_ENCODING: str = "zstd, gzip"
+
 # --- Type Definitions ---
 
 
-class StreamMetadata(TypedDict):
+class ServerStream:
+    """
+    One /info entry. Slots instead of a dict per entry keeps a large catalogue
+    compact, and the repeated streamer and type strings are interned.
+    """
+
+    __slots__ = ("streamer", "date", "streamType", "streamTitle", "id", "hash")
+
+    FIELDS = __slots__
+
+    def __init__(self, streamer: str, date: str, streamType: str, streamTitle: str, id: str, hash: str = ""):
+        self.streamer = sys.intern(streamer)
+        self.date = date
+        self.streamType = sys.intern(streamType)
+        self.streamTitle = streamTitle
+        self.id = id
+        self.hash = hash
+
+    @classmethod
+    def from_json(cls, entry: dict) -> "ServerStream":
+        return cls(*(str(entry.get(field) or "") for field in cls.FIELDS))
+
+    @classmethod
+    def from_row(cls, row: list[str]) -> "ServerStream":
+        return cls(*row)
+
+    def to_row(self) -> list[str]:
+        """Positional form used in SNAPSHOT_FILE, which is much smaller than one object per entry."""
+        return [getattr(self, field) for field in self.FIELDS]
+
+    def to_dict(self) -> dict[str, str]:
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+
+# Local metadata includes the filename, which server data might not have
+class LocalStreamMetadata(TypedDict):
     streamer: str
     date: str
     streamType: str
     streamTitle: str
     id: str
-
-
-# Local metadata includes the filename, which server data might not have
-class LocalStreamMetadata(StreamMetadata):
     filename: str
 
 
@@ -37,95 +100,310 @@ class MismatchDetail(TypedDict):
 # --- End Configuration ---
 
 
-def fetch_server_info(server_url: str, headers: dict[str, str]) -> dict[str, StreamMetadata]:
+class VerifySnapshot:
+    """
+    SNAPSHOT_FILE: per server_url, the /info entries with the ETag and cursor they
+    came with; per local path, the srt text hash with the size and mtime it was
+    computed at.
+    """
+
+    def __init__(self, path: str, server_url: str):
+        self.path = path
+        self.server_url = server_url
+        self._data: dict = {"version": 2, "servers": {}, "hashes": {}}
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == 2:
+                self._data = data
+        except (OSError, ValueError):
+            pass
+        self.hashes: dict[str, dict] = self._data["hashes"]
+        stored = self._data["servers"].get(server_url, {})
+        self.etag: str | None = stored.get("etag")
+        self.cursor: str | None = stored.get("cursor")
+        self.full_fetched_at: float = stored.get("full_fetched_at", 0.0)
+        self.items: dict[str, ServerStream] | None = None
+        if "rows" in stored:
+            self.items = {row[4]: ServerStream.from_row(row) for row in stored["rows"]}
+
+    def set_server(self, items: dict[str, ServerStream], etag: str | None, cursor: str | None, full: bool):
+        self.items = items
+        self.etag = etag
+        self.cursor = cursor
+        if full:
+            self.full_fetched_at = time.time()
+
+    def reset(self):
+        self.items = None
+        self.etag = self.cursor = None
+
+    def save(self):
+        if self.items is not None:
+            self._data["servers"][self.server_url] = {
+                "etag": self.etag,
+                "cursor": self.cursor,
+                "full_fetched_at": self.full_fetched_at,
+                "rows": [stream.to_row() for stream in self.items.values()],
+            }
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._data, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_path, self.path)
+
+
+def iter_json_array(chunks: Iterable[bytes]) -> Iterator[dict]:
+    """
+    Yield the elements of a JSON array as they arrive, holding only the current
+    element (plus one chunk) in memory instead of the whole body.
+    """
+    decoder = json.JSONDecoder()
+    text = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    pos = 0
+    started = False
+    chunk_iter = iter(chunks)
+    done = False
+
+    while True:
+        # Skip whitespace and separators up to the next value.
+        while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+            pos += 1
+        if not started and pos < len(buffer):
+            if buffer[pos] != "[":
+                raise ValueError("expected a JSON array")
+            started = True
+            pos += 1
+            continue
+        if started and pos < len(buffer):
+            if buffer[pos] == "]":
+                return
+            try:
+                value, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if done:
+                    raise
+            else:
+                yield value
+                pos = end
+                continue
+        if done:
+            raise ValueError("JSON array ended early")
+
+        # Need more input: drop what has been parsed and read another chunk.
+        buffer = buffer[pos:]
+        pos = 0
+        chunk = next(chunk_iter, None)
+        if chunk is None:
+            buffer += text.decode(b"", final=True)
+            done = True
+        else:
+            buffer += text.decode(chunk)
+
+
+def _iter_body(response: requests.Response) -> Iterator[bytes]:
+    """The response body in decoded chunks. urllib3 undoes gzip; zstd is undone here if urllib3 cannot."""
+    chunks = response.iter_content(INFO_CHUNK_SIZE)
+    if response.headers.get("Content-Encoding", "").lower() != "zstd" or "zstd" in ACCEPT_ENCODING:
+        yield from chunks
+        return
+    decompressor = zstd.ZstdDecompressor().decompressobj()
+    for chunk in chunks:
+        yield decompressor.decompress(chunk)
+
+
+def _read_body_start(chunks: Iterator[bytes]) -> tuple[bytes, Iterator[bytes]]:
+    """The first non-empty chunk, and an iterator that still yields it, so the body type can be checked."""
+    for chunk in chunks:
+        if chunk.strip():
+            return chunk, itertools.chain([chunk], chunks)
+    return b"", iter(())
+
+
+def fetch_server_info(
+    server_url: str, headers: dict[str, str], snapshot: VerifySnapshot, full: bool = False
+) -> tuple[dict[str, ServerStream], str]:
     """
-    GET {server_url}/info to retrieve the list of known streams.
-    Returns a dictionary keyed by ID for easy lookup.
+    GET {server_url}/info, reusing the snapshot where the server allows it.
+    Returns the streams keyed by ID and how they were fetched: "full",
+    "delta" (only changes since the snapshot's cursor) or "unchanged" (304).
+
+    Full lists are parsed as they stream in, and followed across pages when the
+    server sends a Link: rel="next" header (INFO_PAGE_SIZE entries are asked for
+    per page). A server that offers neither an ETag nor an X-Info-Cursor header,
+    or answers ?since= with the full list, simply gets a full fetch every time.
     """
     base = server_url.rstrip("/")
     url = f"{base}/info"
 
-    print(f"Fetching server info from: {url}")
-    try:
-        response = requests.get(url, headers=headers, timeout=30)
-        response.raise_for_status()
-        data: list[StreamMetadata] = response.json()
-
-        server_map: dict[str, StreamMetadata] = {}
-        for entry in data:
-            if "id" in entry:
-                server_map[entry["id"]] = entry
+    stale = time.time() - snapshot.full_fetched_at > FULL_REFRESH_HOURS * 3600
+    cached = snapshot.items if not (full or stale) else None
 
-        return server_map
+    request_headers = {**headers, "Accept-Encoding": INFO_ACCEPT_ENCODING}
+    params: dict[str, str | int] = {}
+    if cached is not None and snapshot.etag:
+        request_headers["If-None-Match"] = snapshot.etag
+    if cached is not None and snapshot.cursor:
+        params["since"] = snapshot.cursor
+    else:
+        params["limit"] = INFO_PAGE_SIZE
 
-    except requests.exceptions.RequestException as e:
+    print(f"Fetching server info from: {url}" + (f" (changes since {snapshot.cursor})" if "since" in params else ""))
+    server_map: dict[str, ServerStream] = {}
+    etag = cursor = None
+    pages = 0
+    next_url: str | None = url
+    try:
+        while next_url:
+            with requests.get(
+                next_url, headers=request_headers, params=params if pages == 0 else None, timeout=30, stream=True
+            ) as response:
+                if pages == 0:
+                    if response.status_code == 304 and cached is not None:
+                        return cached, "unchanged"
+                    if response.status_code >= 400 and "since" in params:
+                        # The server did not like the cursor; start over with the full list.
+                        print(f"Delta request failed ({response.status_code}), fetching the full list.")
+                        snapshot.reset()
+                        return fetch_server_info(server_url, headers, snapshot, full=True)
+                    etag = response.headers.get("ETag")
+                    cursor = response.headers.get("X-Info-Cursor")
+                    request_headers.pop("If-None-Match", None)
+                response.raise_for_status()
+
+                first, chunks = _read_body_start(_iter_body(response))
+                if first.lstrip().startswith(b"{"):
+                    # A delta: small, so parsed in one go.
+                    data = json.loads(b"".join(chunks))
+                    if cached is None or "changed" not in data:
+                        raise ValueError("unexpected /info object")
+                    for entry in data["changed"]:
+                        if entry.get("id"):
+                            cached[entry["id"]] = ServerStream.from_json(entry)
+                    for stream_id in data.get("deleted", []):
+                        cached.pop(stream_id, None)
+                    snapshot.set_server(cached, etag, data.get("cursor", cursor), full=False)
+                    print(f"Server reported {len(data['changed'])} changed and {len(data.get('deleted', []))} deleted streams.")
+                    return cached, "delta"
+
+                for entry in iter_json_array(chunks):
+                    if entry.get("id"):
+                        server_map[entry["id"]] = ServerStream.from_json(entry)
+                pages += 1
+                next_link = response.links.get("next", {}).get("url")
+                next_url = urljoin(response.url, next_link) if next_link else None
+    except (requests.exceptions.RequestException, ValueError) as e:
         print(f"Error fetching server info: {e}")
         sys.exit(1)
 
+    if pages > 1:
+        print(f"Read {pages} pages of /info.")
+    snapshot.set_server(server_map, etag, cursor, full=True)
+    return server_map, "full"
+
 
-def scan_local_files() -> dict[str, LocalStreamMetadata]:
+def scan_local_files() -> tuple[dict[str, LocalStreamMetadata], dict[str, IndexedFile]]:
     """
-    Scans the BASE_DIR for .srt files matching the pattern.
-    Returns a dictionary keyed by ID containing the parsed metadata.
+    Looks up the .srt files in BASE_DIR that match the pattern, via the local index.
+    Returns dictionaries keyed by ID with the parsed metadata and with the index row.
     """
     local_map: dict[str, LocalStreamMetadata] = {}
+    rows_by_id: dict[str, IndexedFile] = {}
 
     print(f"Scanning '{BASE_DIR}' for local files...")
 
+    with TranscriptIndex() as index:
+        rows = index.query(ext=".srt")
+
     files_found = 0
 
-    for root, _, files in os.walk(BASE_DIR):
-        if root == BASE_DIR:
+    for row in rows:
+        if not row["streamer"]:
             continue
 
+        files_found += 1
+
+        raw_date = row["date"]
+        formatted_date: str
         try:
-            streamer_name = os.path.relpath(root, BASE_DIR).split(os.path.sep)[0]
-        except Exception:
-            continue
+            dt = datetime.strptime(raw_date, "%Y%m%d")
+            formatted_date = dt.strftime("%Y-%m-%d")
+        except ValueError:
+            formatted_date = raw_date
+
+        meta: LocalStreamMetadata = {
+            "streamer": row["streamer"],
+            "date": formatted_date,
+            "streamType": row["type"],
+            "streamTitle": row["title"],
+            "id": row["id"],
+            "filename": row["name"],
+        }
+
+        local_map[row["id"]] = meta
+        rows_by_id[row["id"]] = row
 
-        if not streamer_name:
-            continue
+    print(f"Found {files_found} valid local transcripts.")
+    return local_map, rows_by_id
 
-        for file in files:
-            if not file.endswith(".srt"):
-                continue
 
-            match = FILENAME_PATTERN.match(file)
-            if match:
-                files_found += 1
-
-                raw_date = match.group(1)
-                stream_type = match.group(2)
-                stream_title = match.group(3).strip()
-                stream_id = match.group(4)
-
-                formatted_date: str
-                try:
-                    dt = datetime.strptime(raw_date, "%Y%m%d")
-                    formatted_date = dt.strftime("%Y-%m-%d")
-                except ValueError:
-                    formatted_date = raw_date
-
-                meta: LocalStreamMetadata = {
-                    "streamer": streamer_name,
-                    "date": formatted_date,
-                    "streamType": stream_type,
-                    "streamTitle": stream_title,
-                    "id": stream_id,
-                    "filename": file,
-                }
-
-                local_map[stream_id] = meta
+def transcript_hash(row: IndexedFile, snapshot: VerifySnapshot) -> str:
+    """
+    sha256 of the srt text as upload_transcripts.py hashes it (read as text, so
+    line endings do not matter). Cached in the snapshot by path, size and mtime.
+    The file is stat'ed here rather than trusting the index row, because an edit
+    in place does not make the index re-list the folder.
+    """
+    stat = os.stat(row["path"])
+    cached = snapshot.hashes.get(row["path"])
+    if cached and cached["size"] == stat.st_size and cached["mtime_ns"] == stat.st_mtime_ns:
+        return cached["hash"]
+    with open(row["path"], encoding="utf-8") as f:
+        content_hash = hashlib.sha256(f.read().encode("utf-8")).hexdigest()
+    snapshot.hashes[row["path"]] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "hash": content_hash}
+    return content_hash
+
+
+def compare_content(
+    server_map: dict[str, ServerStream],
+    rows_by_id: dict[str, IndexedFile],
+    manifest: UploadManifest,
+    snapshot: VerifySnapshot,
+) -> list[MismatchDetail]:
+    """
+    Transcripts on both sides whose text differs. The local text is compared with
+    the hash the server reports for it, when /info includes one, and with the hash
+    recorded at its last upload, which catches files edited since.
+    """
+    mismatches: list[MismatchDetail] = []
+    for stream_id, row in rows_by_id.items():
+        if stream_id not in server_map:
+            continue
+        server_hash = server_map[stream_id].hash
+        uploaded = manifest.entry(stream_id)
+        if not server_hash and not uploaded:
+            continue
+        try:
+            local_hash = transcript_hash(row, snapshot)
+        except OSError as e:
+            mismatches.append({"id": stream_id, "filename": row["name"], "diffs": [f"content: could not read local file ({e})"]})
+            continue
 
-    print(f"Found {files_found} valid local transcripts.")
-    return local_map
+        diffs: list[str] = []
+        if server_hash and server_hash != local_hash:
+            diffs.append("content: Server text differs from Local")
+        if uploaded and uploaded["hash"] != local_hash:
+            diffs.append(f"content: Local changed since it was uploaded on {uploaded['uploaded_at'][:10]}")
+        if diffs:
+            mismatches.append({"id": stream_id, "filename": row["name"], "diffs": diffs})
+    return mismatches
 
 
 def compare_data(
-    server_map: dict[str, StreamMetadata], local_map: dict[str, LocalStreamMetadata]
-) -> tuple[list[StreamMetadata], list[LocalStreamMetadata], list[MismatchDetail]]:
+    server_map: dict[str, ServerStream], local_map: dict[str, LocalStreamMetadata]
+) -> tuple[list[ServerStream], list[LocalStreamMetadata], list[MismatchDetail]]:
 
-    missing_local: list[StreamMetadata] = []  # Server has, We don't
+    missing_local: list[ServerStream] = []  # Server has, We don't
     missing_server: list[LocalStreamMetadata] = []  # We have, Server doesn't
     mismatches: list[MismatchDetail] = []  # Data mismatch
 
@@ -145,10 +423,8 @@ def compare_data(
             fields_to_check = ["streamer", "date", "streamType", "streamTitle"]
 
             for field in fields_to_check:
-                # Type ignore note: TypedDict keys are known, but iterating strings
-                # can trigger strict type checkers.
-                s_val = s_data.get(field, "")  # type: ignore
-                l_val = l_data.get(field, "")  # type: ignore
+                s_val = getattr(s_data, field)
+                l_val = l_data.get(field, "")
 
                 if s_val != l_val:
                     diffs.append(f"{field}: Server='{s_val}' vs Local='{l_val}'")
@@ -164,10 +440,42 @@ def compare_data(
     return missing_local, missing_server, mismatches
 
 
+def write_json_report(
+    server_url: str,
+    fetch_mode: str,
+    missing_local: list[ServerStream],
+    missing_server: list[LocalStreamMetadata],
+    mismatches: list[MismatchDetail],
+    content_mismatches: list[MismatchDetail],
+) -> None:
+    report = {
+        "generated": datetime.now().isoformat(timespec="seconds"),
+        "serverUrl": server_url,
+        "fetch": fetch_mode,
+        "ok": not (missing_local or missing_server or mismatches or content_mismatches),
+        "counts": {
+            "missingLocal": len(missing_local),
+            "missingServer": len(missing_server),
+            "metadataMismatches": len(mismatches),
+            "contentMismatches": len(content_mismatches),
+        },
+        "missingLocal": [stream.to_dict() for stream in missing_local],
+        "missingServer": missing_server,
+        "metadataMismatches": mismatches,
+        "contentMismatches": content_mismatches,
+    }
+    try:
+        with open(JSON_REPORT_FILE, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    except OSError as e:
+        print(f"\nError writing to report file: {e}")
+
+
 def generate_report(
-    missing_local: list[StreamMetadata],
+    missing_local: list[ServerStream],
     missing_server: list[LocalStreamMetadata],
     mismatches: list[MismatchDetail],
+    content_mismatches: list[MismatchDetail],
 ) -> None:
     """
     Prints summary to console and writes details to missing.txt
@@ -180,9 +488,10 @@ def generate_report(
     print(f"Missing Local Files:  {len(missing_local)}")
     print(f"Missing Server Files: {len(missing_server)}")
     print(f"Metadata Mismatches:  {len(mismatches)}")
+    print(f"Content Mismatches:   {len(content_mismatches)}")
     print("-" * 40)
 
-    if not missing_local and not missing_server and not mismatches:
+    if not missing_local and not missing_server and not mismatches and not content_mismatches:
         print("SUCCESS: Local files and Server are perfectly synced.")
         return
     else:
@@ -200,10 +509,10 @@ def generate_report(
             f.write("(Server has these entries, but no local .srt found)\n\n")
             if missing_local:
                 for s_item in missing_local:
-                    f.write(f"ID: {s_item.get('id')}\n")
-                    f.write(f"  Streamer: {s_item.get('streamer')}\n")
-                    f.write(f"  Date:     {s_item.get('date')}\n")
-                    f.write(f"  Title:    {s_item.get('streamTitle')}\n")
+                    f.write(f"ID: {s_item.id}\n")
+                    f.write(f"  Streamer: {s_item.streamer}\n")
+                    f.write(f"  Date:     {s_item.date}\n")
+                    f.write(f"  Title:    {s_item.streamTitle}\n")
                     f.write("-" * 20 + "\n")
             else:
                 f.write("None.\n\n")
@@ -238,11 +547,30 @@ def generate_report(
             else:
                 f.write("None.\n\n")
 
+            f.write("\n" + "=" * 60 + "\n\n")
+
+            # Section 4: Content mismatches
+            f.write(f"--- CONTENT MISMATCHES ({len(content_mismatches)}) ---\n")
+            f.write("(ID exists in both, but the transcript text differs)\n\n")
+            if content_mismatches:
+                for c_item in content_mismatches:
+                    f.write(f"ID: {c_item['id']}\n")
+                    f.write(f"  File: {c_item['filename']}\n")
+                    for diff in c_item["diffs"]:
+                        f.write(f"  [!] {diff}\n")
+                    f.write("-" * 20 + "\n")
+            else:
+                f.write("None.\n\n")
+
     except OSError as e:
         print(f"\nError writing to report file: {e}")
 
 
 def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare local transcripts with the server's list.")
+    parser.add_argument("--full", action="store_true", help="Fetch the full /info list even if the server can send only changes.")
+    args = parser.parse_args()
+
     # /info is public — no api_key needed
     config = load_config(require_api_key=False)
     server_url = config["server_url"]
@@ -253,18 +581,24 @@ def main() -> None:
 
     headers: dict[str, str] = {"Content-Type": "application/json"}
 
-    server_map = fetch_server_info(server_url, headers)
-    print(f"Server reported {len(server_map)} streams.")
+    snapshot = VerifySnapshot(SNAPSHOT_FILE, server_url)
+    server_map, fetch_mode = fetch_server_info(server_url, headers, snapshot, full=args.full)
+    print(f"Server reported {len(server_map)} streams" + ("." if fetch_mode == "full" else f" ({fetch_mode} since the last run)."))
 
-    local_map = scan_local_files()
+    local_map, rows_by_id = scan_local_files()
 
     print("Verifying consistency...")
     missing_local, missing_server, mismatches = compare_data(server_map, local_map)
-    missing_local.sort(key=lambda d: d["date"])
+    missing_local.sort(key=lambda s: s.date)
     missing_server.sort(key=lambda d: d["date"])
     mismatches.sort(key=lambda d: d["filename"])
 
-    generate_report(missing_local, missing_server, mismatches)
+    content_mismatches = compare_content(server_map, rows_by_id, UploadManifest(MANIFEST_FILE, server_url), snapshot)
+    content_mismatches.sort(key=lambda d: d["filename"])
+    snapshot.save()
+
+    generate_report(missing_local, missing_server, mismatches, content_mismatches)
+    write_json_report(server_url, fetch_mode, missing_local, missing_server, mismatches, content_mismatches)
 
 
 if __name__ == "__main__":
@@ -1,15 +1,20 @@
 #!/usr/bin/env python3
 
 import os
+import re
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 from datetime import date, datetime, timedelta
 
-from _common import FILENAME_PATTERN
+from _common import BASE_DIR
+from _index import TranscriptIndex
 from tqdm import tqdm
 
 # --- Configuration ---
 
 # Case sensitive. But we replace for both lowercase and uppercase versions.
-# So it's best to only have lowercase here.
+# So it's best to only have lowercase here. Where several words match at the
+# same spot, the longest one wins.
 # "old_word1": "new_word1"
 word_map = {
     "f**k": "fuck",
@@ -35,11 +40,102 @@ word_map = {
     "****": "fuck",
 }
 
-directory = "Transcript"
+directory = BASE_DIR
+
+# Number of files fixed at the same time.
+WORKERS = os.cpu_count() or 1
 
 # --- End Configuration ---
 
 
+def _trie_pattern(words) -> str:
+    """
+    A regex matching any of the words, built as a trie so the engine branches
+    on one character at a time instead of trying each word in turn. Longer
+    continuations are tried before stopping, so the longest word wins.
+    """
+    trie: dict = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def emit(node: dict) -> str:
+        parts = [re.escape(ch) + emit(child) for ch, child in sorted(node.items()) if ch]
+        if not parts:
+            return ""
+        body = parts[0] if len(parts) == 1 else "(?:" + "|".join(parts) + ")"
+        return f"(?:{body})?" if "" in node else body
+
+    return emit(trie)
+
+
+class WordReplacer:
+    """
+    Replaces every word in a word map in one pass over the text. The lowercase
+    and capitalized form of each word are matched, longest first, and the
+    replacement keeps that form. Counts are kept per word_map key.
+    """
+
+    def __init__(self, word_map: dict[str, str]):
+        # variant -> (replacement, word_map key)
+        self.variants: dict[str, tuple[str, str]] = {}
+        for old_word, new_word in word_map.items():
+            self.variants.setdefault(old_word.lower(), (new_word.lower(), old_word))
+            self.variants.setdefault(old_word.capitalize(), (new_word.capitalize(), old_word))
+        self.pattern = re.compile(_trie_pattern(self.variants))
+
+        # A character every word contains (e.g. '*'). Text without it cannot
+        # match, and str.find rules that out far faster than the regex.
+        common = set.intersection(*(set(variant) for variant in self.variants)) if self.variants else set()
+        self.required_char = min(common) if common else None
+
+    def replace(self, text: str) -> tuple[str, Counter[str]]:
+        """The text with every word replaced, and how many times each word_map key matched."""
+        counts: Counter[str] = Counter()
+        if not self.variants or (self.required_char and self.required_char not in text):
+            return text, counts
+
+        def substitute(match: re.Match[str]) -> str:
+            new_word, key = self.variants[match.group(0)]
+            counts[key] += 1
+            return new_word
+
+        return self.pattern.sub(substitute, text), counts
+
+
+_replacer: WordReplacer | None = None
+
+
+def _init_worker(word_map: dict[str, str]):
+    global _replacer
+    _replacer = WordReplacer(word_map)
+
+
+def fix_file(file_path: str) -> tuple[str, Counter[str], str | None]:
+    """
+    Replace words in one file. Runs in a worker process. The file is only
+    rewritten if something changed, through a temp file so it is never left
+    half-written. Returns (file_path, counts per word, error or None).
+    """
+    assert _replacer is not None
+    try:
+        # newline="" keeps the file's own line endings on both read and write
+        with open(file_path, encoding="utf-8", newline="") as f:
+            content = f.read()
+
+        content, counts = _replacer.replace(content)
+        if counts:
+            tmp_path = file_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8", newline="") as f:
+                f.write(content)
+            os.replace(tmp_path, file_path)
+        return file_path, counts, None
+    except Exception as e:
+        return file_path, Counter(), str(e)
+
+
 def get_day_limit():
     """
     Asks the user how many days back to check.
@@ -63,44 +159,22 @@ def get_day_limit():
 
 def replace_words_in_srt_files(word_map: dict[str, str], directory: str, cutoff_date: date | None):
     """
-    Finds all .srt files in a directory, filters by date if the filename
-    matches the pattern, and replaces words based on a map.
+    Looks up all .srt files in the local index of BASE_DIR, filters by date
+    if the filename matches the pattern, and replaces words based on a map.
+    Files are fixed in parallel, one pass each, and a summary of what changed
+    is printed at the end.
     """
 
-    srt_files_to_process = []
-    skipped_date = 0
-
     print("Scanning for .srt files...")
-    for root, _, files in os.walk(directory):
-        for file in files:
-            if not file.endswith(".srt"):
-                continue
-
-            # --- Date Check ---
-            process_this_file = True  # Default to processing the file
-            if cutoff_date:
-                match = FILENAME_PATTERN.match(file)
-                if match:
-                    # Filename matches, so we *can* check its date
-                    try:
-                        date_str = match.group(1)  # 'YYYYMMDD'
-                        file_date_obj = datetime.strptime(date_str, "%Y%m%d").date()
-
-                        if file_date_obj < cutoff_date:
-                            # File is too old, skip it
-                            skipped_date += 1
-                            process_this_file = False
-                    except ValueError:
-                        # Filename matched but date was invalid, process it anyway
-                        pass
-                # else:
-                #   Filename does not match pattern.
-                #   We can't check its date, so we'll process it.
-                #   (process_this_file remains True)
-            # --- End Date Check ---
-
-            if process_this_file:
-                srt_files_to_process.append(os.path.join(root, file))
+    # Files whose name does not match the pattern have no date to check,
+    # so they are always processed.
+    since = cutoff_date.strftime("%Y%m%d") if cutoff_date else None
+    with TranscriptIndex() as index:
+        all_srt_files = index.query(ext=".srt", include_unparsed=True)
+        selected = index.query(ext=".srt", since=since, include_unparsed=True) if since else all_srt_files
+
+    srt_files_to_process = [row["path"] for row in selected]
+    skipped_date = len(all_srt_files) - len(selected)
 
     if not srt_files_to_process:
         print(f"No .srt files found in '{directory}' that match the criteria.")
@@ -112,26 +186,21 @@ def replace_words_in_srt_files(word_map: dict[str, str], directory: str, cutoff_
     if cutoff_date:
         print(f"(Skipped {skipped_date} files (too old))")
 
-    for file_path in tqdm(srt_files_to_process, unit="file"):
-        try:
-            # Open with 'r+' to read and write
-            with open(file_path, "r+", encoding="utf-8") as f:
-                original_content = f.read()
-                content = original_content
-
-                # Apply all replacements
-                for old_word, new_word in word_map.items():
-                    content = content.replace(old_word.lower(), new_word.lower())
-                    content = content.replace(old_word.capitalize(), new_word.capitalize())
-
-                if content != original_content:
-                    f.seek(0)  # Go to the beginning of the file
-                    f.write(content)
-                    f.truncate()  # Remove leftover content if new file is shorter
-
-        except Exception as e:
-            # Use tqdm.write to print errors without messing up the progress bar
-            tqdm.write(f"Error processing {file_path}: {e}")
+    changed_files = 0
+    totals: Counter[str] = Counter()
+    with ProcessPoolExecutor(max_workers=WORKERS, initializer=_init_worker, initargs=(word_map,)) as executor:
+        results = executor.map(fix_file, srt_files_to_process, chunksize=16)
+        for file_path, counts, error in tqdm(results, total=len(srt_files_to_process), unit="file"):
+            if error:
+                # Use tqdm.write to print errors without messing up the progress bar
+                tqdm.write(f"Error processing {file_path}: {error}")
+            elif counts:
+                changed_files += 1
+                totals.update(counts)
+
+    print(f"\nChanged {changed_files} of {len(srt_files_to_process)} files ({sum(totals.values())} replacements).")
+    for old_word, count in totals.most_common():
+        print(f"  {old_word} -> {word_map[old_word]}: {count}")
 
 
 if __name__ == "__main__":